@@ -29,6 +29,7 @@ export default function EvaluacionPage() {
   });
 
   const [isGenerating, setIsGenerating] = useState(false);
+  const [progreso, setProgreso] = useState<string | null>(null);
 
   // Validar formulario completo
   const isFormatValid =
@@ -50,15 +51,33 @@ export default function EvaluacionPage() {
     setIsGenerating(true);
 
     try {
-      // TODO: Llamar a la API para generar el Excel
-      const response = await fetch('/api/generar', {
+      // La generación se encola y se consulta su estado hasta que el archivo
+      // está listo (ver /api/generar/trabajos).
+      const envio = await fetch('/api/generar/trabajos', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify(formData),
       });
-
+      let trabajo = await envio.json();
+      if (!envio.ok)
+        throw new Error(trabajo.error || "Error al generar el archivo.");
+
+      while (trabajo.estado === 'pendiente' || trabajo.estado === 'en_proceso') {
+        setProgreso(trabajo.estado === 'pendiente'
+          ? `En espera${trabajo.posicion ? ` (${trabajo.posicion} antes)` : ''}`
+          : trabajo.seccion ?? 'Iniciando');
+        await new Promise((r) => setTimeout(r, 1000));
+        const consulta = await fetch(`/api/generar/trabajos/${trabajo.id}`);
+        trabajo = await consulta.json();
+        if (!consulta.ok)
+          throw new Error(trabajo.error || "Error al consultar la generación.");
+      }
+      if (trabajo.estado !== 'listo')
+        throw new Error(trabajo.error || "Error al generar el archivo.");
+
+      const response = await fetch(trabajo.resultado);
       if (!response.ok)
-        throw new Error("Error al generar el archivo.");
+        throw new Error("Error al descargar el archivo.");
 
       // Descargar el archivo
       const blob = await response.blob();
@@ -79,6 +98,7 @@ export default function EvaluacionPage() {
       toast.error("Error al generar el archivo");
     } finally {
       setIsGenerating(false);
+      setProgreso(null);
     }
   }
 
@@ -130,7 +150,7 @@ export default function EvaluacionPage() {
           disabled={!isFormatValid || isGenerating}
         >
           {isGenerating ? (
-            <>Generando...</>
+            <>Generando...{progreso && ` ${progreso}`}</>
           ) : (
             <>
               <FileSpreadsheet className="h-5 w-5 mr-2" />
@@ -1,30 +1,9 @@
-import { spawn } from "child_process";
-import { randomUUID } from "crypto";
-import { writeFile, unlink, readFile } from "fs/promises";
 import { NextRequest, NextResponse } from "next/server";
-import { join } from "path";
-import { z } from "zod";
-
-interface PythonResult {
-  success: boolean;
-  output?: string;
-  error?: string;
-}
-
-const AlumnoSchema = z.object({
-  matricula: z.string().min(1),
-  nombre: z.string().min(1),
-});
-
-const EvaluacionRequestSchema = z.object({
-  alumnos: z.array(AlumnoSchema).min(1, 'Debe haber al menos un alumno'),
-});
-
-type EvaluacionRequest = z.infer<typeof EvaluacionRequestSchema>;
+import {
+  EvaluacionRequestSchema, generarEvaluacionXLSX, type EvaluacionRequest,
+} from "@/lib/generador-xlsx";
 
 export async function POST(request: NextRequest) {
-  const tempFiles: string[] = [];
-
   try {
     const body = await request.json();
 
@@ -39,48 +18,25 @@ export async function POST(request: NextRequest) {
 
     const data: EvaluacionRequest = parseResult.data;
 
-    // Generar nombres únicos para archivos temporales
-    const uuid = randomUUID();
-    const inputJsonPath = join(process.cwd(), 'temp', `input_${uuid}.json`);
-    const outputXlsxPath = join(process.cwd(), 'temp', `output_${uuid}.xlsm`); // CAMBIO
-
-    tempFiles.push(inputJsonPath, outputXlsxPath);
-
-    // Escribir datos de entrada como JSON para el script Python
-    await writeFile(inputJsonPath, JSON.stringify(data, null, 2), 'utf-8');
-
-    // Rutas del script y template
-    const scriptPath = join(process.cwd(), 'scripts', 'generar_XLSX.py');
-    const templatePath = join(process.cwd(), 'templates', 'Template.xlsx');
-
-    // Ejecutar script Python
-    const pythonResult = await executePythonScript(scriptPath, [
-      inputJsonPath,
-      templatePath,
-      outputXlsxPath,
-    ]);
+    // Generar el archivo con el servidor de generación (workers persistentes)
+    let xlsxStream: ReadableStream<Uint8Array>;
+    try {
+      xlsxStream = await generarEvaluacionXLSX(data);
+    } catch (e) {
+      const details = e instanceof Error ? e.message : String(e);
+      console.error('Error en script Python: ', details);
 
-    if (!pythonResult.success) {
-      console.error('Error en script Python: ', pythonResult.error);
-      
       return NextResponse.json(
-        { error: 'Error al generar el archivo', details: pythonResult.error },
+        { error: 'Error al generar el archivo', details },
         { status: 500 }
       );
     }
 
-    // Leer el archivo generado
-    const xlsxBuffer = await readFile(outputXlsxPath);
-    const uint8Array = new Uint8Array(xlsxBuffer);
-
-    // Limpiar archivos temporales
-    await cleanupTempFiles(tempFiles);
-
     // Generar nombre del archivo de descarga
     const filename = `evaluacion.xlsm`;
-    
-    // Retornar el archivo Excel
-    return new NextResponse(uint8Array, {
+
+    // Retornar el archivo Excel conforme se genera
+    return new NextResponse(xlsxStream, {
       headers: {
           "Content-Type": "application/vnd.ms-excel.sheet.macroEnabled.12",
           "Content-Disposition": `attachment; filename="${filename}"`,
@@ -90,51 +46,9 @@ export async function POST(request: NextRequest) {
   } catch (e) {
     console.error('Error en API de evaluaciones: ', e);
 
-    // Limpiar archivos temporales en caso de error
-    await cleanupTempFiles(tempFiles);
-
     return NextResponse.json(
       { error: 'Error interno del servidor' },
       { status: 500 },
     );
   }
 }
-
-function executePythonScript(scriptPath: string, args: string[]): Promise<PythonResult> {
-  return new Promise((resolve) => {
-    const python = spawn('python', [scriptPath, ...args]);
-
-    let stdout = '';
-    let stderr = '';
-
-    python.stdout.on('data', (data) => {
-      stdout += data.toString();
-    });
-
-    python.stderr.on('data', (data) => {
-      stderr += data.toString();
-    });
-
-    python.on('close', (code) => {
-      if (code === 0) {
-        resolve({ success: true, output: stdout });
-      } else {
-        resolve({ success: false, error: stderr || `Proceso terminó con código ${ code }`});
-      }
-    });
-
-    python.on('error', (err) => {
-      resolve({ success: false, error: err.message });
-    });
-  });
-}
-
-async function cleanupTempFiles(files: string[]): Promise<void> {
-  for (const file of files) {
-    try {
-      await unlink(file)
-    } catch {
-      
-    }
-  }
-}
\ No newline at end of file
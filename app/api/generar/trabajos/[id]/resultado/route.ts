@@ -0,0 +1,25 @@
+import { NextRequest, NextResponse } from "next/server";
+import { consultarTrabajo, resultadoTrabajo } from "@/lib/cola-generacion";
+
+export async function GET(
+  _request: NextRequest,
+  { params }: { params: Promise<{ id: string }> },
+) {
+  const { id } = await params;
+  const contenido = await resultadoTrabajo(id);
+  if (!contenido) {
+    const trabajo = await consultarTrabajo(id);
+    return trabajo
+      ? NextResponse.json({ error: 'El archivo aún no está listo', estado: trabajo.estado }, { status: 409 })
+      : NextResponse.json({ error: 'Trabajo no encontrado' }, { status: 404 });
+  }
+
+  const filename = `evaluacion.xlsm`;
+
+  return new NextResponse(contenido, {
+    headers: {
+      "Content-Type": "application/vnd.ms-excel.sheet.macroEnabled.12",
+      "Content-Disposition": `attachment; filename="${filename}"`,
+    },
+  });
+}
@@ -0,0 +1,20 @@
+import { NextRequest, NextResponse } from "next/server";
+import { consultarTrabajo } from "@/lib/cola-generacion";
+
+export async function GET(
+  _request: NextRequest,
+  { params }: { params: Promise<{ id: string }> },
+) {
+  const { id } = await params;
+  const trabajo = await consultarTrabajo(id);
+  if (!trabajo) {
+    return NextResponse.json({ error: 'Trabajo no encontrado' }, { status: 404 });
+  }
+
+  return NextResponse.json(
+    trabajo.estado === 'listo'
+      ? { ...trabajo, resultado: `/api/generar/trabajos/${ id }/resultado` }
+      : trabajo,
+    { headers: { 'Cache-Control': 'no-store' } },
+  );
+}
@@ -0,0 +1,42 @@
+import { NextRequest, NextResponse } from "next/server";
+import { ColaLlenaError, encolarGeneracion } from "@/lib/cola-generacion";
+import { EvaluacionRequestSchema } from "@/lib/generador-xlsx";
+
+// Encola la generación y responde de inmediato con el trabajo; el estado se
+// consulta en /api/generar/trabajos/<id> y el archivo se descarga de
+// /api/generar/trabajos/<id>/resultado cuando el estado es "listo".
+export async function POST(request: NextRequest) {
+  try {
+    const body = await request.json();
+
+    // Validar datos de entrada
+    const parseResult = EvaluacionRequestSchema.safeParse(body);
+    if (!parseResult.success) {
+      return NextResponse.json(
+        { error: 'Datos inválidos', details: parseResult.error.flatten() },
+        { status: 400 },
+      );
+    }
+
+    const trabajo = await encolarGeneracion(parseResult.data);
+
+    return NextResponse.json(trabajo, {
+      status: 202,
+      headers: { Location: `/api/generar/trabajos/${ trabajo.id }` },
+    });
+
+  } catch (e) {
+    if (e instanceof ColaLlenaError) {
+      return NextResponse.json(
+        { error: 'Hay demasiadas generaciones en espera, intenta de nuevo en un momento' },
+        { status: 503, headers: { 'Retry-After': '5' } },
+      );
+    }
+    console.error('Error al encolar la evaluación: ', e);
+
+    return NextResponse.json(
+      { error: 'Error interno del servidor' },
+      { status: 500 },
+    );
+  }
+}
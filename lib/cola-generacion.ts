@@ -0,0 +1,183 @@
+import { ChildProcessWithoutNullStreams, spawn } from "child_process";
+import { randomUUID } from "crypto";
+import { createReadStream } from "fs";
+import { mkdir, readdir, readFile, rename, writeFile } from "fs/promises";
+import { cpus } from "os";
+import { join } from "path";
+import { Readable } from "stream";
+import {
+  backendArgs, registrarTraza, scriptPath, templatePath, type TrazaGeneracion,
+} from "@/lib/generador-xlsx";
+
+// Generación asíncrona: los trabajos se encolan en disco y un solo proceso
+// Python (scripts/cola_trabajos.py) los atiende con un número fijo de workers,
+// así que las solicitudes concurrentes esperan su turno en lugar de abrir un
+// proceso (o un Excel) cada una. Con la cola llena se rechaza el trabajo
+// (503 en la API) en lugar de acumular más. Solo para uso en el servidor.
+
+export type EstadoTrabajo = 'pendiente' | 'en_proceso' | 'listo' | 'error';
+
+export interface Trabajo {
+  id: string;
+  estado: EstadoTrabajo;
+  creado: number;
+  iniciado?: number | null;
+  terminado?: number;
+  // Última sección terminada y duración de cada una (progreso).
+  seccion?: string | null;
+  secciones?: Record<string, number>;
+  bytes?: number;
+  ms?: number;
+  error?: string;
+  // Solo en pendiente: trabajos antes de este en la cola.
+  posicion?: number;
+}
+
+interface EventoCola {
+  id: string;
+  ok: boolean;
+  traza?: TrazaGeneracion;
+  error?: string;
+}
+
+export class ColaLlenaError extends Error {
+  constructor(public pendientes: number) {
+    super(`La cola de generación está llena (${ pendientes } trabajos pendientes)`);
+  }
+}
+
+const COLA_DIR = process.env.GENERADOR_COLA_DIR ?? join(process.cwd(), 'temp', 'cola-generacion');
+const COLA_WORKERS = Math.max(1, Number(process.env.GENERADOR_COLA_WORKERS ?? Math.min(4, cpus().length)));
+const COLA_MAX = Number(process.env.GENERADOR_COLA_MAX ?? 50);
+
+// `<ms epoch, 13 dígitos>-<uuid>`: el orden de nombre es el de llegada (ver
+// nuevo_id en cola_trabajos.py). Validarlo evita rutas fuera de la cola.
+const RE_ID = /^\d{13}-[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/;
+
+const ruta = (sub: string, id: string, ext = '.json') => join(COLA_DIR, sub, id + ext);
+
+async function escribirAtomico(destino: string, contenido: string) {
+  const tmp = `${ destino }.${ randomUUID() }.tmp`;
+  await writeFile(tmp, contenido, 'utf-8');
+  await rename(tmp, destino);
+}
+
+async function pendientes(): Promise<string[]> {
+  try {
+    return (await readdir(join(COLA_DIR, 'pendientes'))).filter((n) => n.endsWith('.json')).sort();
+  } catch {
+    return [];
+  }
+}
+
+class AtendedorCola {
+  private proceso: ChildProcessWithoutNullStreams | null = null;
+  private buffer = '';
+
+  private iniciar(): ChildProcessWithoutNullStreams {
+    const proceso = spawn('python', [
+      scriptPath(), '--cola', COLA_DIR, '--workers', String(COLA_WORKERS), ...backendArgs(), templatePath(),
+    ]);
+    this.buffer = '';
+
+    // Una línea JSON por trabajo terminado.
+    proceso.stdout.on('data', (chunk: Buffer) => {
+      this.buffer += chunk.toString('utf-8');
+      let fin: number;
+      while ((fin = this.buffer.indexOf('\n')) >= 0) {
+        const linea = this.buffer.slice(0, fin);
+        this.buffer = this.buffer.slice(fin + 1);
+        if (!linea.trim()) continue;
+        // Una línea que no es JSON (p. ej. un print suelto en Python) no debe
+        // tumbar el servidor: se registra y se ignora.
+        let evento: EventoCola;
+        try {
+          evento = JSON.parse(linea);
+        } catch {
+          console.error('[cola-generacion] línea no reconocida en stdout:', linea);
+          continue;
+        }
+        if (evento.ok) {
+          registrarTraza(evento.traza);
+        } else {
+          console.error(`[cola-generacion] trabajo ${ evento.id } falló: `, evento.error);
+        }
+      }
+    });
+    proceso.stderr.on('data', (data) => {
+      console.debug('[cola-generacion]', data.toString().trimEnd());
+    });
+
+    // Los trabajos siguen en disco: el siguiente encolado arranca otro
+    // proceso, que regresa a pendientes lo que quedó a medias.
+    const terminar = (motivo: string) => {
+      if (this.proceso !== proceso) return;
+      this.proceso = null;
+      console.error('[cola-generacion]', motivo);
+    };
+    proceso.on('close', (code) => terminar(`Atendedor de la cola terminó con código ${ code }`));
+    proceso.on('error', (err) => terminar(err.message));
+    proceso.stdin.on('error', (err) => terminar(err.message));
+
+    this.proceso = proceso;
+    return proceso;
+  }
+
+  // Cualquier línea despierta al despachador antes de su siguiente sondeo.
+  avisar() {
+    (this.proceso ?? this.iniciar()).stdin.write('\n');
+  }
+}
+
+// Un solo atendedor por proceso de Node (se conserva entre recargas en desarrollo).
+const globalConCola = globalThis as typeof globalThis & { __colaGeneracion?: AtendedorCola };
+
+export async function encolarGeneracion(data: unknown): Promise<Trabajo> {
+  const enEspera = (await pendientes()).length;
+  if (enEspera >= COLA_MAX) {
+    throw new ColaLlenaError(enEspera);
+  }
+
+  await Promise.all(['pendientes', 'en_proceso', 'estado', 'resultados'].map(
+    (sub) => mkdir(join(COLA_DIR, sub), { recursive: true })));
+  const id = `${ String(Date.now()).padStart(13, '0') }-${ randomUUID() }`;
+  const trabajo: Trabajo = { id, estado: 'pendiente', creado: Date.now() / 1000 };
+  // El estado primero: cuando el trabajo aparece en pendientes ya se puede consultar.
+  await escribirAtomico(ruta('estado', id), JSON.stringify(trabajo));
+  await escribirAtomico(ruta('pendientes', id), JSON.stringify({ id, data }));
+
+  globalConCola.__colaGeneracion ??= new AtendedorCola();
+  globalConCola.__colaGeneracion.avisar();
+  return { ...trabajo, posicion: enEspera };
+}
+
+export async function consultarTrabajo(id: string): Promise<Trabajo | null> {
+  if (!RE_ID.test(id)) return null;
+  let trabajo: Trabajo;
+  try {
+    trabajo = JSON.parse(await readFile(ruta('estado', id), 'utf-8'));
+  } catch (err) {
+    // Sin archivo de estado el trabajo no existe; cualquier otro error (JSON
+    // corrupto, permisos) se registra y el trabajo se reporta como no encontrado.
+    if ((err as NodeJS.ErrnoException).code !== 'ENOENT') {
+      console.error(`[cola-generacion] estado ilegible del trabajo ${ id }:`, err);
+    }
+    return null;
+  }
+  if (typeof trabajo !== 'object' || trabajo === null || typeof trabajo.estado !== 'string') {
+    console.error(`[cola-generacion] estado inválido del trabajo ${ id }`);
+    return null;
+  }
+  if (trabajo.estado === 'pendiente') {
+    const posicion = (await pendientes()).indexOf(`${ id }.json`);
+    if (posicion >= 0) trabajo.posicion = posicion;
+  }
+  return trabajo;
+}
+
+// El .xlsm de un trabajo listo, como stream (null si no existe o no está listo).
+export async function resultadoTrabajo(id: string): Promise<ReadableStream<Uint8Array> | null> {
+  const trabajo = await consultarTrabajo(id);
+  if (trabajo?.estado !== 'listo') return null;
+  return Readable.toWeb(createReadStream(ruta('resultados', id, '.xlsm'))) as unknown as ReadableStream<Uint8Array>;
+}
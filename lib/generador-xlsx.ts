@@ -0,0 +1,243 @@
+import { ChildProcessWithoutNullStreams, spawn } from "child_process";
+import { randomUUID } from "crypto";
+import { cpus } from "os";
+import { join } from "path";
+import { z } from "zod";
+
+// Cliente del modo servidor de scripts/generar_XLSX.py: un solo proceso
+// Python de larga vida con N workers calientes, en lugar de un `spawn` por
+// descarga. Con GENERADOR_WORKERS=0 se vuelve al proceso por solicitud
+// (JSON por stdin, .xlsm por stdout). En ambos casos el .xlsm se entrega
+// como un stream que se va llenando conforme llegan los bytes, sin archivos
+// temporales. Solo para uso en el servidor (rutas de API).
+
+// Cuerpo de /api/generar y /api/generar/trabajos.
+export const EvaluacionRequestSchema = z.object({
+  alumnos: z.array(z.object({
+    matricula: z.string().min(1),
+    nombre: z.string().min(1),
+  })).min(1, 'Debe haber al menos un alumno'),
+});
+
+export type EvaluacionRequest = z.infer<typeof EvaluacionRequestSchema>;
+
+interface TrabajoPendiente {
+  resolve: (contenido: ReadableStream<Uint8Array>) => void;
+  reject: (error: Error) => void;
+}
+
+interface RespuestaEnCurso {
+  controller: ReadableStreamDefaultController<Uint8Array>;
+  restantes: number;
+}
+
+interface EncabezadoRespuesta {
+  id: string | null;
+  ok: boolean;
+  bytes?: number;
+  ms?: number;
+  error?: string;
+  traza?: TrazaGeneracion;
+}
+
+// Traza estructurada de generar_XLSX.py (ver Cronometro.traza).
+export interface TrazaGeneracion {
+  backend: string;
+  alumnos: number;
+  secciones_ms: Record<string, number>;
+  total_ms: number;
+  celdas_escritas?: number;
+  celdas_bloqueo?: number;
+  nodos_xml?: number;
+  llamadas_com?: number;
+  // Ausentes cuando el archivo se sirvió desde la caché de salida.
+  columnas_encabezado?: Record<string, [number, number]>;
+  respaldo_bd_bj?: string[];
+  plantilla?: { cache: string } & Record<string, unknown>;
+  // Solo con GENERADOR_CACHE_DIR (scripts/cache_salidas.py); contadores por proceso.
+  cache_salida?: { resultado: 'acierto' | 'fallo'; aciertos: number; fallos: number };
+}
+
+// Una línea JSON por generación, para agregarla como métrica en los logs.
+export function registrarTraza(traza: TrazaGeneracion | undefined) {
+  if (!traza) return;
+  console.info(JSON.stringify({ evento: 'generador-xlsx', ...traza }));
+  if (traza.respaldo_bd_bj?.length) {
+    console.warn('[generador-xlsx] rango fijo BD:BJ en hojas sin encabezados:', traza.respaldo_bd_bj);
+  }
+}
+
+const WORKERS = Number(process.env.GENERADOR_WORKERS ?? Math.min(4, cpus().length));
+const BACKEND = process.env.GENERADOR_BACKEND; // default del script según la plataforma
+
+export const scriptPath = () => join(process.cwd(), 'scripts', 'generar_XLSX.py');
+export const templatePath = () => join(process.cwd(), 'templates', 'Template.xlsx');
+export const backendArgs = () => (BACKEND ? ['--backend', BACKEND] : []);
+
+class GeneradorXLSX {
+  private proceso: ChildProcessWithoutNullStreams | null = null;
+  private pendientes = new Map<string, TrabajoPendiente>();
+  private buffer = Buffer.alloc(0);
+  private enCurso: RespuestaEnCurso | null = null;
+
+  private iniciar(): ChildProcessWithoutNullStreams {
+    const proceso = spawn('python', [
+      scriptPath(), '--servidor', '--workers', String(WORKERS), ...backendArgs(), templatePath(),
+    ]);
+    this.buffer = Buffer.alloc(0);
+    this.enCurso = null;
+
+    proceso.stdout.on('data', (chunk: Buffer) => this.recibir(chunk));
+    proceso.stderr.on('data', (data) => {
+      console.debug('[generador-xlsx]', data.toString().trimEnd());
+    });
+
+    const terminar = (motivo: string) => {
+      if (this.proceso !== proceso) return;
+      this.proceso = null;
+      this.enCurso?.controller.error(new Error(motivo));
+      this.enCurso = null;
+      for (const trabajo of this.pendientes.values()) {
+        trabajo.reject(new Error(motivo));
+      }
+      this.pendientes.clear();
+    };
+    proceso.on('close', (code) => terminar(`Servidor de generación terminó con código ${ code }`));
+    proceso.on('error', (err) => terminar(err.message));
+    proceso.stdin.on('error', (err) => terminar(err.message));
+
+    this.proceso = proceso;
+    return proceso;
+  }
+
+  // Respuestas: una línea JSON de encabezado seguida de `bytes` bytes del
+  // .xlsm. El trabajo se resuelve al llegar el encabezado y los bytes se
+  // reenvían a su stream conforme llegan.
+  private recibir(chunk: Buffer) {
+    this.buffer = this.buffer.length ? Buffer.concat([this.buffer, chunk]) : chunk;
+
+    while (this.buffer.length || this.enCurso?.restantes === 0) {
+      if (this.enCurso) {
+        const parte = this.buffer.subarray(0, this.enCurso.restantes);
+        this.buffer = this.buffer.subarray(parte.length);
+        this.enCurso.restantes -= parte.length;
+        if (parte.length) this.enCurso.controller.enqueue(parte);
+        if (this.enCurso.restantes === 0) {
+          this.enCurso.controller.close();
+          this.enCurso = null;
+        }
+        continue;
+      }
+
+      const fin = this.buffer.indexOf(0x0a);
+      if (fin < 0) return;
+      const encabezado: EncabezadoRespuesta = JSON.parse(this.buffer.subarray(0, fin).toString('utf-8'));
+      this.buffer = this.buffer.subarray(fin + 1);
+
+      const trabajo = encabezado.id ? this.pendientes.get(encabezado.id) : undefined;
+      if (trabajo) this.pendientes.delete(encabezado.id!);
+
+      if (!encabezado.ok) {
+        if (trabajo) {
+          trabajo.reject(new Error(encabezado.error || 'Error al generar el archivo'));
+        } else {
+          console.error('Respuesta sin trabajo pendiente del generador: ', encabezado.error);
+        }
+        continue;
+      }
+
+      registrarTraza(encabezado.traza);
+
+      // Sin trabajo pendiente los bytes se consumen igual, hacia un stream descartado.
+      const contenido = new ReadableStream<Uint8Array>({
+        start: (controller) => {
+          this.enCurso = { controller, restantes: encabezado.bytes ?? 0 };
+        },
+      });
+      trabajo?.resolve(contenido);
+    }
+  }
+
+  generar(data: unknown): Promise<ReadableStream<Uint8Array>> {
+    const proceso = this.proceso ?? this.iniciar();
+    const id = randomUUID();
+
+    return new Promise((resolve, reject) => {
+      this.pendientes.set(id, { resolve, reject });
+      proceso.stdin.write(JSON.stringify({ id, data }) + '\n');
+    });
+  }
+}
+
+// Un solo servidor por proceso de Node (se conserva entre recargas en desarrollo).
+const globalConGenerador = globalThis as typeof globalThis & { __generadorXLSX?: GeneradorXLSX };
+
+export function generarEvaluacionXLSX(data: unknown): Promise<ReadableStream<Uint8Array>> {
+  if (WORKERS <= 0) {
+    return generarConProcesoNuevo(data);
+  }
+  if (!globalConGenerador.__generadorXLSX) {
+    globalConGenerador.__generadorXLSX = new GeneradorXLSX();
+  }
+  return globalConGenerador.__generadorXLSX.generar(data);
+}
+
+// Proceso por solicitud: JSON por stdin y .xlsm por stdout (`-` como rutas).
+// Se resuelve con el primer bloque de salida, así que un error antes de
+// escribir (el caso normal) se rechaza en lugar de cortar la descarga.
+function generarConProcesoNuevo(data: unknown): Promise<ReadableStream<Uint8Array>> {
+  return new Promise((resolve, reject) => {
+    const python = spawn('python', [scriptPath(), ...backendArgs(), '-', templatePath(), '-']);
+    let stderr = '';
+    let iniciado = false;
+    let controller!: ReadableStreamDefaultController<Uint8Array>;
+
+    const contenido = new ReadableStream<Uint8Array>({
+      start: (c) => { controller = c; },
+      pull: () => { python.stdout.resume(); },
+      cancel: () => { python.kill(); },
+    });
+
+    python.stdout.on('data', (chunk: Buffer) => {
+      controller.enqueue(chunk);
+      if ((controller.desiredSize ?? 1) <= 0) python.stdout.pause();
+      if (!iniciado) {
+        iniciado = true;
+        resolve(contenido);
+      }
+    });
+
+    python.stderr.on('data', (data) => {
+      stderr += data.toString();
+    });
+
+    python.on('close', (code) => {
+      if (code === 0 && iniciado) {
+        controller.close();
+        // Con stdout ocupado por el .xlsm, la traza es la última línea de stderr.
+        const ultima = stderr.trimEnd().split('\n').pop() ?? '';
+        try {
+          registrarTraza(JSON.parse(ultima));
+        } catch {
+          // Sin traza (versión anterior del script): nada que registrar.
+        }
+        return;
+      }
+      const error = new Error(stderr || `Proceso terminó con código ${ code }`);
+      if (iniciado) {
+        controller.error(error);
+      } else {
+        reject(error);
+      }
+    });
+
+    python.on('error', (err) => {
+      if (!iniciado) reject(err);
+    });
+
+    python.stdin.on('error', () => {
+      // El proceso terminó antes de leer la entrada; lo reporta 'close'.
+    });
+    python.stdin.end(JSON.stringify(data));
+  });
+}
@@ -0,0 +1,271 @@
+"""
+Modo delta de generar_XLSX.py: aplica altas y bajas de alumnos a un .xlsm ya
+generado (y posiblemente ya capturado) sin regenerarlo.
+
+Entrada: objeto JSON
+    {"altas": [{"matricula": ..., "nombre": ...}, ...], "bajas": ["<matricula>", ...]}
+
+La nueva lista es la actual sin las bajas (en su orden) seguida de las altas.
+  - Hoja General: solo se reescriben A/B/C desde la fila 10 (número,
+    matrícula, nombre).
+  - Hojas Parcial: la fila de captura de cada alumno (fila de General - 1)
+    sigue a su alumno: las calificaciones capturadas (celdas desbloqueadas sin
+    fórmula de D:BJ) se mueven a su nueva fila y las filas de alumnos nuevos
+    o eliminados quedan vacías. Estilos, fórmulas y protección no se tocan.
+  - Las partes del zip que no cambian se copian tal cual, sin recomprimir.
+Filas y columnas salen del diseño de la plantilla (diseno_plantilla.py); las
+filas de alumnos son las del archivo (ver diseno_plantilla.ultima_fila_datos).
+Si la nueva lista no cabe en ellas, el libro se amplía como al generar
+(filas_dinamicas.capacidad_para y ampliar_libro) y se reescriben todas sus
+hojas.
+
+Uso:
+    python scripts/generar_XLSX.py --delta <delta_json|-> <xlsm_existente> <salida|->
+"""
+
+import json
+import sys
+import zipfile
+
+from backend_ooxml import (
+    _RE_TIPO, Hoja, TablaEstilos, _leer_shared_strings, hojas_del_libro,
+)
+from cronometro import Cronometro
+from diseno_plantilla import ampliado, ultima_fila_datos
+from diseno_plantilla import cargar as cargar_diseno
+from zip_rapido import comprimir, escribir_zip, leer_entradas
+
+
+def _matricula(valor):
+    """Matrícula como texto (Excel pudo guardarla como número)."""
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor).strip()
+
+
+def leer_delta(ruta):
+    """Lee y valida el JSON de altas/bajas (`-` = stdin)."""
+    if ruta == "-":
+        delta = json.loads(sys.stdin.buffer.read())
+    else:
+        with open(ruta, "r", encoding="utf-8") as f:
+            delta = json.load(f)
+    if not isinstance(delta, dict):
+        raise ValueError("se esperaba un objeto JSON con 'altas' y/o 'bajas'")
+    altas = delta.get("altas", [])
+    bajas = delta.get("bajas", [])
+    if not isinstance(altas, list) or not all(isinstance(a, dict) for a in altas):
+        raise ValueError("'altas' debe ser una lista de objetos {matricula, nombre}")
+    if not isinstance(bajas, list):
+        raise ValueError("'bajas' debe ser una lista de matrículas")
+    return {"altas": altas, "bajas": [_matricula(b) for b in bajas]}
+
+
+def lista_actual(general, g):
+    """[(matricula, valor_matricula, nombre)] de las filas de datos
+    (g.fila_ini..g.fila_fin) hasta la última con matrícula o nombre; una fila
+    vacía intermedia se conserva en su lugar. `valor_matricula` es el valor
+    tal cual estaba en la celda. `g`: DisenoGeneral del archivo."""
+    alumnos = []
+    for fila in range(g.fila_ini, g.fila_fin + 1):
+        valor = general.valor(fila, g.col_matricula)
+        if isinstance(valor, float) and valor.is_integer():
+            valor = int(valor)
+        alumnos.append((_matricula(valor), valor, general.valor(fila, g.col_nombre) or ""))
+    while alumnos and not alumnos[-1][0] and not alumnos[-1][2]:
+        alumnos.pop()
+    return alumnos
+
+
+def _es_captura(hoja, celda):
+    attrs, estilo, contenido = celda
+    return not hoja.estilos.locked(estilo) and not (contenido and "<f" in contenido)
+
+
+def mover_capturas(hoja, p, origen, total):
+    """Reacomoda las capturas de una hoja Parcial (`p`: DisenoParcial): la
+    fila del índice `i` recibe las capturas que tenía el índice `origen[i]`
+    (None = vacía), para i < total. Devuelve True si la hoja cambió."""
+    fila_ini = p.fila_ini
+    _, col_ini, col_fin = p.captura
+    capturas = {}
+    for i in range(total):
+        fila_d = hoja.filas.get(fila_ini + i)
+        if fila_d is None:
+            continue
+        capturas[i] = {col: (celda[0], celda[2]) for col, celda in fila_d[1].items()
+                       if col_ini <= col <= col_fin and celda[2]
+                       and _es_captura(hoja, celda)}
+
+    cambio = False
+    for i in range(total):
+        j = origen[i] if i < len(origen) else None
+        if j == i:
+            continue
+        nuevas = capturas.get(j, {}) if j is not None else {}
+        fila_d = hoja.filas.get(fila_ini + i)
+        celdas = fila_d[1] if fila_d else {}
+        for col in set(capturas.get(i, {})) | set(nuevas):
+            celda = celdas.get(col) or hoja._celda(fila_ini + i, col)
+            if not _es_captura(hoja, celda):
+                continue  # celda bloqueada o con fórmula en el destino
+            attrs, contenido = nuevas.get(col, ("", None))
+            tipo = _RE_TIPO.search(attrs)
+            nuevo = [_RE_TIPO.sub("", celda[0]) + (tipo.group(0) if tipo else ""),
+                     celda[1], contenido]
+            if nuevo != celda:
+                celda[:] = nuevo
+                cambio = True
+    return cambio
+
+
+def ampliar(xlsm_path, entradas, partes, hojas, diseno, extra):
+    """Inserta `extra` filas de alumnos antes de la última fila de datos de
+    General y de cada hoja Parcial, como al generar para un grupo más grande
+    (ver filas_dinamicas.ampliar_libro). Lee el resto del XML del libro en
+    `partes`, porque las referencias de todas las hojas, dibujos y nombres
+    definidos se recorren. Devuelve (rutas de todas las hojas, hojas
+    reconstruidas en ese orden, {parte: bytes o None si se descarta} de las
+    partes que no son hojas y cambiaron)."""
+    from filas_dinamicas import ampliar_libro
+    with zipfile.ZipFile(xlsm_path) as z:
+        for nombre in entradas:
+            if nombre.endswith((".xml", ".rels")) and nombre not in partes:
+                partes[nombre] = z.read(nombre)
+    originales = dict(partes)
+    rutas = hojas_del_libro(partes)
+    leidas = {h.Name: h for h in hojas}
+    estilos, sst = hojas[0].estilos, hojas[0]._sst
+    libro = [leidas.get(nombre) or Hoja(nombre, partes[ruta].decode("utf-8"), estilos, sst)
+             for nombre, ruta in rutas]
+    puntos = {hojas[0].Name: diseno.general.fila_fin}
+    puntos.update({p.hoja: p.fila_fin for p in diseno.parciales})
+    libro = ampliar_libro(partes, rutas, libro, extra, puntos)
+    de_hojas = {ruta for _, ruta in rutas}
+    cambios = {n: v for n, v in partes.items()
+               if n not in de_hojas and v != originales.get(n)}
+    return rutas, libro, cambios
+
+
+def aplicar_delta(xlsm_path, delta, salida, diseno=None):
+    """Aplica `delta` ({"altas": [...], "bajas": [...]}) al .xlsm y escribe el
+    resultado en `salida` (ruta o archivo binario abierto). Devuelve la traza.
+    `diseno`: el de la plantilla (default: el de templates/Template.xlsx)."""
+    crono = Cronometro()
+    diseno = diseno or cargar_diseno()
+    g = diseno.general
+    entradas = leer_entradas(xlsm_path)
+    with zipfile.ZipFile(xlsm_path) as z:
+        partes = {n: z.read(n) for n in ("xl/workbook.xml", "xl/_rels/workbook.xml.rels",
+                                          "xl/styles.xml", "xl/sharedStrings.xml")
+                  if n in entradas}
+        rutas = hojas_del_libro(partes)
+        # General (o la primera hoja) y las hojas Parcial del diseño
+        nombres = {p.hoja for p in diseno.parciales}
+        nombre_general = g.hoja if g.hoja in dict(rutas) else rutas[0][0]
+        rutas = [(nombre, ruta) for nombre, ruta in rutas
+                 if nombre == nombre_general or nombre in nombres]
+        rutas.sort(key=lambda r: r[0] != nombre_general)
+        for _, ruta in rutas:
+            partes[ruta] = z.read(ruta)
+    estilos = TablaEstilos(partes["xl/styles.xml"].decode("utf-8"))
+    sst = _leer_shared_strings(partes.get("xl/sharedStrings.xml", b"").decode("utf-8"))
+    hojas = [Hoja(nombre, partes[ruta].decode("utf-8"), estilos, sst) for nombre, ruta in rutas]
+    general = hojas[0]
+    # Filas de datos del archivo: las de la plantilla o más, si se generó
+    # (o se actualizó) para un grupo más grande.
+    capacidad = ultima_fila_datos(general, g.fila_ini, g.col_nombre) - g.fila_ini + 1
+    diseno = ampliado(diseno, capacidad)
+    g = diseno.general
+    crono.marcar("Abrir libro")
+
+    actuales = lista_actual(general, g)
+    bajas = set(delta["bajas"])
+    presentes = {m for m, _, _ in actuales}
+    for matricula in sorted(bajas - presentes):
+        print(f"Advertencia: la matrícula {matricula} no está en la lista; se ignora la baja.",
+              file=sys.stderr)
+    origen = [i for i, (m, _, _) in enumerate(actuales) if m not in bajas]
+    nuevos = [actuales[i] for i in origen]
+    vistos = {m for m, _, _ in nuevos}
+    for alumno in delta["altas"]:
+        matricula = _matricula(alumno.get("matricula"))
+        if matricula in vistos:
+            print(f"Advertencia: la matrícula {matricula} ya está en la lista; se ignora el alta.",
+                  file=sys.stderr)
+            continue
+        vistos.add(matricula)
+        nuevos.append((matricula, alumno.get("matricula", ""), alumno.get("nombre", "")))
+        origen.append(None)
+    nuevas_partes = {}
+    if len(nuevos) > capacidad:
+        # Fuera de las filas de datos no hay fórmulas ni celdas de captura
+        # (la fila siguiente es la de cierre, bloqueada): se insertan filas
+        # como al generar (capacidad_para) y se reescriben todas las hojas.
+        from filas_dinamicas import capacidad_para
+        nueva = capacidad_para(len(nuevos), capacidad)
+        rutas_libro, libro, nuevas_partes = ampliar(
+            xlsm_path, entradas, partes, hojas, diseno, nueva - capacidad)
+        por_nombre = {h.Name: h for h in libro}
+        hojas = [por_nombre[h.Name] for h in hojas]
+        general = hojas[0]
+        diseno = ampliado(diseno, nueva)
+        g = diseno.general
+        en_hojas = {ruta for _, ruta in rutas}
+        for (_, ruta), hoja in zip(rutas_libro, libro):
+            if ruta not in en_hojas:
+                nuevas_partes[ruta] = hoja.serializar().encode("utf-8")
+        crono.marcar(f"Ampliar a {nueva} filas")
+    total = max(len(actuales), len(nuevos))
+
+    # ========================================
+    # SECCIÓN 3: Lista de Alumnos (solo A/B/C)
+    # ========================================
+    # Al ampliar, todas las hojas cambiaron (filas insertadas).
+    cambiadas = set(range(len(hojas))) if nuevas_partes else set()
+    if nuevos != actuales:
+        for i in range(total):
+            fila = g.fila_ini + i
+            _, matricula, nombre = nuevos[i] if i < len(nuevos) else ("", "", "")
+            general.escribir(fila, g.col_numero, i + 1 if i < len(nuevos) else "")
+            general.escribir(fila, g.col_matricula, matricula)
+            general.escribir(fila, g.col_nombre, nombre)
+        crono.contar("celdas_escritas", 3 * total)
+        cambiadas.add(0)
+    crono.marcar("SECCIÓN 3: Alumnos")
+
+    parciales = {p.hoja: p for p in diseno.parciales}
+    for k, hoja in enumerate(hojas[1:], 1):
+        if mover_capturas(hoja, parciales[hoja.Name], origen, total):
+            cambiadas.add(k)
+        crono.marcar(f"Capturas {hoja.Name}")
+
+    nuevas_partes.update({rutas[k][1]: hojas[k].serializar().encode("utf-8")
+                          for k in sorted(cambiadas)})
+    # Los valores en caché de las fórmulas quedan desactualizados: Excel
+    # recalcula al abrir.
+    wb = partes["xl/workbook.xml"].decode("utf-8")
+    if cambiadas and "fullCalcOnLoad" not in wb:
+        nuevas_partes["xl/workbook.xml"] = wb.replace(
+            "<calcPr ", '<calcPr fullCalcOnLoad="1" ', 1).encode("utf-8")
+    salida_entradas = [comprimir(n, nuevas_partes[n]) if n in nuevas_partes else e
+                       for n, e in entradas.items()
+                       if n not in nuevas_partes or nuevas_partes[n] is not None]
+    if hasattr(salida, "write"):
+        escribir_zip(salida, salida_entradas)
+    else:
+        with open(salida, "wb") as f:
+            escribir_zip(f, salida_entradas)
+    crono.marcar("Guardar")
+    crono.resumen("Tiempos (delta de alumnos)")
+
+    return crono.traza(
+        modo="delta",
+        alumnos=len(nuevos),
+        altas=origen.count(None),
+        bajas=len(actuales) - (len(origen) - origen.count(None)),
+        filas_alumnos=diseno.capacidad,
+        partes_reescritas=sorted(n for n, v in nuevas_partes.items() if v is not None),
+    )
@@ -0,0 +1,967 @@
+"""
+Backend OOXML (sin Excel) para generar_evaluacion.
+
+Escribe el .xlsm directamente sobre el contenedor zip de la plantilla: copia
+todas las partes (imágenes, dibujos, richData, etc.) y solo reescribe el XML de
+las hojas, styles.xml, workbook.xml y las relaciones/tipos necesarios para el
+proyecto VBA. No depende de win32com ni de openpyxl, así que corre en Linux.
+
+Reproduce el resultado del backend COM:
+  - Hoja 1: C5:C7 vacías, sentinela -1 en D7:H7, alumnos desde la fila 10
+    (A = número, B = matrícula, C = nombre).
+  - Mismos bloqueos/desbloqueos (con la misma expansión a celdas combinadas)
+    y protección de hoja con la contraseña de la plantilla.
+  - El modal VBA se inyecta como un vbaProject.bin precompilado.
+
+El vbaProject.bin lo compila proyecto_vba.py (una vez por versión del código
+VBA, con Excel) en templates/vba/vbaProject-<huella>.bin. También se puede
+extraer de un .xlsm generado con el backend COM (ver `extraer_vba`):
+    python scripts/backend_ooxml.py --extraer-vba <xlsm_generado_con_com>
+Si falta, la generación falla (proyecto_vba.vba_requerido) en lugar de
+producir un archivo sin el modal; GENERADOR_SIN_VBA=1 (--sin-vba en
+generar_XLSX.py) lo permite explícitamente.
+
+La plantilla se compila una vez por proceso (`compilar_plantilla`): todo lo que
+no depende de los alumnos queda aplicado y comprimido, y en cada solicitud
+solo se escriben las filas de alumnos de la hoja General. La caché se indexa
+por el hash del contenido de la plantilla, así que se invalida sola.
+
+Nota: los bloqueos se expresan con variantes de estilo (cellXfs) que solo
+cambian <protection locked=...>; las celdas sin registro que caen en un rango
+se crean con el estilo de su fila/columna, igual que hace Excel.
+
+Para que la salida no crezca respecto a la plantilla, al compilar se compacta:
+cellXfs queda solo con los xf que usan las hojas, sin duplicados y renumerado;
+las fórmulas iguales en forma relativa de una columna se guardan como
+fórmulas compartidas; los `spans` de las filas se recalculan por bloque de 16
+filas y las <col> contiguas con los mismos atributos se fusionan.
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import zipfile
+
+from cronometro import Cronometro
+from proyecto_vba import ruta_bin, vba_requerido
+from referencias import col_a_num, num_a_col, parse_ref  # noqa: F401 (API del módulo)
+from zip_rapido import comprimir, escribir_zip, leer_entradas
+
+
+PASSWORD = "ppcdsalv"
+
+# Valor por omisión de `vba_path`: el vbaProject.bin vigente de proyecto_vba.py
+# (FileNotFoundError si falta, salvo GENERADOR_SIN_VBA=1).
+VBA_PRECOMPILADO = object()
+
+CT_WORKBOOK_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"
+CT_WORKBOOK_XLSM = "application/vnd.ms-excel.sheet.macroEnabled.main+xml"
+CT_VBA = "application/vnd.ms-office.vbaProject"
+REL_VBA = "http://schemas.microsoft.com/office/2006/relationships/vbaProject"
+
+# Entidades de XML (xml.sax.saxutils y html arrastran ~30 ms de imports:
+# urllib, http.client, email...).
+_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+_ENTIDADES = {"amp": "&", "lt": "<", "gt": ">", "quot": '"', "apos": "'"}
+_RE_ENTIDAD = re.compile(r"&(#x[0-9a-fA-F]+|#[0-9]+|amp|lt|gt|quot|apos);")
+
+
+def escape(texto):
+    return texto.translate(_ESCAPE)
+
+
+def _entidad(m):
+    e = m.group(1)
+    if e[0] != "#":
+        return _ENTIDADES[e]
+    return chr(int(e[2:], 16) if e[1] == "x" else int(e[1:]))
+
+
+def unescape(texto):
+    return _RE_ENTIDAD.sub(_entidad, texto) if "&" in texto else texto
+
+
+_RE_FILA = re.compile(r'<row\b([^>]*?)(?:/>|>(.*?)</row>)', re.S)
+# Excel escribe r= y s= primero; si no, se buscan en el resto de atributos.
+_RE_CELDA = re.compile(r'<c\b(?: r="([A-Z]+)\d+")?(?: s="(\d+)")?([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+_RE_REF = re.compile(r'\br="([A-Z]+)(\d+)"')
+_RE_NUM_FILA = re.compile(r'\br="(\d+)"')
+_RE_ESTILO = re.compile(r'\ss="(\d+)"')
+_RE_TIPO = re.compile(r'\st="[^"]*"')
+_RE_SPANS = re.compile(r'\sspans="[^"]*"')
+_RE_MERGE = re.compile(r'<mergeCell ref="([A-Z]+\d+(?::[A-Z]+\d+)?)"')
+_RE_COL = re.compile(r'<col\b([^>]*?)/>')
+_RE_COLS = re.compile(r'<cols>(.*?)</cols>', re.S)
+_RE_MIN_MAX = re.compile(r'\s(min|max)="(\d+)"')
+_RE_XF = re.compile(r'<xf\b[^>]*?(?:/>|>.*?</xf>)', re.S)
+_RE_PROTECCION = re.compile(r'<protection\b([^>]*?)/>')
+_RE_T = re.compile(r'<t\b[^>]*>(.*?)</t>', re.S)
+_RE_V = re.compile(r'<v>(.*?)</v>', re.S)
+
+
+# ========================================
+# Contraseña de protección
+# ========================================
+
+def hash_password(password):
+    """Hash heredado de 16 bits de Excel para <sheetProtection password=...>."""
+    h = 0
+    for i, ch in enumerate(password, 1):
+        v = ord(ch) << i
+        h ^= (v & 0x7FFF) | (v >> 15)
+    h ^= len(password)
+    h ^= 0xCE4B
+    return format(h, "X")
+
+
+# ========================================
+# Estilos: variantes bloqueada/desbloqueada de cada cellXfs
+# ========================================
+
+class TablaEstilos:
+    """cellXfs de styles.xml con variantes de protección memoizadas."""
+
+    def __init__(self, xml):
+        self.xml = xml
+        ini = xml.index("<cellXfs")
+        fin = xml.index("</cellXfs>")
+        self._cabeza = xml[:ini]
+        self._cola = xml[fin + len("</cellXfs>"):]
+        self.xfs = _RE_XF.findall(xml[ini:fin])
+        self._locked = [self._es_locked(xf) for xf in self.xfs]
+        self._variantes = {}
+
+    @staticmethod
+    def _es_locked(xf):
+        m = _RE_PROTECCION.search(xf)
+        return not (m and 'locked="0"' in m.group(1))
+
+    def locked(self, s):
+        return self._locked[s]
+
+    def variante(self, s, locked):
+        """Índice de un xf igual a `s` pero con locked=`locked`."""
+        if self._locked[s] == locked:
+            return s
+        clave = (s, locked)
+        idx = self._variantes.get(clave)
+        if idx is not None:
+            return idx
+
+        xf = self.xfs[s]
+        valor = "1" if locked else "0"
+        m = _RE_PROTECCION.search(xf)
+        if m:
+            attrs = re.sub(r'\slocked="[^"]*"', "", m.group(1))
+            nuevo = xf[:m.start()] + f'<protection locked="{valor}"{attrs}/>' + xf[m.end():]
+        else:
+            prot = f'<protection locked="{valor}"/>'
+            if xf.endswith("/>"):
+                nuevo = xf[:-2] + ">" + prot + "</xf>"
+            elif "<extLst" in xf:
+                i = xf.index("<extLst")
+                nuevo = xf[:i] + prot + xf[i:]
+            else:
+                nuevo = xf[:-len("</xf>")] + prot + "</xf>"
+        if "applyProtection=" in nuevo:
+            nuevo = re.sub(r'applyProtection="[^"]*"', 'applyProtection="1"', nuevo, count=1)
+        else:
+            nuevo = nuevo.replace("<xf ", '<xf applyProtection="1" ', 1)
+
+        idx = len(self.xfs)
+        self.xfs.append(nuevo)
+        self._locked.append(locked)
+        self._variantes[clave] = idx
+        # Deshacer la variante regresa al xf original en lugar de crear otro.
+        self._variantes[(idx, not locked)] = s
+        return idx
+
+    @staticmethod
+    def _clave(xf):
+        """Forma canónica de un xf: atributos ordenados y protección efectiva
+        (sin <protection> equivale a locked="1"; applyProtection no cambia
+        lo que se ve)."""
+        m = _RE_PROTECCION.search(xf)
+        otros = re.sub(r'\slocked="[^"]*"', "", m.group(1)).strip() if m else ""
+        locked = TablaEstilos._es_locked(xf)
+        if m:
+            xf = xf[:m.start()] + xf[m.end():]
+        a = re.match(r"<xf\b([^>]*?)/?>", xf)
+        attrs = tuple(sorted(kv for kv in re.findall(r'(\w+)="([^"]*)"', a.group(1))
+                             if kv[0] != "applyProtection"))
+        return attrs, xf[a.end():].replace("</xf>", ""), locked, otros
+
+    def compactar(self, hojas):
+        """Deja en cellXfs solo los xf que usan `hojas` (y el 0, el estilo por
+        omisión), uno por forma canónica, y renumera las hojas. Devuelve
+        (xfs antes, xfs después)."""
+        usados = {0}
+        for hoja in hojas:
+            usados |= hoja.estilos_usados()
+        mapa, nuevos, por_clave = {}, [], {}
+        for s in sorted(usados):
+            clave = self._clave(self.xfs[s])
+            idx = por_clave.get(clave)
+            if idx is None:
+                idx = por_clave[clave] = len(nuevos)
+                nuevos.append(self.xfs[s])
+            mapa[s] = idx
+        antes = len(self.xfs)
+        self.xfs = nuevos
+        self._locked = [self._es_locked(xf) for xf in nuevos]
+        self._variantes = {}
+        for hoja in hojas:
+            hoja.renumerar_estilos(mapa)
+        return antes, len(nuevos)
+
+    def serializar(self):
+        return (f'{self._cabeza}<cellXfs count="{len(self.xfs)}">'
+                + "".join(self.xfs) + f"</cellXfs>{self._cola}")
+
+
+# ========================================
+# Modelo mínimo de una hoja
+# ========================================
+
+class Celda:
+    __slots__ = ("Value",)
+
+    def __init__(self, valor):
+        self.Value = valor
+
+
+class Hoja:
+    """sheetN.xml como cabeza + filas + cola. Las filas guardan sus celdas como
+    {col: [attrs, estilo, contenido]} (attrs sin r= ni s=) para reescribir
+    estilo y valor sin reparsear."""
+
+    def __init__(self, nombre, xml, estilos, shared_strings):
+        self.Name = nombre
+        self.estilos = estilos
+        self._sst = shared_strings
+        ini = xml.index("<sheetData")
+        fin_tag = xml.index(">", ini)
+        if xml[fin_tag - 1] == "/":
+            self.cabeza = xml[:ini]
+            cuerpo = ""
+            self.cola = xml[fin_tag + 1:]
+        else:
+            fin = xml.index("</sheetData>")
+            self.cabeza = xml[:ini]
+            cuerpo = xml[fin_tag + 1:fin]
+            self.cola = xml[fin + len("</sheetData>"):]
+
+        self.filas = {}
+        for m in _RE_FILA.finditer(cuerpo):
+            attrs = m.group(1)
+            num = int(_RE_NUM_FILA.search(attrs).group(1))
+            celdas = {}
+            for letras, estilo, c_attrs, contenido in _RE_CELDA.findall(m.group(2) or ""):
+                if not letras:
+                    letras = _RE_REF.search(c_attrs).group(1)
+                    c_attrs = _RE_REF.sub("", c_attrs)
+                    e = _RE_ESTILO.search(c_attrs)
+                    if e:
+                        estilo = e.group(1)
+                        c_attrs = c_attrs[:e.start()] + c_attrs[e.end():]
+                celdas[col_a_num(letras)] = [c_attrs, int(estilo) if estilo else 0,
+                                             contenido or None]
+            self.filas[num] = [attrs, celdas]
+
+        self.merges = [parse_ref(r) for r in _RE_MERGE.findall(self.cola)]
+        self._merge_de = {}
+        for area in self.merges:
+            f1, c1, f2, c2 = area
+            for f in range(f1, f2 + 1):
+                for c in range(c1, c2 + 1):
+                    self._merge_de[(f, c)] = area
+
+        self._leer_cols()
+
+    def _leer_cols(self):
+        self.cols = []  # [min, max, estilo]
+        for m in _RE_COL.finditer(self.cabeza):
+            a = m.group(1)
+            estilo = re.search(r'\sstyle="(\d+)"', a)
+            self.cols.append([int(re.search(r'\smin="(\d+)"', a).group(1)),
+                              int(re.search(r'\smax="(\d+)"', a).group(1)),
+                              int(estilo.group(1)) if estilo else 0])
+
+    # --- lectura (interfaz mínima compatible con buscar_columna_por_encabezado)
+
+    def Cells(self, fila, col):
+        return Celda(self.valor(fila, col))
+
+    def valor(self, fila, col):
+        fila_d = self.filas.get(fila)
+        celda = fila_d[1].get(col) if fila_d else None
+        if celda is None or not celda[2]:
+            return None
+        attrs, _, contenido = celda
+        tipo = re.search(r'\st="([^"]*)"', attrs)
+        tipo = tipo.group(1) if tipo else "n"
+        if tipo == "inlineStr":
+            return unescape("".join(_RE_T.findall(contenido)))
+        m = _RE_V.search(contenido)
+        if not m:
+            return None
+        v = unescape(m.group(1))
+        if tipo == "s":
+            return self._sst[int(v)]
+        if tipo == "n":
+            # Como openpyxl y verificar_bloqueo: int si es entero ("5", no
+            # "5.0", al normalizar un encabezado numérico).
+            try:
+                return int(v)
+            except ValueError:
+                pass
+            try:
+                return float(v)
+            except ValueError:
+                return v
+        return v
+
+    # --- escritura
+
+    def _estilo_defecto(self, fila, col):
+        attrs = self.filas[fila][0] if fila in self.filas else ""
+        if 'customFormat="1"' in attrs:
+            m = _RE_ESTILO.search(attrs)
+            if m:
+                return int(m.group(1))
+        for c_min, c_max, estilo in self.cols:
+            if c_min <= col <= c_max:
+                return estilo
+        return 0
+
+    def _celda(self, fila, col):
+        """Devuelve la celda, creándola (con el estilo de fila/columna) si no existe."""
+        fila_d = self.filas.get(fila)
+        if fila_d is None:
+            fila_d = self.filas[fila] = [f' r="{fila}"', {}]
+        celda = fila_d[1].get(col)
+        if celda is None:
+            celda = fila_d[1][col] = ["", self._estilo_defecto(fila, col), None]
+        return celda
+
+    @staticmethod
+    def _con_valor(celda, valor):
+        """Copia de `celda` con `valor` (números en <v>, texto como inlineStr)."""
+        attrs = _RE_TIPO.sub("", celda[0])
+        if valor is None or valor == "":
+            return [attrs, celda[1], None]
+        if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            return [attrs, celda[1], f"<v>{valor}</v>"]
+        texto = escape(str(valor))
+        espacio = ' xml:space="preserve"' if texto != texto.strip() else ""
+        return [attrs + ' t="inlineStr"', celda[1], f"<is><t{espacio}>{texto}</t></is>"]
+
+    def escribir(self, fila, col, valor):
+        celda = self._celda(fila, col)
+        celda[:] = self._con_valor(celda, valor)
+
+    def bloquear_rango(self, f1, c1, f2, c2, locked):
+        """Equivalente a recorrer el rango con `cell.MergeArea.Locked = ...`
+        en COM: las celdas combinadas arrastran su área completa. Devuelve el
+        número de celdas tocadas."""
+        variante = self.estilos.variante
+        hechas = set()
+        tocadas = 0
+        for f in range(f1, f2 + 1):
+            for c in range(c1, c2 + 1):
+                area = self._merge_de.get((f, c))
+                if area is None:
+                    objetivo = ((f, c),)
+                elif area in hechas:
+                    continue
+                else:
+                    hechas.add(area)
+                    af1, ac1, af2, ac2 = area
+                    objetivo = [(x, y) for x in range(af1, af2 + 1)
+                                for y in range(ac1, ac2 + 1)]
+                for x, y in objetivo:
+                    fila_d = self.filas.get(x)
+                    celda = fila_d[1].get(y) if fila_d else None
+                    if celda is None:
+                        celda = self._celda(x, y)
+                    celda[1] = variante(celda[1], locked)
+                    tocadas += 1
+        return tocadas
+
+    def bloquear_todo(self):
+        """Equivalente a `ws.Cells.Locked = True`: celdas existentes y estilos
+        por defecto de columnas y filas. Devuelve el número de celdas tocadas."""
+        if not self.estilos.locked(0):
+            # Celdas sin registro ni estilo de fila/columna usan el xf 0.
+            raise ValueError("La plantilla desbloquea el estilo 0; no soportado por el backend OOXML")
+        variante = self.estilos.variante
+        tocadas = 0
+        for _, celdas in self.filas.values():
+            for celda in celdas.values():
+                celda[1] = variante(celda[1], True)
+            tocadas += len(celdas)
+        for fila_d in self.filas.values():
+            if 'customFormat="1"' in fila_d[0]:
+                m = _RE_ESTILO.search(fila_d[0])
+                if m:
+                    nuevo = self.estilos.variante(int(m.group(1)), True)
+                    fila_d[0] = fila_d[0][:m.start()] + f' s="{nuevo}"' + fila_d[0][m.end():]
+
+        def _col(m):
+            a = m.group(1)
+            e = re.search(r'\sstyle="(\d+)"', a)
+            s = int(e.group(1)) if e else 0
+            nuevo = self.estilos.variante(s, True)
+            if e:
+                a = a[:e.start()] + f' style="{nuevo}"' + a[e.end():]
+            elif nuevo:
+                a += f' style="{nuevo}"'
+            return f"<col{a}/>"
+
+        self.cabeza = _RE_COL.sub(_col, self.cabeza)
+        self.cols = [[c_min, c_max, variante(s, True)] for c_min, c_max, s in self.cols]
+        return tocadas
+
+    def estilos_usados(self):
+        """Índices de cellXfs que referencian celdas, filas y columnas."""
+        usados = {c[1] for _, celdas in self.filas.values() for c in celdas.values()}
+        usados.update(int(m.group(1)) for attrs, _ in self.filas.values()
+                      for m in [_RE_ESTILO.search(attrs)] if m)
+        usados.update(estilo for _, _, estilo in self.cols)
+        return usados
+
+    def renumerar_estilos(self, mapa):
+        """Aplica `mapa` ({xf viejo: xf nuevo}) y fusiona las <col> contiguas
+        que quedan con los mismos atributos."""
+        for fila_d in self.filas.values():
+            for celda in fila_d[1].values():
+                celda[1] = mapa[celda[1]]
+            fila_d[0] = _RE_ESTILO.sub(lambda m: f' s="{mapa[int(m.group(1))]}"', fila_d[0])
+
+        def _col(m):
+            a = re.sub(r'\sstyle="(\d+)"', lambda e: f' style="{mapa[int(e.group(1))]}"', m.group(1))
+            return f"<col{a}/>"
+
+        def _fusionar(m):
+            grupos = []  # [min, max, resto de atributos]
+            for a in _RE_COL.findall(_RE_COL.sub(_col, m.group(1))):
+                limites = dict(_RE_MIN_MAX.findall(a))
+                resto = _RE_MIN_MAX.sub("", a)
+                c_min, c_max = int(limites["min"]), int(limites["max"])
+                if grupos and grupos[-1][1] + 1 == c_min and grupos[-1][2] == resto:
+                    grupos[-1][1] = c_max
+                else:
+                    grupos.append([c_min, c_max, resto])
+            return "<cols>" + "".join(f'<col min="{c_min}" max="{c_max}"{resto}/>'
+                                      for c_min, c_max, resto in grupos) + "</cols>"
+
+        self.cabeza = _RE_COLS.sub(_fusionar, self.cabeza, count=1)
+        self._leer_cols()
+
+    def proteger(self, password):
+        """Equivalente a ws.Protect(Password, DrawingObjects, Contents, Scenarios)."""
+        self.cola = re.sub(r"<sheetProtection\b[^>]*/>", "", self.cola)
+        prot = (f'<sheetProtection password="{hash_password(password)}" '
+                'sheet="1" objects="1" scenarios="1"/>')
+        if self.cola.startswith("<sheetCalcPr"):
+            i = self.cola.index("/>") + 2
+            self.cola = self.cola[:i] + prot + self.cola[i:]
+        else:
+            self.cola = prot + self.cola
+
+    def fijar_codename(self, codename):
+        self.cabeza = _con_codename(self.cabeza, codename)
+
+    def serializar(self, valores=None):
+        """XML de la hoja. `valores` ({(fila, col): valor}) se escriben solo en
+        la salida, sin modificar la hoja, para reutilizar una hoja compilada.
+        Deja en `nodos_escritos` el número de <row> y <c> serializados.
+        Los `spans` de cada fila se recalculan: columnas ocupadas en su bloque
+        de 16 filas, como los escribe Excel."""
+        extra = {}
+        for (fila, col), valor in (valores or {}).items():
+            extra.setdefault(fila, {})[col] = valor
+
+        filas = []
+        spans = {}
+        for num in sorted(self.filas.keys() | extra.keys()):
+            attrs, celdas = self.filas.get(num) or (f' r="{num}"', {})
+            nuevas = extra.get(num)
+            if nuevas:
+                celdas = dict(celdas)
+                for col, valor in nuevas.items():
+                    base = celdas.get(col)
+                    if base is None:
+                        base = ["", self._estilo_defecto(num, col), None]
+                    celdas[col] = self._con_valor(base, valor)
+            filas.append((num, _RE_SPANS.sub("", attrs), celdas))
+            if celdas:
+                bloque = (num - 1) // 16
+                c_min, c_max = spans.get(bloque, (min(celdas), max(celdas)))
+                spans[bloque] = (min(c_min, min(celdas)), max(c_max, max(celdas)))
+
+        partes = [self.cabeza, "<sheetData>"]
+        max_fila, max_col = 1, 1
+        nodos = 0
+        for num, attrs, celdas in filas:
+            if not celdas:
+                partes.append(f"<row{attrs}/>")
+                continue
+            max_fila = max(max_fila, num)
+            c_min, c_max = spans[(num - 1) // 16]
+            attrs = attrs.replace(f' r="{num}"', f' r="{num}" spans="{c_min}:{c_max}"', 1)
+            partes.append(f"<row{attrs}>")
+            for col in sorted(celdas):
+                c_attrs, estilo, contenido = celdas[col]
+                s = f' s="{estilo}"' if estilo else ""
+                ref = f"{num_a_col(col)}{num}"
+                partes.append(f'<c r="{ref}"{s}{c_attrs}/>' if contenido is None
+                              else f'<c r="{ref}"{s}{c_attrs}>{contenido}</c>')
+                max_col = max(max_col, col)
+            partes.append("</row>")
+            nodos += len(celdas)
+        self.nodos_escritos = nodos + len(self.filas.keys() | extra.keys())
+        partes.append("</sheetData>")
+        partes.append(self.cola)
+        xml = "".join(partes)
+        return re.sub(r'<dimension ref="[^"]*"/>',
+                      f'<dimension ref="A1:{num_a_col(max_col)}{max_fila}"/>', xml, count=1)
+
+
+# ========================================
+# Plantilla (partes del zip)
+# ========================================
+
+def _leer_shared_strings(xml):
+    if not xml:
+        return []
+    return [unescape("".join(_RE_T.findall(si)))
+            for si in re.findall(r"<si>(.*?)</si>", xml, re.S)]
+
+
+def hojas_del_libro(partes):
+    """[(nombre, ruta_parte)] en el orden de pestañas de workbook.xml."""
+    wb = partes["xl/workbook.xml"].decode("utf-8")
+    rels = partes["xl/_rels/workbook.xml.rels"].decode("utf-8")
+    destinos = {}
+    for m in re.finditer(r"<Relationship\b([^>]*)/>", rels):
+        a = m.group(1)
+        rid = re.search(r'\bId="([^"]+)"', a).group(1)
+        target = re.search(r'\bTarget="([^"]+)"', a).group(1)
+        destinos[rid] = target.lstrip("/") if target.startswith("/") else "xl/" + target
+    hojas = []
+    for m in re.finditer(r"<sheet\b([^>]*)/>", wb):
+        a = m.group(1)
+        nombre = unescape(re.search(r'\bname="([^"]*)"', a).group(1))
+        rid = re.search(r'\br:id="([^"]+)"', a).group(1)
+        hojas.append((nombre, destinos[rid]))
+    return hojas
+
+
+def _con_codename(xml, codename):
+    """XML de hoja con `codeName` en <sheetPr> (se crea si no existe)."""
+    m = re.search(r"<sheetPr\b[^>]*", xml)
+    if m is None:
+        i = xml.index(">", xml.index("<worksheet")) + 1
+        return xml[:i] + f'<sheetPr codeName="{codename}"/>' + xml[i:]
+    if "codeName=" in m.group(0):
+        return xml[:m.start()] + re.sub(r'codeName="[^"]*"', f'codeName="{codename}"',
+                                        m.group(0)) + xml[m.end():]
+    return xml[:m.start()] + f'<sheetPr codeName="{codename}"' + xml[m.start() + 8:]
+
+
+def _inyectar_vba(partes, vba_bin, codenames, hojas):
+    """Agrega xl/vbaProject.bin con su relación, tipo de contenido y codeNames."""
+    _inyectar_vba_libro(partes, vba_bin, codenames)
+    por_hoja = codenames.get("sheets", {})
+    for i, hoja in enumerate(hojas, 1):
+        hoja.fijar_codename(por_hoja.get(hoja.Name, f"Hoja{i}"))
+
+
+def _inyectar_vba_libro(partes, vba_bin, codenames):
+    partes["xl/vbaProject.bin"] = vba_bin
+
+    ct = partes["[Content_Types].xml"].decode("utf-8")
+    if "/xl/vbaProject.bin" not in ct:
+        ct = ct.replace("</Types>",
+                        f'<Override PartName="/xl/vbaProject.bin" ContentType="{CT_VBA}"/></Types>')
+    partes["[Content_Types].xml"] = ct.encode("utf-8")
+
+    rels = partes["xl/_rels/workbook.xml.rels"].decode("utf-8")
+    if REL_VBA not in rels:
+        rels = rels.replace("</Relationships>",
+                            f'<Relationship Id="rIdVBA" Type="{REL_VBA}" '
+                            'Target="vbaProject.bin"/></Relationships>')
+    partes["xl/_rels/workbook.xml.rels"] = rels.encode("utf-8")
+
+    wb = partes["xl/workbook.xml"].decode("utf-8")
+    codename_libro = codenames.get("workbook", "ThisWorkbook")
+    if "<workbookPr/>" in wb:
+        wb = wb.replace("<workbookPr/>", f'<workbookPr codeName="{codename_libro}"/>', 1)
+    elif "codeName=" not in wb:
+        wb = wb.replace("<workbookPr", f'<workbookPr codeName="{codename_libro}"', 1)
+    partes["xl/workbook.xml"] = wb.encode("utf-8")
+
+
+def inyectar_vba_xlsm(xlsm_path, vba_path):
+    """Agrega el vbaProject.bin precompilado a un .xlsm ya guardado (backend
+    COM). Solo se recomprimen las partes que cambian. Devuelve False si no
+    existe `vba_path`."""
+    vba, codenames = _cargar_vba(vba_path)
+    if vba is None:
+        return False
+    entradas = leer_entradas(xlsm_path)
+    with zipfile.ZipFile(xlsm_path) as z:
+        partes = {n: z.read(n) for n in ("[Content_Types].xml", "xl/_rels/workbook.xml.rels",
+                                          "xl/workbook.xml")}
+        rutas = hojas_del_libro(partes)
+        for _, ruta in rutas:
+            partes[ruta] = z.read(ruta)
+    originales = dict(partes)
+
+    _inyectar_vba_libro(partes, vba, codenames)
+    por_hoja = codenames.get("sheets", {})
+    for i, (nombre, ruta) in enumerate(rutas, 1):
+        partes[ruta] = _con_codename(partes[ruta].decode("utf-8"),
+                                     por_hoja.get(nombre, f"Hoja{i}")).encode("utf-8")
+
+    cambiadas = {n for n, contenido in partes.items() if contenido != originales.get(n)}
+    salida = [comprimir(n, partes[n]) if n in cambiadas else e for n, e in entradas.items()]
+    salida += [comprimir(n, partes[n]) for n in sorted(cambiadas - set(entradas))]
+    buffer = io.BytesIO()
+    escribir_zip(buffer, salida)
+    with open(xlsm_path, "wb") as f:
+        f.write(buffer.getvalue())
+    return True
+
+
+def extraer_vba(xlsm_path, destino_bin=None):
+    """Extrae vbaProject.bin (y los codeNames de libro/hojas a un .json al lado)
+    de un .xlsm generado por el backend COM. Por omisión a la ruta de la
+    huella vigente del código VBA (proyecto_vba.ruta_bin)."""
+    destino_bin = destino_bin or ruta_bin()
+    os.makedirs(os.path.dirname(destino_bin), exist_ok=True)
+    with zipfile.ZipFile(xlsm_path) as z:
+        vba = z.read("xl/vbaProject.bin")
+        partes = {n: z.read(n) for n in z.namelist() if n.endswith(".xml") or n.endswith(".rels")}
+    codenames = {"workbook": "ThisWorkbook", "sheets": {}}
+    m = re.search(r'<workbookPr\b[^>]*\bcodeName="([^"]+)"', partes["xl/workbook.xml"].decode("utf-8"))
+    if m:
+        codenames["workbook"] = m.group(1)
+    for nombre, ruta in hojas_del_libro(partes):
+        m = re.search(r'<sheetPr\b[^>]*\bcodeName="([^"]+)"', partes[ruta].decode("utf-8"))
+        if m:
+            codenames["sheets"][nombre] = m.group(1)
+
+    with open(destino_bin, "wb") as f:
+        f.write(vba)
+    with open(os.path.splitext(destino_bin)[0] + ".json", "w", encoding="utf-8") as f:
+        json.dump(codenames, f, ensure_ascii=False, indent=2)
+
+
+def _cargar_vba(vba_path):
+    if not os.path.exists(vba_path):
+        return None, {}
+    with open(vba_path, "rb") as f:
+        vba = f.read()
+    codenames = {}
+    json_path = os.path.splitext(vba_path)[0] + ".json"
+    if os.path.exists(json_path):
+        with open(json_path, "r", encoding="utf-8") as f:
+            codenames = json.load(f)
+    return vba, codenames
+
+
+# ========================================
+# Plantilla compilada (caché por contenido)
+# ========================================
+
+_HUELLAS = {}
+
+
+def huella_archivo(path):
+    """SHA-256 del contenido de `path` (None si no existe). Se memoiza por
+    ruta, tamaño y fecha de modificación para no releer el archivo en cada
+    solicitud; si el archivo cambia, cambia la huella."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    clave = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    huella = _HUELLAS.get(clave)
+    if huella is None:
+        with open(path, "rb") as f:
+            huella = hashlib.sha256(f.read()).hexdigest()
+        _HUELLAS[clave] = huella
+    return huella
+
+
+class PlantillaCompilada:
+    """La plantilla procesada una sola vez: todo lo que no depende de los
+    alumnos (metadata, sentinelas, bloqueos, protección, VBA) ya aplicado y
+    las partes del zip ya comprimidas. Por solicitud solo se escriben las
+    filas de alumnos de la hoja General y se comprime esa parte.
+
+    Atributos de consulta (también los usa el backend COM):
+      merges    {hoja: (areas...)} celdas combinadas
+      columnas  {hoja: (col_ini, col_fin)} de "Producto del Parcial" a
+                "Porcentaje de asistencia"; las hojas sin esos encabezados
+                quedan en `sin_encabezados` y usan BD:BJ.
+      capacidad filas de alumnos (45 en la plantilla; más filas con
+                `capacidad`, ver filas_dinamicas.py)
+      diseno    coordenadas de la plantilla (ver diseno_plantilla.py), con
+                las filas de datos ya ampliadas a `capacidad`
+    """
+
+    def __init__(self, contenido, diseno, vba_path=None, capacidad=None):
+        from diseno_plantilla import ampliado
+        from filas_dinamicas import ampliar_libro, compartir_formulas
+        crono = Cronometro()
+        self.bytes_plantilla = len(contenido)
+        entradas = leer_entradas(io.BytesIO(contenido))
+        with zipfile.ZipFile(io.BytesIO(contenido)) as z:
+            partes = {n: z.read(n) for n in entradas if n.endswith((".xml", ".rels"))}
+        originales = dict(partes)
+
+        estilos = TablaEstilos(partes["xl/styles.xml"].decode("utf-8"))
+        sst = _leer_shared_strings(partes.get("xl/sharedStrings.xml", b"").decode("utf-8"))
+        rutas = hojas_del_libro(partes)
+        hojas = [Hoja(nombre, partes[ruta].decode("utf-8"), estilos, sst) for nombre, ruta in rutas]
+        crono.marcar("Abrir template")
+
+        self.capacidad = capacidad or diseno.capacidad
+        extra = self.capacidad - diseno.capacidad
+        if extra > 0:
+            puntos = {diseno.general.hoja: diseno.general.fila_fin}
+            puntos.update({p.hoja: p.fila_fin for p in diseno.parciales})
+            hojas = ampliar_libro(partes, rutas, hojas, extra, puntos)
+            crono.marcar(f"Ampliar a {self.capacidad} filas")
+        self.diseno = diseno = ampliado(diseno, self.capacidad)
+        self.merges = {h.Name: tuple(h.merges) for h in hojas}
+        por_nombre = {h.Name: h for h in hojas}
+        sheet = por_nombre[diseno.general.hoja]
+        g = diseno.general
+
+        # ========================================
+        # SECCIÓN 1: Metadata
+        # ========================================
+        for fila, col in g.metadata:
+            sheet.escribir(fila, col, "")
+        crono.contar("celdas_escritas", len(g.metadata))
+        crono.marcar("SECCIÓN 1: Metadata")
+
+        # ========================================
+        # SECCIÓN 2: Ponderaciones (sentinela -1 = "sin configurar")
+        # ========================================
+        fila, col_ini, col_fin = g.ponderaciones
+        for col in range(col_ini, col_fin + 1):  # D7:H7
+            sheet.escribir(fila, col, -1)
+        crono.contar("celdas_escritas", col_fin - col_ini + 1)
+        crono.marcar("SECCIÓN 2: Ponderaciones")
+
+        # ========================================
+        # SECCIÓN 5: Modal VBA (vbaProject.bin precompilado)
+        # ========================================
+        self.con_vba = False
+        if vba_path:
+            vba, codenames = _cargar_vba(vba_path)
+            if vba is not None:
+                _inyectar_vba(partes, vba, codenames, hojas)
+                self.con_vba = True
+
+        ct = partes["[Content_Types].xml"].decode("utf-8")
+        partes["[Content_Types].xml"] = ct.replace(CT_WORKBOOK_XLSX, CT_WORKBOOK_XLSM).encode("utf-8")
+        crono.marcar("SECCIÓN 5: Modal VBA")
+
+        # ========================================
+        # SECCIÓN 4: Proteger hojas
+        # ========================================
+        # Columnas por encabezado resueltas al derivar el diseño.
+        self.columnas = {p.hoja: p.bloqueo for p in diseno.parciales if p.bloqueo}
+        self.sin_encabezados = [p.hoja for p in diseno.parciales if not p.bloqueo]
+
+        # General: D10:H54 (hasta la última fila de alumnos)
+        crono.contar("celdas_bloqueo", sheet.bloquear_rango(
+            g.fila_ini, g.bloqueo[0], g.fila_fin, g.bloqueo[1], True))
+        sheet.proteger(PASSWORD)
+        crono.marcar(f"SECCIÓN 4: Proteger {sheet.Name}")
+        for p in diseno.parciales:
+            ws = por_nombre[p.hoja]
+            crono.contar("celdas_bloqueo", ws.bloquear_todo())
+            # D7:BJ53 (hasta la última fila de datos)
+            fila_ini, col_ini, col_fin = p.captura
+            crono.contar("celdas_bloqueo", ws.bloquear_rango(fila_ini, col_ini, p.fila_fin, col_fin, False))
+            # "Producto del Parcial" a "Porcentaje de asistencia" (BD:BJ sin encabezados)
+            col_ini, col_fin = p.bloqueo or diseno.respaldo_bloqueo
+            crono.contar("celdas_bloqueo", ws.bloquear_rango(p.fila_ini, col_ini, p.fila_fin, col_fin, True))
+            ws.proteger(PASSWORD)
+            crono.marcar(f"SECCIÓN 4: Proteger {ws.Name}")
+
+        # Compactar: los bloqueos dejan variantes de estilo sin uso o repetidas.
+        xfs_antes, xfs_despues = estilos.compactar(hojas)
+        crono.contar("xfs_descartados", xfs_antes - xfs_despues)
+        for hoja in hojas:
+            compartir_formulas(hoja)
+        crono.marcar("Compactar estilos y fórmulas")
+
+        # Los valores en caché de las fórmulas quedan desactualizados: Excel
+        # recalcula al abrir.
+        wb = partes["xl/workbook.xml"].decode("utf-8")
+        if "fullCalcOnLoad" not in wb:
+            wb = wb.replace("<calcPr ", '<calcPr fullCalcOnLoad="1" ', 1)
+        partes["xl/workbook.xml"] = wb.encode("utf-8")
+
+        # Todas las hojas salvo General quedan serializadas y comprimidas; las
+        # partes que no se tocaron se copian comprimidas tal cual.
+        self.general = sheet
+        self.ruta_general = dict(rutas)[sheet.Name]
+        for (_, ruta), hoja in zip(rutas, hojas):
+            if hoja is not sheet:
+                partes[ruta] = hoja.serializar().encode("utf-8")
+                crono.contar("nodos_xml", hoja.nodos_escritos)
+        partes["xl/styles.xml"] = estilos.serializar().encode("utf-8")
+
+        self.entradas = []
+        for nombre in list(entradas) + [n for n in partes if n not in entradas]:
+            if nombre in partes and partes[nombre] is None:
+                continue  # parte descartada (calcChain.xml al ampliar filas)
+            if nombre == self.ruta_general:
+                self.entradas.append(None)  # se comprime por solicitud
+            elif nombre in partes and partes[nombre] != originales.get(nombre):
+                self.entradas.append(comprimir(nombre, partes[nombre]))
+            else:
+                self.entradas.append(entradas[nombre])
+        crono.marcar("Comprimir partes")
+        crono.resumen("Tiempos (compilar plantilla)")
+        self.traza = crono.traza()
+        self.usada = False
+
+    def escribir(self, alumnos, salida, crono=None):
+        """Escribe el .xlsm con `alumnos` en `salida` (archivo binario abierto).
+        Devuelve el tamaño en bytes del archivo escrito."""
+        valores = {}
+        g = self.diseno.general
+        for i, alumno in enumerate(alumnos):
+            fila = g.fila_ini + i
+            valores[(fila, g.col_numero)] = i + 1
+            valores[(fila, g.col_matricula)] = alumno.get("matricula", "")
+            valores[(fila, g.col_nombre)] = alumno.get("nombre", "")
+        xml = self.general.serializar(valores).encode("utf-8")
+        if crono:
+            crono.contar("celdas_escritas", len(valores))
+            crono.contar("nodos_xml", self.general.nodos_escritos)
+            crono.marcar("SECCIÓN 3: Alumnos")
+        general = comprimir(self.ruta_general, xml)
+        tam = escribir_zip(salida, (general if e is None else e for e in self.entradas))
+        if crono:
+            crono.marcar("Guardar")
+        return tam
+
+
+_COMPILADAS = {}
+
+
+_MAX_COMPILADAS = 8
+
+
+def compilar_plantilla(template_path, vba_path=VBA_PRECOMPILADO, capacidad=None):
+    """PlantillaCompilada de `template_path`, una vez por proceso y por
+    contenido: la clave es el hash de la plantilla (y del vbaProject.bin), así
+    que se recompila sola si cualquiera de los dos cambia. Cada `capacidad`
+    de filas (ver filas_dinamicas.capacidad_para) es una variante aparte, y
+    el diseño (diseno_plantilla.py) también es parte de la clave.
+    `vba_path=None` compila sin proyecto VBA; el default exige el
+    vbaProject.bin vigente (ver proyecto_vba.vba_requerido)."""
+    from diseno_plantilla import cargar
+    diseno = cargar(template_path)
+    capacidad = capacidad or diseno.capacidad
+    if vba_path is VBA_PRECOMPILADO:
+        vba_path = vba_requerido()
+    vba_json = os.path.splitext(vba_path)[0] + ".json" if vba_path else None
+    clave = (huella_archivo(template_path),
+             huella_archivo(vba_path) if vba_path else None,
+             huella_archivo(vba_json) if vba_json else None,
+             capacidad, diseno)
+    plantilla = _COMPILADAS.pop(clave, None)
+    if plantilla is None:
+        with open(template_path, "rb") as f:
+            plantilla = PlantillaCompilada(f.read(), diseno, vba_path, capacidad)
+        # Solo se conserva la versión vigente de cada combinación de opciones.
+        for vieja in [k for k in _COMPILADAS
+                      if (k[1] is None) == (clave[1] is None) and k[3] == capacidad]:
+            del _COMPILADAS[vieja]
+        while len(_COMPILADAS) >= _MAX_COMPILADAS:
+            del _COMPILADAS[next(iter(_COMPILADAS))]  # la usada hace más tiempo
+    _COMPILADAS[clave] = plantilla  # al final: orden de uso reciente
+    return plantilla
+
+
+# ========================================
+# Generación
+# ========================================
+
+def generar_evaluacion_ooxml(data: dict, template_path: str, output_path,
+                             vba_path=VBA_PRECOMPILADO):
+    """
+    Genera el .xlsm escribiendo el OOXML directamente (sin Excel).
+    `output_path` puede ser una ruta o un archivo binario abierto. Devuelve la
+    traza de la generación (ver Cronometro.traza).
+    """
+    from diseno_plantilla import cargar
+    from filas_dinamicas import capacidad_para
+    crono = Cronometro()
+    alumnos = data.get("alumnos", [])
+    capacidad = capacidad_para(len(alumnos), cargar(template_path).capacidad)
+    plantilla = compilar_plantilla(template_path, vba_path, capacidad)
+    cache = "acierto" if plantilla.usada else "fallo"
+    plantilla.usada = True
+    crono.marcar("Plantilla compilada")
+
+    if not plantilla.con_vba:
+        print(f"Advertencia: No se encontró '{ruta_bin()}'; el archivo se genera "
+              "sin el modal VBA (GENERADOR_SIN_VBA=1, ver proyecto_vba.py).", file=sys.stderr)
+    ini, fin = plantilla.diseno.encabezados_bloqueo
+    for hoja in plantilla.sin_encabezados:
+        print(
+            f"Advertencia: no se hallaron los encabezados '{ini}'/'{fin}' en "
+            f"la hoja '{hoja}'; se usa el rango fijo BD:BJ.",
+            file=sys.stderr,
+        )
+
+    # ========================================
+    # SECCIÓN 3: Lista de Alumnos (y guardar)
+    # ========================================
+    if hasattr(output_path, "write"):
+        tam = plantilla.escribir(alumnos, output_path, crono)
+    else:
+        with open(output_path, "wb") as f:
+            tam = plantilla.escribir(alumnos, f, crono)
+    crono.resumen("Tiempos (backend OOXML)")
+    print(f"Tamaño: {tam / 1024:.1f} KB (plantilla {plantilla.bytes_plantilla / 1024:.1f} KB)",
+          file=sys.stderr)
+
+    # Lo que no depende de los alumnos (secciones 1, 2, 4 y 5) se hizo al
+    # compilar la plantilla: su traza va anidada.
+    return crono.traza(
+        backend="ooxml",
+        alumnos=len(alumnos),
+        capacidad=plantilla.capacidad,
+        columnas_encabezado=plantilla.columnas,
+        respaldo_bd_bj=plantilla.sin_encabezados,
+        bytes_salida=tam,
+        bytes_plantilla=plantilla.bytes_plantilla,
+        plantilla={"cache": cache, **plantilla.traza},
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) in (3, 4) and sys.argv[1] == "--extraer-vba":
+        extraer_vba(*sys.argv[2:])
+        print("vbaProject.bin extraído exitosamente")
+    else:
+        print("Uso: python scripts/backend_ooxml.py --extraer-vba <xlsm_generado> [destino.bin]",
+              file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,275 @@
+"""
+Benchmark de generación y verificación por tamaño de grupo.
+
+Para cada backend disponible (OOXML siempre; COM solo en Windows con Excel) y
+cada tamaño de grupo (10, 45, 200 y 1000 alumnos sintéticos) mide, en un
+proceso nuevo por caso:
+  - la primera generación (en frío): abrir/compilar la plantilla, metadata,
+    sentinelas, bloqueo por hoja, VBA y guardado, sección por sección;
+  - N generaciones más (en caliente): mediana, p95 y throughput;
+  - la verificación del archivo generado (verificar_bloqueo --rapido y, si
+    está instalado, openpyxl);
+  - el pico de memoria (RSS) del proceso;
+  - el tamaño del archivo generado frente al de la plantilla.
+
+Los resultados se comparan con una línea base JSON: una mediana más lenta que
+la base por encima de la tolerancia cuenta como regresión (código de salida 1).
+La base versionada (scripts/benchmark_baseline.json) se grabó con el backend
+OOXML en la máquina de referencia; al cambiar de máquina se vuelve a grabar
+con --guardar-baseline. Con --ci, que falte la base también es un fallo.
+El backend OOXML exige el vbaProject.bin vigente (ver proyecto_vba.py); sin
+él, GENERADOR_SIN_VBA=1 mide la generación sin el modal.
+
+Uso:
+    python scripts/benchmark_generacion.py [--backend ooxml] [--tamanos 10,45,200,1000]
+        [--repeticiones 20] [--baseline scripts/benchmark_baseline.json]
+        [--guardar-baseline] [--ci] [--tolerancia 0.25] [--json resultados.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from cronometro import Cronometro
+from generar_XLSX import BACKENDS, generar_bytes
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+DIR_SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_DEFAULT = os.path.join(DIR_SCRIPTS, "..", "templates", "Template.xlsx")
+BASELINE_DEFAULT = os.path.join(DIR_SCRIPTS, "benchmark_baseline.json")
+TAMANOS_DEFAULT = (10, 45, 200, 1000)
+
+_NOMBRES = ["ANA", "LUIS", "MARIA", "JOSE", "SOFIA", "DIEGO", "VALERIA", "JUAN", "CAMILA", "PEDRO"]
+_APELLIDOS = ["GARCIA", "HERNANDEZ", "LOPEZ", "MARTINEZ", "PEREZ", "RAMIREZ", "SANCHEZ", "TORRES"]
+
+
+def payload_sintetico(n, semilla=0):
+    """{"alumnos": [...]} con `n` alumnos deterministas."""
+    rnd = random.Random(semilla)
+    return {"alumnos": [
+        {"matricula": str(2250000000 + rnd.randrange(10_000_000)),
+         "nombre": f"{rnd.choice(_APELLIDOS)} {rnd.choice(_APELLIDOS)} {rnd.choice(_NOMBRES)}"}
+        for _ in range(n)
+    ]}
+
+
+def backends_disponibles():
+    disponibles = ["ooxml"]
+    if sys.platform == "win32":
+        try:
+            import win32com.client  # noqa: F401
+            disponibles.insert(0, "com")
+        except ImportError:
+            pass
+    return disponibles
+
+
+def _pico_rss_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB; macOS, bytes.
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _fases(titulos):
+    """Secciones de los últimos resúmenes del Cronometro, en ms."""
+    fases = {}
+    for titulo in titulos:
+        for seccion, dur in Cronometro.ultimos.get(titulo, []):
+            if seccion != "Total":
+                fases[seccion] = round(dur * 1000, 2)
+    return fases
+
+
+def medir_caso(backend, n, template_path, repeticiones):
+    """Corre un caso completo (se ejecuta en un proceso nuevo)."""
+    data = payload_sintetico(n)
+    # Se mide la generación, no la caché de salida.
+    os.environ.pop("GENERADOR_CACHE_DIR", None)
+    excel = None
+    if backend == "com":
+        from generar_XLSX import iniciar_excel
+        excel = iniciar_excel()
+
+    silencio = io.StringIO()
+    try:
+        with contextlib.redirect_stderr(silencio):
+            t0 = time.perf_counter()
+            contenido, _ = generar_bytes(data, template_path, backend, excel=excel)
+            frio_ms = (time.perf_counter() - t0) * 1000
+            fases_frio = _fases(["Tiempos (compilar plantilla)", "Tiempos (backend OOXML)",
+                                 "Tiempos (backend COM)"])
+
+            tiempos = []
+            for _ in range(repeticiones):
+                t0 = time.perf_counter()
+                generar_bytes(data, template_path, backend, excel=excel)
+                tiempos.append((time.perf_counter() - t0) * 1000)
+            fases_caliente = _fases(["Tiempos (backend OOXML)", "Tiempos (backend COM)"])
+    finally:
+        if excel is not None:
+            excel.Quit()
+
+    verificacion = {}
+    fd, ruta = tempfile.mkstemp(suffix=".xlsm")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(contenido)
+        import verificar_bloqueo
+        for modo, rapido in (("rapido", True), ("openpyxl", False)):
+            if not rapido:
+                try:
+                    import openpyxl  # noqa: F401
+                except ImportError:
+                    continue
+            with contextlib.redirect_stderr(silencio), contextlib.redirect_stdout(silencio):
+                t0 = time.perf_counter()
+                r = verificar_bloqueo.verificar_archivo(ruta, rapido)
+            verificacion[modo] = {"ms": round((time.perf_counter() - t0) * 1000, 1),
+                                  "ok": r["ok"]}
+    finally:
+        os.unlink(ruta)
+
+    mediana = statistics.median(tiempos) if tiempos else frio_ms
+    return {
+        "backend": backend,
+        "alumnos": n,
+        "bytes": len(contenido),
+        "bytes_plantilla": os.path.getsize(template_path),
+        "frio_ms": round(frio_ms, 1),
+        "fases_frio_ms": fases_frio,
+        "mediana_ms": round(mediana, 2),
+        "p95_ms": round(sorted(tiempos)[int(0.95 * (len(tiempos) - 1))], 2) if tiempos else None,
+        "fases_caliente_ms": fases_caliente,
+        "archivos_por_s": round(1000 / mediana, 1) if mediana else None,
+        "alumnos_por_s": round(n * 1000 / mediana) if mediana else None,
+        "verificacion": verificacion,
+        "pico_rss_mb": _pico_rss_mb(),
+    }
+
+
+def _clave(r):
+    return f"{r['backend']}/{r['alumnos']}"
+
+
+def comparar(resultados, baseline, tolerancia):
+    """Regresiones (mediana en caliente y verificación rápida) contra la base."""
+    regresiones = []
+    for r in resultados:
+        base = baseline.get(_clave(r))
+        if not base:
+            continue
+        pares = [("mediana_ms", r["mediana_ms"], base.get("mediana_ms"))]
+        v, vb = r["verificacion"].get("rapido"), base.get("verificacion", {}).get("rapido")
+        if v and vb:
+            pares.append(("verificacion_rapido_ms", v["ms"], vb["ms"]))
+        for metrica, actual, anterior in pares:
+            if anterior and actual > anterior * (1 + tolerancia):
+                regresiones.append(f"{_clave(r)} {metrica}: {anterior} -> {actual} ms "
+                                   f"(+{(actual / anterior - 1) * 100:.0f}%)")
+    return regresiones
+
+
+def imprimir_tabla(resultados):
+    print(f"{'caso':<14} {'frío ms':>9} {'mediana':>9} {'p95':>9} {'arch/s':>8} "
+          f"{'verif ms':>9} {'RSS MB':>8} {'KB':>7} {'vs plantilla':>13}")
+    for r in resultados:
+        verif = r["verificacion"].get("rapido", {}).get("ms", "")
+        print(f"{_clave(r):<14} {r['frio_ms']:>9} {r['mediana_ms']:>9} {r['p95_ms'] or '':>9} "
+              f"{r['archivos_por_s'] or '':>8} {verif:>9} {r['pico_rss_mb'] or 'n/d':>8} "
+              f"{r['bytes'] // 1024:>7} {r['bytes'] / r['bytes_plantilla'] - 1:>+13.1%}")
+    for r in resultados:
+        print(f"\n{_clave(r)} fases (frío):")
+        for seccion, ms in r["fases_frio_ms"].items():
+            print(f"  {seccion:<32} {ms:9.2f} ms")
+        print(f"{_clave(r)} fases (caliente, última):")
+        for seccion, ms in r["fases_caliente_ms"].items():
+            print(f"  {seccion:<32} {ms:9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="benchmark_generacion.py",
+        description="Mide generación y verificación por backend y tamaño de grupo.",
+    )
+    parser.add_argument("--backend", choices=BACKENDS, action="append",
+                        help="backend a medir (repetible; default: todos los disponibles)")
+    parser.add_argument("--tamanos", default=",".join(map(str, TAMANOS_DEFAULT)),
+                        help="alumnos por caso, separados por coma (default: 10,45,200,1000)")
+    parser.add_argument("--repeticiones", type=int, default=20,
+                        help="generaciones en caliente por caso (default: 20)")
+    parser.add_argument("--template", default=TEMPLATE_DEFAULT)
+    parser.add_argument("--baseline", default=BASELINE_DEFAULT,
+                        help="línea base JSON para detectar regresiones")
+    parser.add_argument("--guardar-baseline", action="store_true",
+                        help="guarda estos resultados como la nueva línea base")
+    parser.add_argument("--ci", action="store_true",
+                        help="sin línea base es un fallo (código de salida 1) en lugar de un aviso")
+    parser.add_argument("--tolerancia", type=float, default=0.25,
+                        help="fracción tolerada sobre la base (default: 0.25)")
+    parser.add_argument("--json", metavar="ruta", help="escribe los resultados completos")
+    args = parser.parse_args()
+
+    backends = args.backend or backends_disponibles()
+    tamanos = [int(t) for t in args.tamanos.split(",") if t.strip()]
+    if "ooxml" in backends:
+        from proyecto_vba import vba_requerido
+        try:
+            vba_requerido()
+        except FileNotFoundError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    resultados = []
+    for backend in backends:
+        for n in tamanos:
+            # Proceso nuevo por caso: medición en frío real y pico de RSS propio.
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                resultados.append(pool.submit(medir_caso, backend, n, args.template,
+                                              args.repeticiones).result())
+            print(f"  {backend}/{n}: {resultados[-1]['mediana_ms']} ms", file=sys.stderr)
+
+    imprimir_tabla(resultados)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+
+    if args.guardar_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({_clave(r): r for r in resultados}, f, ensure_ascii=False, indent=2)
+        print(f"\nLínea base guardada en {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nSin línea base ({args.baseline}); usa --guardar-baseline para crearla.")
+        if args.ci:
+            sys.exit(1)
+        return
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regresiones = comparar(resultados, baseline, args.tolerancia)
+    print("\n" + ("=" * 40))
+    if regresiones:
+        print(f"REGRESIONES (tolerancia {args.tolerancia:.0%}):")
+        for linea in regresiones:
+            print(f"  {linea}")
+        sys.exit(1)
+    print("Sin regresiones respecto a la línea base.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Caché en disco de archivos .xlsm ya generados, direccionada por contenido.
+
+La clave es el SHA-256 de:
+  - el payload normalizado (solo lo que afecta la salida: número, matrícula y
+    nombre de cada alumno, en orden),
+  - el hash del contenido de la plantilla, de su .diseno.json y del
+    vbaProject.bin precompilado,
+  - el backend y la versión del generador (VERSION_GENERADOR),
+así que una misma lista de alumnos con la misma plantilla se sirve desde disco
+sin generar nada, y cualquier cambio de plantilla o de generador invalida las
+entradas viejas (quedan huérfanas y las desaloja el LRU).
+
+Se activa con la variable de entorno GENERADOR_CACHE_DIR (o `--cache DIR` en
+generar_XLSX.py); GENERADOR_CACHE_MB fija el tope de tamaño (default 512). Al
+pasar del tope se borran los archivos usados hace más tiempo (la fecha de
+modificación se actualiza en cada acierto).
+"""
+
+import hashlib
+import json
+import os
+
+from backend_ooxml import huella_archivo
+from diseno_plantilla import ruta_diseno
+from proyecto_vba import vba_precompilado
+
+
+CACHE_MB_DEFAULT = 512
+
+
+def payload_normalizado(data):
+    """JSON canónico de lo que determina el archivo generado."""
+    alumnos = [[a.get("matricula", ""), a.get("nombre", "")] for a in data.get("alumnos", [])]
+    return json.dumps(alumnos, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+class CacheSalidas:
+    """Directorio de `<clave>.xlsm` con tope de tamaño y desalojo LRU."""
+
+    def __init__(self, directorio, max_bytes=CACHE_MB_DEFAULT * 1024 * 1024):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.aciertos = 0
+        self.fallos = 0
+        os.makedirs(directorio, exist_ok=True)
+
+    def clave(self, data, template_path, backend, version):
+        h = hashlib.sha256()
+        for parte in (payload_normalizado(data), huella_archivo(template_path), backend, version):
+            h.update(str(parte).encode("utf-8"))
+            h.update(b"\0")
+        vba = vba_precompilado()
+        if vba:
+            for ruta in (vba, os.path.splitext(vba)[0] + ".json"):
+                h.update(str(huella_archivo(ruta)).encode("utf-8"))
+        # El .diseno.json se puede corregir a mano (ver diseno_plantilla.py).
+        h.update(str(huella_archivo(ruta_diseno(template_path))).encode("utf-8"))
+        return h.hexdigest()
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.xlsm")
+
+    def obtener(self, clave):
+        """Contenido en caché o None. Cuenta el acierto/fallo."""
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, "rb") as f:
+                contenido = f.read()
+            os.utime(ruta)  # recencia para el LRU
+        except FileNotFoundError:
+            self.fallos += 1
+            return None
+        self.aciertos += 1
+        return contenido
+
+    def guardar(self, clave, contenido):
+        """Escribe la entrada de forma atómica y desaloja hasta el tope."""
+        import tempfile
+        fd, tmp = tempfile.mkstemp(dir=self.directorio, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(contenido)
+            os.replace(tmp, self._ruta(clave))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        self._desalojar()
+
+    def _desalojar(self):
+        entradas = []
+        total = 0
+        for e in os.scandir(self.directorio):
+            if e.is_file() and e.name.endswith(".xlsm"):
+                st = e.stat()
+                entradas.append((st.st_mtime, st.st_size, e.path))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return
+        for _, tam, ruta in sorted(entradas):
+            try:
+                os.unlink(ruta)
+            except FileNotFoundError:
+                continue  # otro proceso ya la desalojó
+            total -= tam
+            if total <= self.max_bytes:
+                break
+
+    def estadisticas(self, resultado=None):
+        return {
+            **({"resultado": resultado} if resultado else {}),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+        }
+
+
+_CACHE = {}
+
+
+def cache_por_defecto():
+    """CacheSalidas configurada por GENERADOR_CACHE_DIR (None si no está)."""
+    directorio = os.environ.get("GENERADOR_CACHE_DIR")
+    if not directorio:
+        return None
+    max_mb = float(os.environ.get("GENERADOR_CACHE_MB", CACHE_MB_DEFAULT))
+    clave = (os.path.abspath(directorio), max_mb)
+    if clave not in _CACHE:
+        _CACHE[clave] = CacheSalidas(directorio, int(max_mb * 1024 * 1024))
+    return _CACHE[clave]
@@ -0,0 +1,256 @@
+"""
+Cola de trabajos en disco para la generación asíncrona (/api/generar/trabajos).
+
+El cliente (lib/cola-generacion.ts) encola y consulta; este módulo atiende la
+cola con un número fijo de workers, así que las solicitudes concurrentes
+esperan en disco en lugar de abrir un proceso (o un Excel) cada una.
+
+Estructura del directorio (GENERADOR_COLA_DIR):
+    pendientes/<id>.json    {"id": ..., "data": {"alumnos": [...]}}, en orden de id
+    en_proceso/<id>.json    el mismo archivo, movido (os.rename) por quien lo toma
+    estado/<id>.json        {"id", "estado", "creado", "iniciado", "terminado",
+                             "seccion", "secciones": {sección: ms}, "bytes", "ms", "error"}
+    resultados/<id>.xlsm    el archivo generado
+Estados: pendiente -> en_proceso -> listo | error. El id empieza con la
+marca de tiempo en ms (13 dígitos), así que el orden de nombre es el de
+llegada. Todas las escrituras son atómicas (archivo temporal + os.replace).
+
+Por stdout sale una línea JSON por trabajo terminado ({"id", "ok", "traza"} o
+{"id", "ok": false, "error"}); cualquier línea por stdin despierta al
+despachador antes del siguiente sondeo y cerrar stdin lo detiene (los
+trabajos pendientes quedan en disco para el próximo arranque).
+
+Uso:
+    python scripts/generar_XLSX.py --cola <dir> [--workers N] [--backend ooxml] <template_path>
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from cronometro import Cronometro
+from generar_XLSX import generar_bytes
+from servidor_generacion import _listo, _worker, iniciar_worker
+
+
+SUBDIRS = ("pendientes", "en_proceso", "estado", "resultados")
+SONDEO_S = 0.5
+TTL_RESULTADOS_S = 3600
+LIMPIEZA_CADA_S = 60
+
+
+def _escribir_atomico(ruta, contenido):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(contenido)
+        os.replace(tmp, ruta)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def nuevo_id():
+    """Id ordenable por llegada: `<ms epoch, 13 dígitos>-<uuid4>`."""
+    return f"{int(time.time() * 1000):013d}-{uuid.uuid4()}"
+
+
+class ColaTrabajos:
+    """Operaciones sobre el directorio de la cola (ver docstring del módulo)."""
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        for sub in SUBDIRS:
+            os.makedirs(os.path.join(directorio, sub), exist_ok=True)
+
+    def _ruta(self, sub, id_trabajo, ext=".json"):
+        return os.path.join(self.directorio, sub, id_trabajo + ext)
+
+    def encolar(self, data):
+        """Agrega un trabajo y devuelve su id (el cliente de Node hace lo mismo)."""
+        id_trabajo = nuevo_id()
+        self._escribir_estado(id_trabajo, {"id": id_trabajo, "estado": "pendiente",
+                                           "creado": time.time()})
+        _escribir_atomico(self._ruta("pendientes", id_trabajo),
+                          json.dumps({"id": id_trabajo, "data": data},
+                                     ensure_ascii=False).encode("utf-8"))
+        return id_trabajo
+
+    def estado(self, id_trabajo):
+        try:
+            with open(self._ruta("estado", id_trabajo), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _escribir_estado(self, id_trabajo, estado):
+        _escribir_atomico(self._ruta("estado", id_trabajo),
+                          json.dumps(estado, ensure_ascii=False).encode("utf-8"))
+
+    def actualizar(self, id_trabajo, **cambios):
+        estado = self.estado(id_trabajo) or {"id": id_trabajo}
+        estado.update(cambios)
+        self._escribir_estado(id_trabajo, estado)
+        return estado
+
+    def tomar(self):
+        """Mueve el trabajo pendiente más antiguo a en_proceso y devuelve su
+        id (None si no hay). El rename es atómico: un trabajo lo toma uno solo."""
+        for nombre in sorted(os.listdir(os.path.join(self.directorio, "pendientes"))):
+            if not nombre.endswith(".json"):
+                continue
+            id_trabajo = nombre[:-len(".json")]
+            try:
+                os.rename(self._ruta("pendientes", id_trabajo), self._ruta("en_proceso", id_trabajo))
+            except FileNotFoundError:
+                continue
+            self.actualizar(id_trabajo, estado="en_proceso", iniciado=time.time(),
+                            seccion=None, secciones={})
+            return id_trabajo
+        return None
+
+    def leer_trabajo(self, id_trabajo):
+        with open(self._ruta("en_proceso", id_trabajo), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def terminar(self, id_trabajo, contenido, ms):
+        _escribir_atomico(self._ruta("resultados", id_trabajo, ".xlsm"), contenido)
+        self.actualizar(id_trabajo, estado="listo", terminado=time.time(),
+                        bytes=len(contenido), ms=round(ms, 1))
+        self._soltar(id_trabajo)
+
+    def fallar(self, id_trabajo, error):
+        self.actualizar(id_trabajo, estado="error", terminado=time.time(), error=error)
+        self._soltar(id_trabajo)
+
+    def _soltar(self, id_trabajo):
+        try:
+            os.unlink(self._ruta("en_proceso", id_trabajo))
+        except FileNotFoundError:
+            pass
+
+    def recuperar(self):
+        """Regresa a pendientes los trabajos que quedaron en proceso (el
+        despachador anterior terminó a medias). Devuelve cuántos."""
+        n = 0
+        for nombre in os.listdir(os.path.join(self.directorio, "en_proceso")):
+            if nombre.endswith(".json"):
+                id_trabajo = nombre[:-len(".json")]
+                os.replace(self._ruta("en_proceso", id_trabajo), self._ruta("pendientes", id_trabajo))
+                self.actualizar(id_trabajo, estado="pendiente", iniciado=None)
+                n += 1
+        return n
+
+    def limpiar(self, ttl=TTL_RESULTADOS_S):
+        """Borra estado y resultado de los trabajos terminados hace más de `ttl` s."""
+        limite = time.time() - ttl
+        for nombre in os.listdir(os.path.join(self.directorio, "estado")):
+            if not nombre.endswith(".json"):
+                continue
+            id_trabajo = nombre[:-len(".json")]
+            estado = self.estado(id_trabajo)
+            if not estado or estado.get("estado") not in ("listo", "error"):
+                continue
+            if (estado.get("terminado") or 0) < limite:
+                for ruta in (self._ruta("resultados", id_trabajo, ".xlsm"),
+                             self._ruta("estado", id_trabajo)):
+                    try:
+                        os.unlink(ruta)
+                    except FileNotFoundError:
+                        pass
+
+
+def procesar_trabajo(directorio, id_trabajo):
+    """Genera un trabajo tomado (en un worker). Reporta cada sección en el
+    estado conforme termina. Devuelve (ok, traza o error)."""
+    cola = ColaTrabajos(directorio)
+    t0 = time.perf_counter()
+    secciones = {}
+
+    def observador(seccion, segundos):
+        secciones[seccion] = round(segundos * 1000, 2)
+        cola.actualizar(id_trabajo, seccion=seccion, secciones=secciones)
+
+    Cronometro.observador = observador
+    try:
+        data = cola.leer_trabajo(id_trabajo)["data"]
+        contenido, traza = generar_bytes(data, _worker["template_path"], _worker["backend"],
+                                         excel=_worker["excel"])
+    except Exception as e:
+        cola.fallar(id_trabajo, str(e))
+        return False, str(e)
+    finally:
+        Cronometro.observador = None
+    cola.terminar(id_trabajo, contenido, (time.perf_counter() - t0) * 1000)
+    return True, traza
+
+
+def atender(directorio, template_path, backend, workers, fd_entrada=0, salida=None):
+    """Despachador: toma trabajos de la cola mientras haya workers libres."""
+    salida = salida or sys.stdout
+    sys.stdout = sys.stderr  # ver iniciar_worker
+    cola = ColaTrabajos(directorio)
+    recuperados = cola.recuperar()
+    if recuperados:
+        print(f"Cola: {recuperados} trabajo(s) en proceso regresaron a pendientes",
+              file=sys.stderr)
+
+    libres = threading.Semaphore(workers)
+    aviso = threading.Event()
+    fin = threading.Event()
+    candado = threading.Lock()
+
+    def reportar(evento):
+        with candado:
+            salida.write(json.dumps(evento, ensure_ascii=False) + "\n")
+            salida.flush()
+
+    def escuchar():
+        # os.read y no sys.stdin: un hilo bloqueado en sys.stdin retiene su
+        # candado y los workers creados con fork se colgarían al cerrarlo.
+        while os.read(fd_entrada, 4096):
+            aviso.set()
+        fin.set()
+        aviso.set()
+
+    threading.Thread(target=escuchar, daemon=True).start()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=iniciar_worker,
+                             initargs=(template_path, backend)) as pool:
+        for f in [pool.submit(_listo) for _ in range(workers)]:
+            f.result()
+        print(f"Cola de generación lista ({workers} workers, backend {backend}): {directorio}",
+              file=sys.stderr)
+
+        ultima_limpieza = 0.0
+        while not fin.is_set():
+            if time.monotonic() - ultima_limpieza > LIMPIEZA_CADA_S:
+                cola.limpiar()
+                ultima_limpieza = time.monotonic()
+
+            libres.acquire()
+            id_trabajo = cola.tomar()
+            if id_trabajo is None:
+                libres.release()
+                aviso.wait(SONDEO_S)
+                aviso.clear()
+                continue
+
+            def terminado(futuro, id_trabajo=id_trabajo):
+                try:
+                    ok, detalle = futuro.result()
+                except Exception as e:  # worker caído (BrokenProcessPool, ...)
+                    ok, detalle = False, str(e)
+                    cola.fallar(id_trabajo, detalle)
+                libres.release()
+                aviso.set()
+                reportar({"id": id_trabajo, "ok": True, "traza": detalle} if ok
+                         else {"id": id_trabajo, "ok": False, "error": detalle})
+
+            pool.submit(procesar_trabajo, directorio, id_trabajo).add_done_callback(terminado)
@@ -0,0 +1,211 @@
+"""
+Comprobación de extremo a extremo del modo delta (actualizar_alumnos.py).
+
+Para cada caso genera un .xlsm con el backend OOXML y, en cada paso, captura
+una calificación por alumno en la primera columna de captura de cada hoja
+Parcial y aplica el delta al resultado del paso anterior (como lo haría
+generar_XLSX.py --delta: leer_delta y aplicar_delta). Sobre el resultado
+final revisa que:
+  - verificar_bloqueo (--rapido) pasa todos los criterios;
+  - la lista de General es la esperada (actuales sin bajas + altas);
+  - cada calificación capturada sigue a su alumno, también las capturadas en
+    filas agregadas al ampliar el archivo, y las filas de las altas del
+    último paso quedan vacías.
+Los deltas que exceden las filas de alumnos amplían el archivo. Los deltas
+mal formados deben rechazarse con ValueError, sin escribir la salida.
+
+Cualquier caso que no se comporta así es un fallo (código de salida 1).
+
+Uso:
+    python scripts/comprobar_delta.py [--plantilla templates/Template.xlsx]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import zipfile
+
+from actualizar_alumnos import aplicar_delta, leer_delta
+from backend_ooxml import (
+    Hoja, TablaEstilos, _leer_shared_strings, generar_evaluacion_ooxml, hojas_del_libro,
+)
+from diseno_plantilla import TEMPLATE_DEFAULT, ampliado, ultima_fila_datos
+from diseno_plantilla import cargar as cargar_diseno
+from verificar_bloqueo import HojaStream, _hojas_del_libro, _shared_strings, tabla_locked
+from verificar_bloqueo import verificar_archivo
+from zip_rapido import comprimir, escribir_zip, leer_entradas
+
+
+# nombre -> (alumnos generados, pasos); cada paso es (altas, índices de bajas)
+# y se aplica sobre el resultado del anterior.
+CASOS = {
+    "dentro de la plantilla (44 -> 45)": (44, [(2, (7,))]),
+    "excede la plantilla (44 -> 46)": (44, [(3, (5,))]),
+    "excede un archivo ampliado (120 -> 130)": (120, [(12, (0, 60))]),
+    "vacía el archivo (10 -> 0)": (10, [(0, tuple(range(10)))]),
+    # El segundo paso recorre las capturas hechas en las filas ampliadas.
+    "captura en filas ampliadas (44 -> 52 -> 55)": (44, [(8, ()), (4, (2,))]),
+}
+
+# nombre -> (alumnos generados, JSON del delta): deben rechazarse.
+RECHAZOS = {
+    "'bajas' no es una lista": (10, {"bajas": "2250000001"}),
+    "'altas' sin objetos": (10, {"altas": ["2250010000"]}),
+}
+
+
+def _matricula(i):
+    return str(2250000000 + i)
+
+
+def _captura(matricula):
+    return int(matricula) % 97 + 1
+
+
+def capturar(xlsm_path, diseno):
+    """Escribe _captura(matrícula) en la primera columna de captura de cada
+    hoja Parcial, en la fila de cada alumno (como lo haría el docente)."""
+    entradas = leer_entradas(xlsm_path)
+    with zipfile.ZipFile(xlsm_path) as z:
+        partes = {n: z.read(n) for n in entradas if n.endswith((".xml", ".rels"))}
+    estilos = TablaEstilos(partes["xl/styles.xml"].decode("utf-8"))
+    sst = _leer_shared_strings(partes.get("xl/sharedStrings.xml", b"").decode("utf-8"))
+    rutas = dict(hojas_del_libro(partes))
+    g = diseno.general
+    general = Hoja(g.hoja, partes[rutas[g.hoja]].decode("utf-8"), estilos, sst)
+    filas = ultima_fila_datos(general, g.fila_ini, g.col_nombre) - g.fila_ini + 1
+    matriculas = [general.valor(g.fila_ini + i, g.col_matricula) for i in range(filas)]
+    nuevas = {}
+    for p in diseno.parciales:
+        hoja = Hoja(p.hoja, partes[rutas[p.hoja]].decode("utf-8"), estilos, sst)
+        for i, matricula in enumerate(matriculas):
+            if matricula not in (None, ""):
+                hoja.escribir(p.fila_ini + i, p.muestra[0], _captura(matricula))
+        nuevas[rutas[p.hoja]] = hoja.serializar().encode("utf-8")
+    with open(xlsm_path, "wb") as f:
+        escribir_zip(f, [comprimir(n, nuevas[n]) if n in nuevas else e
+                         for n, e in entradas.items()])
+
+
+def leer_resultado(xlsm_path, diseno, n):
+    """[(matrícula, {hoja: captura})] de las primeras `n` filas de alumnos."""
+    g = diseno.general
+    diseno = ampliado(diseno, max(diseno.capacidad, n))
+    with zipfile.ZipFile(xlsm_path) as z:
+        locked, sst, rutas = tabla_locked(z), _shared_strings(z), dict(_hojas_del_libro(z))
+        filas = range(g.fila_ini, g.fila_ini + n)
+        general = HojaStream(g.hoja, z, rutas[g.hoja], locked, sst, filas=filas, valores=filas)
+        parciales = []
+        for p in diseno.parciales:
+            filas = range(p.fila_ini, p.fila_ini + n)
+            parciales.append((p, HojaStream(p.hoja, z, rutas[p.hoja], locked, sst,
+                                            filas=filas, valores=filas)))
+    return [(str(general.valor(g.fila_ini + i, g.col_matricula)),
+             {p.hoja: ws.valor(p.fila_ini + i, p.muestra[0]) for p, ws in parciales})
+            for i in range(n)]
+
+
+def _generar(directorio, plantilla, n):
+    origen = os.path.join(directorio, "origen.xlsm")
+    data = {"alumnos": [{"matricula": _matricula(i), "nombre": f"ALUMNO {i}"} for i in range(n)]}
+    with contextlib.redirect_stderr(io.StringIO()):
+        generar_evaluacion_ooxml(data, plantilla, origen, vba_path=None)
+    return origen
+
+
+def _aplicar(directorio, origen, delta, salida, diseno):
+    """Aplica `delta` como generar_XLSX.py --delta: desde un archivo JSON."""
+    ruta = os.path.join(directorio, "delta.json")
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(delta, f)
+    with contextlib.redirect_stderr(io.StringIO()):
+        aplicar_delta(origen, leer_delta(ruta), salida, diseno)
+
+
+def correr_caso(directorio, plantilla, diseno, n, pasos):
+    """Lista de fallas del caso (vacía si se comporta como se espera)."""
+    actual = _generar(directorio, plantilla, n)
+    esperada = [_matricula(i) for i in range(n)]
+    altas_set = set()
+    for k, (altas, bajas) in enumerate(pasos):
+        capturar(actual, diseno)
+        delta = {"altas": [{"matricula": _matricula(10000 + 100 * k + j), "nombre": f"ALTA {k}.{j}"}
+                           for j in range(altas)],
+                 "bajas": [_matricula(i) for i in bajas]}
+        salida = os.path.join(directorio, f"paso{k}.xlsm")
+        try:
+            _aplicar(directorio, actual, delta, salida, diseno)
+        except ValueError as e:
+            return [f"paso {k + 1} rechazado: {e}"]
+        bajas_set = set(delta["bajas"])
+        altas_set = {a["matricula"] for a in delta["altas"]}
+        esperada = [m for m in esperada if m not in bajas_set] + [
+            a["matricula"] for a in delta["altas"]]
+        actual = salida
+
+    fallas = []
+    r = verificar_archivo(actual, True, diseno)
+    if not r["ok"]:
+        for h in r["hojas"]:
+            for criterio in ("fallas_encabezado", "fallas_bd_bj", "fallas_editables"):
+                if h.get(criterio):
+                    fallas.append(f"verificador, {h['hoja']} {criterio}: {h[criterio][:5]}")
+        if r["error"]:
+            fallas.append(f"verificador: {r['error']}")
+    # Las altas del último paso no tienen captura; todos los demás sí.
+    for i, (matricula, capturas) in enumerate(leer_resultado(actual, diseno, len(esperada))):
+        if matricula != esperada[i]:
+            fallas.append(f"fila {i + 1}: matrícula {matricula}, se esperaba {esperada[i]}")
+            continue
+        valor = None if matricula in altas_set else _captura(matricula)
+        for hoja, captura in capturas.items():
+            if captura != valor:
+                fallas.append(f"{hoja}, alumno {matricula}: captura {captura!r}, "
+                              f"se esperaba {valor!r}")
+    return fallas
+
+
+def correr_rechazo(directorio, plantilla, diseno, n, delta):
+    """Lista de fallas de un delta que debe rechazarse."""
+    origen = _generar(directorio, plantilla, n)
+    salida = os.path.join(directorio, "rechazo.xlsm")
+    if os.path.exists(salida):
+        os.unlink(salida)
+    try:
+        _aplicar(directorio, origen, delta, salida, diseno)
+    except ValueError:
+        return [] if not os.path.exists(salida) else ["se rechazó pero escribió la salida"]
+    return ["se aceptó un delta mal formado"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--plantilla", default=TEMPLATE_DEFAULT, help="plantilla base")
+    args = parser.parse_args()
+
+    diseno = cargar_diseno(args.plantilla)
+    directorio = tempfile.mkdtemp(prefix="comprobar_delta_")
+    total = 0
+    try:
+        casos = [(nombre, "verificación", correr_caso, n, pasos)
+                 for nombre, (n, pasos) in CASOS.items()]
+        casos += [(nombre, "rechazo", correr_rechazo, n, delta)
+                  for nombre, (n, delta) in RECHAZOS.items()]
+        for nombre, esperado, correr, n, extra in casos:
+            fallas = correr(directorio, args.plantilla, diseno, n, extra)
+            total += len(fallas)
+            print(f"[{'FALLA' if fallas else 'ok':>5}] {nombre} ({esperado})")
+            for falla in fallas[:10]:
+                print(f"        {falla}")
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+    sys.exit(1 if total else 0)
+
+
+if __name__ == "__main__":
+    main()
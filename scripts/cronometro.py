@@ -0,0 +1,55 @@
+"""
+Cronómetro de secciones de la generación, compartido por generar_XLSX.py, los
+backends y los modos que reportan traza (delta, salidas ligeras, cola).
+
+En un módulo aparte para que los backends no importen el CLI (generar_XLSX.py)
+solo por esta clase: al correr generar_XLSX.py, importarlo por nombre lo
+cargaba por segunda vez.
+"""
+
+import sys
+import time
+
+
+class Cronometro:
+    """Acumula la duración de cada sección de la generación y la imprime en
+    stderr al final, para comparar backends y cambios de rendimiento. El
+    último resumen de cada título queda en `Cronometro.ultimos` (lo lee
+    benchmark_generacion.py). Si `Cronometro.observador` no es None, se le
+    llama con (sección, segundos) en cada marca (progreso de la cola de
+    trabajos, ver cola_trabajos.py)."""
+
+    ultimos = {}
+    observador = None
+
+    def __init__(self):
+        self.tiempos = []
+        self.contadores = {}
+        self._inicio = self._t = time.perf_counter()
+
+    def marcar(self, seccion):
+        ahora = time.perf_counter()
+        self.tiempos.append((seccion, ahora - self._t))
+        if Cronometro.observador is not None:
+            Cronometro.observador(seccion, ahora - self._t)
+        self._t = ahora
+
+    def contar(self, clave, n=1):
+        """Suma `n` al contador `clave` (celdas escritas, llamadas COM, nodos XML...)."""
+        self.contadores[clave] = self.contadores.get(clave, 0) + n
+
+    def traza(self, **datos):
+        """Duraciones por sección, contadores y `datos` como dict serializable."""
+        return {
+            **datos,
+            "secciones_ms": {seccion: round(dur * 1000, 2) for seccion, dur in self.tiempos},
+            "total_ms": round((time.perf_counter() - self._inicio) * 1000, 2),
+            **self.contadores,
+        }
+
+    def resumen(self, titulo="Tiempos"):
+        total = time.perf_counter() - self._inicio
+        Cronometro.ultimos[titulo] = self.tiempos + [("Total", total)]
+        lineas = [f"  {seccion:<32} {dur * 1000:9.1f} ms" for seccion, dur in self.tiempos]
+        print(f"{titulo}:\n" + "\n".join(lineas) + f"\n  {'Total':<32} {total * 1000:9.1f} ms",
+              file=sys.stderr)
@@ -0,0 +1,332 @@
+"""
+Diseño de la plantilla: dónde van los datos, derivado una sola vez.
+
+El generador (ambos backends), el verificador y el extractor necesitan las
+mismas coordenadas: celdas de metadata, fila de ponderaciones, columnas y
+filas de la lista de alumnos, rangos de captura y de bloqueo de cada hoja.
+En lugar de fijarlas en el código, se derivan de la plantilla por sus
+etiquetas y encabezados:
+  - metadata: la celda a la derecha (después de la combinada) de cada
+    etiqueta de ETIQUETAS_METADATA en la primera hoja;
+  - ponderaciones: dos filas debajo de la etiqueta "Ponderaciones" (la de en
+    medio lleva los nombres, que también se guardan), en las columnas que
+    abarca la etiqueta;
+  - lista de alumnos: la fila con los encabezados ENCABEZADOS_ALUMNOS; los
+    datos empiezan en la primera fila con número 1 y terminan en la última
+    fila seguida con celdas a la derecha de "Nombre";
+  - bloqueo: de BLOQUEO_GENERAL / BLOQUEO_PARCIAL (primer y último
+    encabezado del rango) en la fila de encabezados de cada hoja;
+  - captura (hojas Parcial): de la columna siguiente a "Nombre" al último
+    encabezado, desde la fila siguiente a la de encabezados.
+La primera hoja es la General; las demás hojas con lista de alumnos son las
+Parcial.
+
+El resultado se versiona junto a la plantilla como <plantilla>.diseno.json
+con la huella (SHA-256) de la plantilla: mientras coincida se usa tal cual,
+así que una plantilla cuyo diseño no se deriva bien se puede corregir
+editando el .json. Solo este script lo escribe; si falta o la plantilla
+cambió, `cargar` deriva el diseño en memoria y lo advierte, sin tocar
+templates/ en tiempo de ejecución.
+
+Uso (regenera el .diseno.json):
+    python scripts/diseno_plantilla.py [templates/Template.xlsx]
+"""
+
+import json
+import os
+import sys
+from collections import namedtuple
+
+from indice_encabezados import IndiceEncabezados, normalizar
+from referencias import num_a_col
+
+
+DIR_SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_DEFAULT = os.path.join(DIR_SCRIPTS, "..", "templates", "Template.xlsx")
+VERSION_DISENO = 2
+
+ETIQUETAS_METADATA = ("Grupo:", "Asignatura:", "Docente:")
+ETIQUETA_PONDERACIONES = "Ponderaciones"
+ENCABEZADOS_ALUMNOS = ("No.", "Matrícula", "Nombre")
+BLOQUEO_GENERAL = ("Parcial 1", "Asistencia")
+BLOQUEO_PARCIAL = ("Producto del Parcial", "Porcentaje de asistencia")
+# Rango fijo (BD:BJ = 56..62) si una hoja Parcial no tiene esos encabezados.
+RESPALDO_BLOQUEO = (56, 62)
+MAX_FILA_ENCABEZADO = 30
+MAX_COL = 200
+
+# Filas y columnas son números (1 = fila 1 / columna A); las filas de datos
+# son las de la plantilla (ver ampliado).
+Diseno = namedtuple(
+    "Diseno", "version huella capacidad general parciales encabezados_bloqueo respaldo_bloqueo")
+# metadata ((fila, col), ...); ponderaciones (fila, col_ini, col_fin), los
+# nombres en la fila anterior (nombres_ponderaciones, la letra de la columna
+# si está vacía); bloqueo (col_ini, col_fin) en fila_ini..fila_fin.
+DisenoGeneral = namedtuple(
+    "DisenoGeneral",
+    "hoja metadata ponderaciones nombres_ponderaciones encabezado col_numero "
+    "col_matricula col_nombre fila_ini fila_fin bloqueo")
+# captura (fila_ini, col_ini, col_fin) editable hasta fila_fin; bloqueo
+# (col_ini, col_fin) en fila_ini..fila_fin o None (se usa el respaldo);
+# muestra: columnas de captura con encabezado (deben quedar editables).
+DisenoParcial = namedtuple(
+    "DisenoParcial", "hoja encabezado fila_ini fila_fin captura bloqueo muestra")
+
+
+# ========================================
+# Derivación (una vez por plantilla)
+# ========================================
+
+def _buscar_etiqueta(hoja, texto, max_fila=MAX_FILA_ENCABEZADO):
+    """(fila, col) de la primera celda cuyo valor normalizado es `texto`."""
+    objetivo = normalizar(texto)
+    for fila in sorted(f for f in hoja.filas if f <= max_fila):
+        for col in sorted(hoja.filas[fila][1]):
+            if normalizar(hoja.valor(fila, col)) == objetivo:
+                return fila, col
+    return None
+
+
+def _area(hoja, fila, col):
+    return hoja._merge_de.get((fila, col), (fila, col, fila, col))
+
+
+def _lista_alumnos(hoja):
+    """(fila_encabezado, cols de ENCABEZADOS_ALUMNOS, índice, fila_ini,
+    fila_fin) o None si la hoja no tiene lista de alumnos."""
+    for fila in sorted(f for f in hoja.filas if f <= MAX_FILA_ENCABEZADO):
+        indice = IndiceEncabezados(hoja.valor(fila, c) for c in range(1, MAX_COL + 1))
+        cols = [indice.buscar(t) for t in ENCABEZADOS_ALUMNOS]
+        if all(cols):
+            break
+    else:
+        return None
+    col_numero, _, col_nombre = cols
+    fila_ini = next((f for f in range(fila + 1, fila + MAX_FILA_ENCABEZADO)
+                     if hoja.valor(f, col_numero) == 1), None)
+    if fila_ini is None:
+        raise ValueError(f"hoja '{hoja.Name}': no hay fila con número 1 debajo de los encabezados")
+    return fila, tuple(cols), indice, fila_ini, ultima_fila_datos(hoja, fila_ini, col_nombre)
+
+
+def ultima_fila_datos(hoja, fila_ini, col_nombre):
+    """Última fila de datos desde `fila_ini`: las filas de datos tienen
+    celdas a la derecha del nombre (captura, fórmulas o estilo), la fila de
+    cierre no. Vale para la plantilla y para un archivo ya generado (con
+    filas ampliadas o no). `hoja`: backend_ooxml.Hoja."""
+    fila_fin = fila_ini
+    while any(c > col_nombre for c in hoja.filas.get(fila_fin + 1, ("", {}))[1]):
+        fila_fin += 1
+    return fila_fin
+
+
+def _diseno_general(hoja):
+    lista = _lista_alumnos(hoja)
+    if lista is None:
+        raise ValueError(f"hoja '{hoja.Name}': no se hallaron los encabezados "
+                         f"{', '.join(ENCABEZADOS_ALUMNOS)}")
+    encabezado, (col_numero, col_matricula, col_nombre), indice, fila_ini, fila_fin = lista
+
+    metadata = []
+    for etiqueta in ETIQUETAS_METADATA:
+        pos = _buscar_etiqueta(hoja, etiqueta, encabezado)
+        if pos is None:
+            raise ValueError(f"hoja '{hoja.Name}': no se halló la etiqueta '{etiqueta}'")
+        metadata.append((pos[0], _area(hoja, *pos)[3] + 1))
+
+    pos = _buscar_etiqueta(hoja, ETIQUETA_PONDERACIONES, encabezado)
+    if pos is None:
+        raise ValueError(f"hoja '{hoja.Name}': no se halló la etiqueta '{ETIQUETA_PONDERACIONES}'")
+    _, col_ini, fila_etiqueta, col_fin = _area(hoja, *pos)
+    nombres = tuple(" ".join(str(hoja.valor(fila_etiqueta + 1, c) or num_a_col(c)).split())
+                    for c in range(col_ini, col_fin + 1))
+
+    bloqueo = tuple(indice.buscar(t) for t in BLOQUEO_GENERAL)
+    if not all(bloqueo) or bloqueo[0] > bloqueo[1]:
+        raise ValueError(f"hoja '{hoja.Name}': no se hallaron los encabezados "
+                         f"'{BLOQUEO_GENERAL[0]}'/'{BLOQUEO_GENERAL[1]}'")
+    return DisenoGeneral(
+        hoja=hoja.Name, metadata=tuple(metadata),
+        ponderaciones=(fila_etiqueta + 2, col_ini, col_fin), nombres_ponderaciones=nombres,
+        encabezado=encabezado,
+        col_numero=col_numero, col_matricula=col_matricula, col_nombre=col_nombre,
+        fila_ini=fila_ini, fila_fin=fila_fin, bloqueo=bloqueo,
+    )
+
+
+def _diseno_parcial(hoja):
+    lista = _lista_alumnos(hoja)
+    if lista is None:
+        return None
+    encabezado, (_, _, col_nombre), indice, fila_ini, fila_fin = lista
+    con_encabezado = [c for c in sorted(hoja.filas[encabezado][1])
+                      if hoja.valor(encabezado, c) not in (None, "")]
+    captura = (encabezado + 1, col_nombre + 1,
+               max(_area(hoja, encabezado, c)[3] for c in con_encabezado))
+    col_ini, col_fin = (indice.buscar(t) for t in BLOQUEO_PARCIAL)
+    bloqueo = (col_ini, col_fin) if col_ini and col_fin and col_ini <= col_fin else None
+    limite = bloqueo[0] if bloqueo else RESPALDO_BLOQUEO[0]
+    return DisenoParcial(
+        hoja=hoja.Name, encabezado=encabezado, fila_ini=fila_ini, fila_fin=fila_fin,
+        captura=captura, bloqueo=bloqueo,
+        muestra=tuple(c for c in con_encabezado if captura[1] <= c < limite),
+    )
+
+
+def derivar(contenido):
+    """Diseno de la plantilla `contenido` (bytes del .xlsx)."""
+    import hashlib
+    import io
+    import zipfile
+    from backend_ooxml import Hoja, TablaEstilos, _leer_shared_strings, hojas_del_libro
+
+    with zipfile.ZipFile(io.BytesIO(contenido)) as z:
+        partes = {n: z.read(n) for n in z.namelist() if n.endswith((".xml", ".rels"))}
+    estilos = TablaEstilos(partes["xl/styles.xml"].decode("utf-8"))
+    sst = _leer_shared_strings(partes.get("xl/sharedStrings.xml", b"").decode("utf-8"))
+    hojas = [Hoja(nombre, partes[ruta].decode("utf-8"), estilos, sst)
+             for nombre, ruta in hojas_del_libro(partes)]
+    if not hojas:
+        raise ValueError("la plantilla no tiene hojas")
+
+    general = _diseno_general(hojas[0])
+    parciales = tuple(p for p in map(_diseno_parcial, hojas[1:]) if p is not None)
+    capacidad = general.fila_fin - general.fila_ini + 1
+    for p in parciales:
+        if p.fila_fin - p.fila_ini + 1 != capacidad:
+            raise ValueError(f"hoja '{p.hoja}': {p.fila_fin - p.fila_ini + 1} filas de datos, "
+                             f"la hoja '{general.hoja}' tiene {capacidad}")
+    return Diseno(
+        version=VERSION_DISENO, huella=hashlib.sha256(contenido).hexdigest(),
+        capacidad=capacidad, general=general, parciales=parciales,
+        encabezados_bloqueo=BLOQUEO_PARCIAL, respaldo_bloqueo=RESPALDO_BLOQUEO,
+    )
+
+
+# ========================================
+# Archivo .diseno.json
+# ========================================
+
+def ruta_diseno(template_path):
+    """<plantilla sin extensión>.diseno.json"""
+    return os.path.splitext(template_path)[0] + ".diseno.json"
+
+
+def _tupla(valor):
+    return tuple(_tupla(v) for v in valor) if isinstance(valor, list) else valor
+
+
+def a_json(diseno):
+    d = diseno._asdict()
+    d["general"] = diseno.general._asdict()
+    d["parciales"] = [p._asdict() for p in diseno.parciales]
+    return json.dumps(d, ensure_ascii=False, indent=2)
+
+
+def de_json(texto):
+    d = {k: _tupla(v) for k, v in json.loads(texto).items()}
+    d["general"] = DisenoGeneral(**{k: _tupla(v) for k, v in d["general"].items()})
+    d["parciales"] = tuple(DisenoParcial(**{k: _tupla(v) for k, v in p.items()})
+                           for p in d["parciales"])
+    return Diseno(**d)
+
+
+def _guardar(diseno, destino):
+    import stat
+    import tempfile
+    # mkstemp crea el archivo con 0600 y os.replace lo conserva: el
+    # .diseno.json es parte de la plantilla versionada, así que hereda el modo
+    # del anterior (o 0644 si es nuevo).
+    try:
+        modo = stat.S_IMODE(os.stat(destino).st_mode)
+    except FileNotFoundError:
+        modo = 0o644
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(destino)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(a_json(diseno) + "\n")
+        os.chmod(tmp, modo)
+        os.replace(tmp, destino)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+_DISENOS = {}
+
+
+def _firma(ruta):
+    """(tamaño, fecha de modificación) de `ruta`, None si no existe."""
+    try:
+        st = os.stat(ruta)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def cargar(ruta=TEMPLATE_DEFAULT):
+    """Diseno de la plantilla `ruta` (o de un .diseno.json directamente).
+    Usa el .diseno.json de la plantilla si su huella coincide; si no, lo
+    deriva en memoria con una advertencia (no lo escribe: ver main). Se
+    memoiza por ruta, tamaño y fecha de modificación de la plantilla y de su
+    .diseno.json, así que los procesos de larga vida ven las correcciones."""
+    st = os.stat(ruta)
+    clave = (os.path.abspath(ruta), st.st_size, st.st_mtime_ns)
+    if not ruta.lower().endswith(".json"):
+        clave += (_firma(ruta_diseno(ruta)),)
+    diseno = _DISENOS.get(clave)
+    if diseno is not None:
+        return diseno
+
+    if ruta.lower().endswith(".json"):
+        with open(ruta, "r", encoding="utf-8") as f:
+            diseno = de_json(f.read())
+    else:
+        import hashlib
+        with open(ruta, "rb") as f:
+            contenido = f.read()
+        huella = hashlib.sha256(contenido).hexdigest()
+        try:
+            with open(ruta_diseno(ruta), "r", encoding="utf-8") as f:
+                diseno = de_json(f.read())
+        except (OSError, ValueError, TypeError, KeyError):
+            diseno = None
+        if diseno is None or diseno.huella != huella or diseno.version != VERSION_DISENO:
+            estado = "no existe" if diseno is None else "no corresponde a la plantilla"
+            print(f"Advertencia: '{ruta_diseno(ruta)}' {estado}; se deriva el diseño en "
+                  f"memoria (regenerarlo: python scripts/diseno_plantilla.py {ruta}).",
+                  file=sys.stderr)
+            diseno = derivar(contenido)
+    _DISENOS[clave] = diseno
+    return diseno
+
+
+def ampliado(diseno, capacidad):
+    """`diseno` con `capacidad` filas de alumnos: las filas de datos terminan
+    más abajo, igual que al insertar filas (ver filas_dinamicas.py)."""
+    extra = capacidad - diseno.capacidad
+    if extra <= 0:
+        return diseno
+    return diseno._replace(
+        capacidad=capacidad,
+        general=diseno.general._replace(fila_fin=diseno.general.fila_fin + extra),
+        parciales=tuple(p._replace(fila_fin=p.fila_fin + extra) for p in diseno.parciales),
+    )
+
+
+def main():
+    ruta = sys.argv[1] if len(sys.argv) > 1 else TEMPLATE_DEFAULT
+    try:
+        with open(ruta, "rb") as f:
+            diseno = derivar(f.read())
+    except (OSError, ValueError) as e:
+        print(f"Error: no se pudo derivar el diseño de '{ruta}': {e}", file=sys.stderr)
+        sys.exit(1)
+    _guardar(diseno, ruta_diseno(ruta))
+    print(a_json(diseno))
+    print(f"Guardado en {ruta_diseno(ruta)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
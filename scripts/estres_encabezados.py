@@ -0,0 +1,643 @@
+"""
+Prueba de estrés (aleatoria) de la resolución de encabezados y de los rangos
+de bloqueo.
+
+El generador (backend_ooxml.py / diseno_plantilla.py) y el verificador
+(verificar_bloqueo.py) localizan las columnas por su encabezado con
+IndiceEncabezados. Este script genera miles de filas de encabezados
+sintéticas y revisa que todos resuelvan lo mismo que un recorrido lineal de
+referencia (`buscar_lineal`, la búsqueda original columna por columna):
+  - indice:    filas de hasta 260 columnas con acentos (precompuestos y
+               combinantes), mayúsculas, espacios extra, tabuladores, saltos
+               de línea, espacios de no separación, celdas numéricas y
+               señuelos ("Parcial del Producto", "Producto del Parcial
+               anterior"...); IndiceEncabezados y
+               buscar_columna_por_encabezado contra el recorrido lineal;
+  - lectores:  la hoja Parcial de la plantilla con esas filas y celdas
+               combinadas sintéticas en la fila de encabezados, leída por el
+               generador (Hoja), el verificador en streaming (HojaStream) y
+               openpyxl: mismos valores normalizados, mismas columnas y el
+               mismo rango de bloqueo que `_diseno_parcial`;
+  - extremo:   plantillas completas con los encabezados de las hojas Parcial
+               alterados (variantes, intercambiados, eliminados, con
+               señuelos): el rango que bloquea el generador debe ser el que
+               localiza el verificador, y el archivo generado debe pasar la
+               verificación cuando la plantilla tiene los encabezados (el
+               criterio de BD:BJ solo si el rango lo cubre, ver `_pasa`);
+  - escala:    tiempo por hoja de construir el índice y resolver los
+               encabezados para 50 a 3200 columnas; un exponente de
+               crecimiento mayor que --exponente-max (búsqueda cuadrática)
+               es un fallo.
+También se registra el tiempo de resolución por hoja de cada lector.
+
+Cada caso usa su propio generador aleatorio derivado de --semilla, así que
+un fallo se reproduce con la misma semilla; se imprime el caso, la consulta
+y la primera columna en la que difieren los lectores. Cualquier discrepancia
+es un fallo (código de salida 1).
+
+Uso:
+    python scripts/estres_encabezados.py [--semilla 0] [--casos 5000] [--hojas 200]
+        [--plantillas 30] [--cada-openpyxl 10] [--exponente-max 1.5]
+        [--plantilla templates/Template.xlsx] [--json resultados.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+import zipfile
+
+from backend_ooxml import (
+    Celda, Hoja, TablaEstilos, _leer_shared_strings, compilar_plantilla,
+    generar_evaluacion_ooxml, hojas_del_libro, num_a_col,
+)
+from diseno_plantilla import (
+    BLOQUEO_PARCIAL, ENCABEZADOS_ALUMNOS, TEMPLATE_DEFAULT, _diseno_parcial, cargar,
+)
+from filas_dinamicas import capacidad_para
+from generar_XLSX import buscar_columna_por_encabezado
+from indice_encabezados import MAX_COL, IndiceEncabezados, normalizar, valores_fila
+from verificar_bloqueo import (
+    HojaStream, _shared_strings, evaluar_hoja, tabla_locked, verificar_archivo,
+)
+from zip_rapido import comprimir, escribir_zip, leer_entradas
+
+
+MAX_FALLAS_IMPRESAS = 5
+TAMANOS_ESCALA = (50, 100, 200, 400, 800, 1600, 3200)
+
+_VOCABULARIO = [
+    "Asistencia", "Actividades de Aprendizaje", "Evidencias de Aprendizaje",
+    "Examen Parcial", "Calificación", "Faltas por retardos", "Producto", "Parcial",
+    "Porcentaje", "Participación", "Tareas", "Práctica de laboratorio", "Proyecto final",
+    "Asistencia: 0 %", "Producto: 30 %", "Examen: 30 %", "Observaciones", "Promedio",
+]
+_ACENTOS = {"a": "á", "e": "é", "i": "í", "o": "ó", "u": "ú", "n": "ñ",
+            "A": "Á", "E": "É", "I": "Í", "O": "Ó", "U": "Ú"}
+_SEPARADORES = [" ", " ", " ", "  ", "\t", "\n", "\u00a0", "\u2003", " \u00a0 "]
+_SIN_ACENTO = str.maketrans("áéíóúÁÉÍÓÚ", "aeiouAEIOU")
+
+
+# ========================================
+# Referencia y generación de encabezados
+# ========================================
+
+def buscar_lineal(valores, texto, normalizados=None):
+    """La búsqueda original, columna por columna: coincidencia exacta
+    (normalizada) primero; si no hay, la primera columna que contiene todos
+    los tokens de `texto` (la primera con encabezado si `texto` es vacío).
+    `normalizados`: los valores ya normalizados, si se tienen."""
+    objetivo = normalizar(texto)
+    if normalizados is None:
+        normalizados = [normalizar(v) for v in valores]
+    for col, val in enumerate(normalizados, 1):
+        if val and val == objetivo:
+            return col
+    tokens = objetivo.split()
+    for col, val in enumerate(normalizados, 1):
+        if val and all(t in val.split() for t in tokens):
+            return col
+    return None
+
+
+def _rnd(semilla, parte, caso):
+    return random.Random(f"{semilla}/{parte}/{caso}")
+
+
+def _palabra(rnd, palabra):
+    forma = rnd.random()
+    if forma < 0.2:
+        palabra = palabra.upper()
+    elif forma < 0.35:
+        palabra = palabra.lower()
+    elif forma < 0.45:
+        palabra = "".join(c.upper() if rnd.random() < 0.5 else c.lower() for c in palabra)
+    acento = rnd.random()
+    if acento < 0.15:
+        palabra = palabra.translate(_SIN_ACENTO)
+    elif acento < 0.25:
+        palabra = "".join(_ACENTOS.get(c, c) if rnd.random() < 0.3 else c for c in palabra)
+    elif acento < 0.35:
+        # Acento combinante (NFD) en lugar del precompuesto.
+        palabra = "".join(c + "\u0301" if c in "aeiouAEIOU" and rnd.random() < 0.3 else c
+                          for c in palabra.translate(_SIN_ACENTO))
+    elif acento < 0.4:
+        # Ancho completo: NFKD lo lleva a ASCII.
+        palabra = "".join(chr(ord(c) + 0xFEE0) if "!" <= c <= "~" else c for c in palabra)
+    return palabra
+
+
+def variante(rnd, texto):
+    """`texto` con otra forma pero el mismo valor normalizado."""
+    palabras = [_palabra(rnd, p) for p in texto.split()]
+    resultado = "".join(p + rnd.choice(_SEPARADORES) for p in palabras[:-1]) + palabras[-1]
+    if rnd.random() < 0.2:
+        resultado = rnd.choice(_SEPARADORES) + resultado
+    if rnd.random() < 0.2:
+        resultado += rnd.choice(_SEPARADORES)
+    return resultado
+
+
+def senuelo(rnd, texto):
+    """Texto parecido a `texto`: a veces contiene todos sus tokens (resuelve
+    por tokens si no hay coincidencia exacta), a veces no."""
+    palabras = texto.split()
+    tipo = rnd.randrange(5)
+    if tipo == 0:
+        palabras = palabras + [rnd.choice(["anterior", "(respaldo)", "2", "final"])]
+    elif tipo == 1:
+        palabras = [rnd.choice(["Total", "Promedio", "Nuevo"])] + palabras
+    elif tipo == 2:
+        rnd.shuffle(palabras)
+    elif tipo == 3 and len(palabras) > 1:
+        del palabras[rnd.randrange(len(palabras))]
+    else:
+        palabras = ["-".join(palabras)]
+    return variante(rnd, " ".join(palabras))
+
+
+def fila_sintetica(rnd, n_cols, objetivos):
+    """Valores de una fila de encabezados de `n_cols` columnas (None = vacía)
+    con variantes y señuelos de `objetivos` en posiciones al azar."""
+    valores = []
+    for _ in range(n_cols):
+        tipo = rnd.random()
+        if tipo < 0.35:
+            valores.append(None)
+        elif tipo < 0.4:
+            valores.append(rnd.choice(["", " ", "\u00a0"]))
+        elif tipo < 0.47:
+            valores.append(rnd.choice([rnd.randint(0, 100), round(rnd.uniform(0, 100), 1)]))
+        else:
+            valores.append(variante(rnd, rnd.choice(_VOCABULARIO)))
+    for objetivo in objetivos:
+        for _ in range(rnd.choice([0, 1, 1, 1, 2])):
+            valores[rnd.randrange(n_cols)] = variante(rnd, objetivo)
+        for _ in range(rnd.randrange(3)):
+            valores[rnd.randrange(n_cols)] = senuelo(rnd, objetivo)
+    return valores
+
+
+def consultas(rnd, objetivos, valores):
+    """Textos a buscar: los objetivos (tal cual y en variante), parte de sus
+    tokens, encabezados presentes, números y textos ausentes."""
+    textos = list(objetivos) + [variante(rnd, t) for t in objetivos]
+    textos += [" ".join(rnd.sample(t.split(), max(1, len(t.split()) - 1))) for t in objetivos]
+    presentes = [v for v in valores if v not in (None, "")]
+    textos += [str(v) for v in rnd.sample(presentes, min(3, len(presentes)))]
+    textos += ["", "Inexistente", str(rnd.randint(0, 100))]
+    return textos
+
+
+class _HojaCom:
+    """Hoja mínima con la interfaz `Cells(fila, col).Value` (COM)."""
+
+    def __init__(self, valores, fila):
+        self._valores, self._fila = valores, fila
+
+    def Cells(self, fila, col):
+        if fila != self._fila or col > len(self._valores):
+            return Celda(None)
+        return Celda(self._valores[col - 1])
+
+
+def _corto(valores, col=None):
+    """Repr legible de una fila (alrededor de `col` si se indica)."""
+    if col is not None:
+        ini = max(0, col - 4)
+        return {num_a_col(c + 1): valores[c] for c in range(ini, min(len(valores), col + 3))}
+    return {num_a_col(c): v for c, v in enumerate(valores, 1) if v not in (None, "")}
+
+
+def _primera_diferencia(a, b):
+    for col, (x, y) in enumerate(zip(a, b), 1):
+        if x != y:
+            return col
+    return None if len(a) == len(b) else min(len(a), len(b)) + 1
+
+
+def _percentiles(tiempos):
+    if not tiempos:
+        return {}
+    orden = sorted(tiempos)
+    return {"p50_ms": round(statistics.median(orden), 3),
+            "p95_ms": round(orden[math.ceil(0.95 * len(orden)) - 1], 3),
+            "max_ms": round(orden[-1], 3)}
+
+
+# ========================================
+# Parte 1: índice contra el recorrido lineal
+# ========================================
+
+def estres_indice(semilla, casos, fallas):
+    objetivos = BLOQUEO_PARCIAL + ENCABEZADOS_ALUMNOS + ("Parcial 1", "Asistencia")
+    resueltas = 0
+    for caso in range(casos):
+        rnd = _rnd(semilla, "indice", caso)
+        valores = fila_sintetica(rnd, rnd.randint(1, 260), rnd.sample(objetivos, 3))
+        for objetivo in objetivos:
+            if normalizar(variante(rnd, objetivo)) != normalizar(objetivo):
+                fallas.append({"parte": "indice", "caso": caso, "consulta": objetivo,
+                               "detalle": "una variante no normaliza igual que el original"})
+        indice = IndiceEncabezados(valores)
+        com = _HojaCom(valores, 6)
+        normalizados = [normalizar(v) for v in valores]
+        textos = consultas(rnd, objetivos, valores)
+        # buscar_columna_por_encabezado arma el índice en cada llamada (y solo
+        # lee las primeras MAX_COL columnas): una consulta por caso basta.
+        una = rnd.choice(textos)
+        for texto in textos:
+            esperado = buscar_lineal(valores, texto, normalizados)
+            obtenidos = {"indice": indice.buscar(texto), "indice (memo)": indice.buscar(texto)}
+            esperados = {"indice": esperado, "indice (memo)": esperado}
+            if texto == una:
+                obtenidos["buscar_columna_por_encabezado"] = buscar_columna_por_encabezado(
+                    com, texto, 6, MAX_COL)
+                esperados["buscar_columna_por_encabezado"] = buscar_lineal(
+                    valores[:MAX_COL], texto, normalizados[:MAX_COL])
+            for lector, col in obtenidos.items():
+                if col != esperados[lector]:
+                    fallas.append({
+                        "parte": "indice", "caso": caso, "lector": lector, "consulta": texto,
+                        "esperado": esperados[lector], "obtenido": col,
+                        "fila": _corto(valores, esperados[lector] or col),
+                    })
+            resueltas += 1
+    return {"casos": casos, "consultas": resueltas}
+
+
+# ========================================
+# Parte 2: generador, verificador y openpyxl sobre la misma hoja
+# ========================================
+
+class _Plantilla:
+    """Partes de la plantilla ya leídas, para armar variantes rápido."""
+
+    def __init__(self, ruta):
+        with open(ruta, "rb") as f:
+            self.contenido = f.read()
+        self.entradas = leer_entradas(io.BytesIO(self.contenido))
+        with zipfile.ZipFile(io.BytesIO(self.contenido)) as z:
+            self.partes = {n: z.read(n) for n in self.entradas if n.endswith((".xml", ".rels"))}
+        self.rutas = dict(hojas_del_libro(self.partes))
+        self.sst = _leer_shared_strings(
+            self.partes.get("xl/sharedStrings.xml", b"").decode("utf-8"))
+        self.diseno = cargar(ruta)
+
+    def hoja(self, nombre):
+        estilos = TablaEstilos(self.partes["xl/styles.xml"].decode("utf-8"))
+        return Hoja(nombre, self.partes[self.rutas[nombre]].decode("utf-8"), estilos, self.sst)
+
+    def libro(self, hojas):
+        """Bytes de la plantilla con `hojas` ({nombre: Hoja}) reescritas."""
+        nuevas = {self.rutas[n]: h.serializar().encode("utf-8") for n, h in hojas.items()}
+        salida = io.BytesIO()
+        escribir_zip(salida, [comprimir(n, nuevas[n]) if n in nuevas else e
+                              for n, e in self.entradas.items()])
+        return salida.getvalue()
+
+
+def _reemplazar_merges(hoja, areas):
+    """Deja `areas` como las celdas combinadas de la hoja (la plantilla ya
+    tiene <mergeCells>)."""
+    refs = "".join(f'<mergeCell ref="{num_a_col(c1)}{f1}:{num_a_col(c2)}{f2}"/>'
+                   for f1, c1, f2, c2 in areas)
+    bloque = f'<mergeCells count="{len(areas)}">{refs}</mergeCells>' if areas else ""
+    hoja.cola = re.sub(r"<mergeCells[^>]*>.*?</mergeCells>", bloque, hoja.cola, flags=re.S)
+    hoja.merges = list(areas)
+
+
+def hoja_sintetica(rnd, plantilla, p):
+    """La hoja Parcial `p` con una fila de encabezados sintética (y celdas
+    combinadas de hasta 8x3 en ella). Devuelve (hoja, valores esperados)."""
+    hoja = plantilla.hoja(p.hoja)
+    fila = p.encabezado
+    n_cols = rnd.randint(4, 260)
+    valores = [variante(rnd, t) for t in ENCABEZADOS_ALUMNOS]
+    valores += fila_sintetica(rnd, n_cols - 3, rnd.sample(BLOQUEO_PARCIAL, rnd.randint(0, 2)))
+    areas = [a for a in hoja.merges if a[2] < fila or a[0] > fila + 2]
+    col = 4
+    while col <= n_cols:
+        ancho = rnd.choice([1, 1, 1, 2, 3, 8])
+        alto = rnd.choice([1, 1, 2, 3])
+        fin = min(n_cols, col + ancho - 1)
+        if fin > col or alto > 1:
+            areas.append((fila, col, fila + alto - 1, fin))
+            for c in range(col + 1, fin + 1):
+                valores[c - 1] = None  # solo la esquina superior izquierda tiene valor
+        col = fin + 1
+    for f in range(fila, fila + 3):
+        for c in list(hoja.filas.get(f, ("", {}))[1]):
+            hoja.escribir(f, c, None)
+    for c, valor in enumerate(valores, 1):
+        if valor not in (None, ""):
+            hoja.escribir(fila, c, valor)
+    _reemplazar_merges(hoja, areas)
+    return hoja, valores
+
+
+def estres_lectores(semilla, casos, cada_openpyxl, plantilla, fallas, tiempos):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        load_workbook = None
+    diseno = plantilla.diseno
+    ini, fin = diseno.encabezados_bloqueo
+    con_openpyxl = 0
+    for caso in range(casos):
+        rnd = _rnd(semilla, "lectores", caso)
+        p = diseno.parciales[caso % len(diseno.parciales)]
+        hoja, valores = hoja_sintetica(rnd, plantilla, p)
+        contenido = plantilla.libro({p.hoja: hoja})
+        esperados = valores[:MAX_COL] + [None] * (MAX_COL - len(valores))
+        cols = (buscar_lineal(esperados, ini), buscar_lineal(esperados, fin))
+        bloqueo = cols if all(cols) and cols[0] <= cols[1] else None
+
+        lectores = {}
+        # Generador: la hoja tal como la reparsea backend_ooxml.
+        releida = Hoja(p.hoja, hoja.serializar(), hoja.estilos, plantilla.sst)
+        lectores["generador"] = releida
+        with zipfile.ZipFile(io.BytesIO(contenido)) as z:
+            ruta = plantilla.rutas[p.hoja]
+            lectores["verificador"] = HojaStream(
+                p.hoja, z, ruta, tabla_locked(z), _shared_strings(z),
+                filas={p.encabezado} | set(range(p.fila_ini, p.fila_fin + 1)),
+                valores={p.encabezado})
+        if load_workbook is not None and cada_openpyxl and caso % cada_openpyxl == 0:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")  # formato condicional extendido de la plantilla
+                lectores["openpyxl"] = load_workbook(io.BytesIO(contenido))[p.hoja]
+            con_openpyxl += 1
+
+        def falla(lector, detalle, **extra):
+            fallas.append({"parte": "lectores", "caso": caso, "hoja": p.hoja,
+                           "lector": lector, "detalle": detalle, **extra})
+
+        for nombre, ws in lectores.items():
+            t0 = time.perf_counter()
+            indice = IndiceEncabezados.de_hoja(ws, p.encabezado, MAX_COL)
+            obtenidas = (indice.buscar(ini), indice.buscar(fin))
+            tiempos.setdefault(nombre, []).append((time.perf_counter() - t0) * 1000)
+
+            leidos = [normalizar(v) for v in valores_fila(ws, p.encabezado, MAX_COL)]
+            leidos += [""] * (MAX_COL - len(leidos))
+            col = _primera_diferencia(leidos, [normalizar(v) for v in esperados])
+            if col is not None:
+                falla(nombre, f"valor distinto en {num_a_col(col)}{p.encabezado}",
+                      esperado=esperados[col - 1], obtenido=leidos[col - 1])
+            if obtenidas != cols:
+                falla(nombre, "columnas por encabezado", esperado=cols, obtenido=obtenidas,
+                      fila=_corto(esperados))
+            if nombre == "generador":
+                derivado = _diseno_parcial(ws)
+                if derivado is None or derivado.bloqueo != bloqueo:
+                    falla(nombre, "_diseno_parcial", esperado=bloqueo,
+                          obtenido=derivado and derivado.bloqueo)
+            else:
+                r = evaluar_hoja(ws, diseno)
+                if (r["col_ini"], r["col_fin"]) != cols:
+                    falla(nombre, "evaluar_hoja", esperado=cols,
+                          obtenido=(r["col_ini"], r["col_fin"]))
+    return {"casos": casos, "con_openpyxl": con_openpyxl}
+
+
+# ========================================
+# Parte 3: plantilla alterada -> generador -> verificador
+# ========================================
+
+def alterar_encabezados(rnd, hoja, fila, objetivos):
+    """Altera la fila de encabezados de una hoja Parcial: variantes de sus
+    textos y, para cada objetivo, intercambio con otro encabezado,
+    eliminación o señuelos. Devuelve lo que se hizo."""
+    cols = {c: hoja.valor(fila, c) for c in sorted(hoja.filas[fila][1])
+            if c > 3 and hoja.valor(fila, c) not in (None, "")}
+    for c, valor in cols.items():
+        if isinstance(valor, str) and rnd.random() < 0.5:
+            hoja.escribir(fila, c, variante(rnd, valor))
+    acciones = []
+    for objetivo in objetivos:
+        col = IndiceEncabezados(hoja.valor(fila, c) for c in range(1, MAX_COL + 1)).buscar(objetivo)
+        otras = [c for c in cols if c != col]
+        accion = rnd.choices(["nada", "intercambiar", "eliminar", "senuelo", "eliminar+senuelo"],
+                             [5, 1.5, 1, 1.5, 1])[0]
+        if col is None or accion == "nada":
+            continue
+        if accion == "intercambiar":
+            otra = rnd.choice(otras)
+            a, b = hoja.valor(fila, col), hoja.valor(fila, otra)
+            hoja.escribir(fila, col, b)
+            hoja.escribir(fila, otra, a)
+        if "eliminar" in accion:
+            hoja.escribir(fila, col, None)
+        if "senuelo" in accion:
+            hoja.escribir(fila, rnd.choice(otras), senuelo(rnd, objetivo))
+        acciones.append(f"{accion} '{objetivo}'")
+    return acciones
+
+
+def _pasa(h, bloqueo, respaldo):
+    """Resultado de evaluar_hoja aceptable para el rango `bloqueo`. El
+    criterio 2 (BD:BJ sigue bloqueado) solo aplica si el rango por encabezado
+    cubre BD:BJ, como en la plantilla: si los encabezados se movieron, el
+    generador bloquea el rango que localiza y no el fijo."""
+    if bloqueo[0] <= respaldo[0] and respaldo[1] <= bloqueo[1]:
+        return h["ok"]
+    return h["protegida"] and not h["fallas_encabezado"] and not h["fallas_editables"]
+
+
+def estres_extremo(semilla, casos, cada_openpyxl, plantilla, fallas, tiempos):
+    directorio = tempfile.mkdtemp(prefix="estres_encabezados_")
+    silencio = io.StringIO()
+    diseno = plantilla.diseno
+    ini, fin = diseno.encabezados_bloqueo
+    try:
+        for caso in range(casos):
+            rnd = _rnd(semilla, "extremo", caso)
+            hojas, esperados, acciones = {}, {}, {}
+            for p in diseno.parciales:
+                hoja = plantilla.hoja(p.hoja)
+                acciones[p.hoja] = alterar_encabezados(rnd, hoja, p.encabezado, BLOQUEO_PARCIAL)
+                valores = valores_fila(hoja, p.encabezado, MAX_COL)
+                cols = (buscar_lineal(valores, ini), buscar_lineal(valores, fin))
+                esperados[p.hoja] = cols if all(cols) and cols[0] <= cols[1] else None
+                hojas[p.hoja] = hoja
+            ruta = os.path.join(directorio, f"plantilla_{caso}.xlsx")
+            with open(ruta, "wb") as f:
+                f.write(plantilla.libro(hojas))
+            salida = os.path.join(directorio, f"salida_{caso}.xlsm")
+            n = rnd.randint(1, 2 * diseno.capacidad)
+            data = {"alumnos": [{"matricula": str(2250000000 + i), "nombre": f"ALUMNO {i}"}
+                                for i in range(n)]}
+
+            def falla(detalle, hoja=None, **extra):
+                fallas.append({"parte": "extremo", "caso": caso, "hoja": hoja,
+                               "alumnos": n, "acciones": acciones.get(hoja),
+                               "detalle": detalle, **extra})
+
+            try:
+                with contextlib.redirect_stderr(silencio):
+                    generar_evaluacion_ooxml(data, ruta, salida, vba_path=None)
+                    compilada = compilar_plantilla(
+                        ruta, None, capacidad_para(n, cargar(ruta).capacidad))
+            except Exception as e:
+                falla(f"generador: {type(e).__name__}: {e}")
+                continue
+            modos = [("verificador", True)]
+            if cada_openpyxl and caso % cada_openpyxl == 0:
+                try:
+                    import openpyxl  # noqa: F401
+                    modos.append(("verificador (openpyxl)", False))
+                except ImportError:
+                    pass
+            for modo, rapido in modos:
+                with contextlib.redirect_stdout(silencio), warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    r = verificar_archivo(salida, rapido, cargar(ruta))
+                tiempos.setdefault(f"archivo, {modo}", []).append(r["ms"])
+                if r["error"]:
+                    falla(f"{modo}: {r['error']}")
+                    continue
+                for h in r["hojas"]:
+                    esperado = esperados[h["hoja"]]
+                    cols = (h["col_ini"], h["col_fin"])
+                    localizado = cols if all(cols) and cols[0] <= cols[1] else None
+                    generado = compilada.columnas.get(h["hoja"])
+                    if generado != esperado:
+                        falla("el generador bloqueó otro rango", h["hoja"],
+                              esperado=esperado, obtenido=generado)
+                    if localizado != generado:
+                        falla(f"{modo} localizó otro rango que el generador", h["hoja"],
+                              esperado=generado, obtenido=localizado)
+                    elif generado and not _pasa(h, generado, diseno.respaldo_bloqueo):
+                        falla(f"{modo}: la hoja no pasa la verificación", h["hoja"],
+                              fallas_encabezado=h["fallas_encabezado"][:5],
+                              fallas_bd_bj=h["fallas_bd_bj"][:5],
+                              fallas_editables=h["fallas_editables"][:5])
+            os.unlink(salida)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+    return {"casos": casos}
+
+
+# ========================================
+# Parte 4: crecimiento con el número de columnas
+# ========================================
+
+def estres_escala(semilla, exponente_max, fallas, filas=20, repeticiones=3):
+    objetivos = BLOQUEO_PARCIAL + ENCABEZADOS_ALUMNOS
+    por_tamano = {}
+    for n_cols in TAMANOS_ESCALA:
+        rnd = _rnd(semilla, "escala", n_cols)
+        muestras = []
+        for _ in range(filas):
+            valores = fila_sintetica(rnd, n_cols, objetivos)
+            textos = consultas(rnd, objetivos, valores)
+            mejor = float("inf")
+            for _ in range(repeticiones):
+                t0 = time.perf_counter()
+                indice = IndiceEncabezados(valores)
+                for texto in textos:
+                    indice.buscar(texto)
+                mejor = min(mejor, time.perf_counter() - t0)
+            muestras.append(mejor * 1000)
+        por_tamano[n_cols] = statistics.median(muestras)
+
+    # Pendiente log-log desde 200 columnas (debajo domina el costo fijo).
+    puntos = [(math.log(n), math.log(ms)) for n, ms in por_tamano.items() if n >= 200]
+    mx = statistics.fmean(x for x, _ in puntos)
+    my = statistics.fmean(y for _, y in puntos)
+    exponente = (sum((x - mx) * (y - my) for x, y in puntos)
+                 / sum((x - mx) ** 2 for x, _ in puntos))
+    if exponente > exponente_max:
+        fallas.append({"parte": "escala", "detalle": f"el tiempo por hoja crece como "
+                       f"n^{exponente:.2f} (> n^{exponente_max})",
+                       "ms_por_hoja": {n: round(ms, 3) for n, ms in por_tamano.items()}})
+    return {"ms_por_hoja": {n: round(ms, 3) for n, ms in por_tamano.items()},
+            "exponente": round(exponente, 2)}
+
+
+# ========================================
+# Reporte
+# ========================================
+
+def imprimir_fallas(fallas, semilla):
+    print(f"\n{len(fallas)} fallas (semilla {semilla}):")
+    for f in fallas[:MAX_FALLAS_IMPRESAS]:
+        datos = ", ".join(f"{k}={v!r}" for k, v in f.items() if k not in ("parte", "caso"))
+        print(f"  [{f['parte']} #{f.get('caso', '-')}] {datos}")
+    if len(fallas) > MAX_FALLAS_IMPRESAS:
+        print(f"  ... y {len(fallas) - MAX_FALLAS_IMPRESAS} más (ver --json)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--semilla", type=int, default=None,
+                        help="semilla de los casos (default: al azar, se imprime)")
+    parser.add_argument("--casos", type=int, default=5000,
+                        help="filas sintéticas contra el recorrido lineal")
+    parser.add_argument("--hojas", type=int, default=200,
+                        help="hojas sintéticas leídas por los tres lectores")
+    parser.add_argument("--plantillas", type=int, default=30,
+                        help="plantillas alteradas generadas y verificadas")
+    parser.add_argument("--cada-openpyxl", type=int, default=10, metavar="N",
+                        help="también leer con openpyxl uno de cada N casos (0 = nunca)")
+    parser.add_argument("--exponente-max", type=float, default=1.5,
+                        help="exponente máximo del tiempo por hoja frente a las columnas")
+    parser.add_argument("--plantilla", default=TEMPLATE_DEFAULT, help="plantilla base")
+    parser.add_argument("--json", metavar="ruta", help="escribe los resultados en `ruta`")
+    args = parser.parse_args()
+
+    semilla = args.semilla if args.semilla is not None else random.randrange(1 << 32)
+    print(f"Semilla: {semilla}")
+    plantilla = _Plantilla(args.plantilla)
+    fallas, tiempos = [], {}
+    resultados = {"semilla": semilla}
+
+    partes = [
+        ("indice", lambda: estres_indice(semilla, args.casos, fallas)),
+        ("lectores", lambda: estres_lectores(semilla, args.hojas, args.cada_openpyxl,
+                                             plantilla, fallas, tiempos)),
+        ("extremo", lambda: estres_extremo(semilla, args.plantillas, args.cada_openpyxl,
+                                           plantilla, fallas, tiempos)),
+        ("escala", lambda: estres_escala(semilla, args.exponente_max, fallas)),
+    ]
+    for nombre, correr in partes:
+        antes = len(fallas)
+        t0 = time.perf_counter()
+        resultados[nombre] = correr()
+        segundos = time.perf_counter() - t0
+        estado = "FALLA" if len(fallas) > antes else "ok"
+        detalle = ", ".join(f"{k} {v}" for k, v in resultados[nombre].items()
+                            if not isinstance(v, dict))
+        print(f"[{estado:>5}] {nombre:<9} {detalle} ({segundos:.1f} s)")
+        if nombre == "escala":
+            for n_cols, ms in resultados[nombre]["ms_por_hoja"].items():
+                print(f"        {n_cols:>5} columnas: {ms:8.3f} ms por hoja")
+
+    resultados["ms_por_hoja"] = {lector: _percentiles(t) for lector, t in tiempos.items()}
+    print("\nResolución de encabezados por hoja (lectura + índice + búsquedas):")
+    for lector, p in resultados["ms_por_hoja"].items():
+        print(f"  {lector:<32} p50 {p['p50_ms']:8.3f} ms  p95 {p['p95_ms']:8.3f} ms  "
+              f"máx {p['max_ms']:8.3f} ms")
+
+    resultados["fallas"] = fallas
+    if fallas:
+        imprimir_fallas(fallas, semilla)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2, default=str)
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == "__main__":
+    main()
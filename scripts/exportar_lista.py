@@ -0,0 +1,173 @@
+"""
+Salidas ligeras de la lista de alumnos, en la misma corrida que el .xlsm.
+
+Los reportes de dirección y las páginas de estadísticas necesitan la misma
+lista y ponderaciones que generar_evaluacion escribe en el libro. Estas
+salidas se escriben fila por fila a partir del payload y del diseño de la
+plantilla (diseno_plantilla.py), sin abrir la plantilla ni construir un libro,
+así que no pasan por ningún backend del generador:
+  - csv:   una fila por alumno: numero, matricula, nombre y una columna
+           "ponderacion/<nombre>" por ponderación (vacía = sin configurar,
+           como el sentinela -1 del libro y igual que extraer_calificaciones.py);
+  - jsonl: los mismos registros, un objeto JSON por línea (null = sin
+           configurar);
+  - ods:   hoja de cálculo OpenDocument con una hoja (la General de la
+           plantilla) con esas columnas. El zip se escribe con zip_rapido
+           (`mimetype` sin comprimir y primero, como pide el formato).
+
+Uso:
+    python scripts/generar_XLSX.py --formatos xlsm,csv,jsonl,ods <input_json> <template_path> <output_path>
+Cada formato se escribe junto a <output_path> con su extensión; con `-` como
+salida solo se admite un formato.
+"""
+
+import csv
+import io
+import json
+import os
+
+from cronometro import Cronometro
+
+
+FORMATOS_LIGEROS = ("csv", "jsonl", "ods")
+TIPOS_MIME = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+    "ods": "application/vnd.oasis.opendocument.spreadsheet",
+}
+
+# Sin backend_ooxml.escape: esta salida no importa el generador del libro, y
+# los atributos (table:name) también necesitan las comillas.
+_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+
+_MANIFIESTO = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" '
+    'manifest:version="1.2">'
+    '<manifest:file-entry manifest:full-path="/" manifest:version="1.2" '
+    f'manifest:media-type="{TIPOS_MIME["ods"]}"/>'
+    '<manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>'
+    "</manifest:manifest>"
+)
+_CONTENIDO_CABEZA = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+    'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" '
+    'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" office:version="1.2">'
+    "<office:body><office:spreadsheet>"
+)
+_CONTENIDO_COLA = "</office:spreadsheet></office:body></office:document-content>"
+
+
+def campos(diseno):
+    """Columnas de las salidas, en orden."""
+    return ["numero", "matricula", "nombre"] + [
+        f"ponderacion/{n}" for n in diseno.general.nombres_ponderaciones]
+
+
+def registros(data, diseno):
+    """Un dict por alumno con lo que el generador escribe en el libro."""
+    sin_configurar = dict.fromkeys(campos(diseno)[3:])
+    for i, alumno in enumerate(data.get("alumnos", [])):
+        yield {"numero": i + 1, "matricula": alumno.get("matricula", ""),
+               "nombre": alumno.get("nombre", ""), **sin_configurar}
+
+
+# ========================================
+# Escritores (devuelven los bytes escritos)
+# ========================================
+
+def _csv(data, diseno, salida):
+    buffer = io.StringIO()
+    w = csv.DictWriter(buffer, fieldnames=campos(diseno))
+
+    def vaciar():
+        datos = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        salida.write(datos)
+        return len(datos)
+
+    w.writeheader()
+    total = vaciar()
+    for registro in registros(data, diseno):
+        w.writerow(registro)
+        total += vaciar()
+    return total
+
+
+def _jsonl(data, diseno, salida):
+    total = 0
+    for registro in registros(data, diseno):
+        datos = (json.dumps(registro, ensure_ascii=False) + "\n").encode("utf-8")
+        salida.write(datos)
+        total += len(datos)
+    return total
+
+
+def _celda_ods(valor):
+    if valor is None or valor == "":
+        return "<table:table-cell/>"
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return (f'<table:table-cell office:value-type="float" office:value="{valor}">'
+                f"<text:p>{valor}</text:p></table:table-cell>")
+    return (f'<table:table-cell office:value-type="string">'
+            f"<text:p>{str(valor).translate(_ESCAPE)}</text:p></table:table-cell>")
+
+
+def _fila_ods(valores):
+    return "<table:table-row>" + "".join(map(_celda_ods, valores)) + "</table:table-row>"
+
+
+def _ods(data, diseno, salida):
+    import zipfile  # ~15 ms de imports que csv y jsonl no necesitan
+    from zip_rapido import comprimir, escribir_zip
+    nombres = campos(diseno)
+    partes = [_CONTENIDO_CABEZA,
+              f'<table:table table:name="{diseno.general.hoja.translate(_ESCAPE)}">',
+              _fila_ods(nombres)]
+    partes.extend(_fila_ods(r.values()) for r in registros(data, diseno))
+    partes.append("</table:table>" + _CONTENIDO_COLA)
+
+    # El CRC va antes de los datos en el zip: content.xml se comprime entero.
+    return escribir_zip(salida, [
+        comprimir("mimetype", TIPOS_MIME["ods"].encode("ascii"), zipfile.ZIP_STORED),
+        comprimir("META-INF/manifest.xml", _MANIFIESTO.encode("utf-8")),
+        comprimir("content.xml", "".join(partes).encode("utf-8")),
+    ])
+
+
+_ESCRITORES = {"csv": _csv, "jsonl": _jsonl, "ods": _ods}
+
+
+def exportar(data, diseno, formato, salida):
+    """Escribe `data` en `formato` en `salida` (archivo binario abierto).
+    Devuelve los bytes escritos."""
+    if formato not in _ESCRITORES:
+        raise ValueError(f"Formato desconocido: {formato}")
+    return _ESCRITORES[formato](data, diseno, salida)
+
+
+def ruta_formato(output_path, formato):
+    """<output_path sin extensión>.<formato>"""
+    return f"{os.path.splitext(output_path)[0]}.{formato}"
+
+
+def exportar_formatos(data, template_path, formatos, output_path):
+    """Escribe cada formato de `formatos` junto a `output_path` (o en él si
+    es un archivo abierto; entonces solo uno). Devuelve la traza."""
+    from diseno_plantilla import cargar
+    crono = Cronometro()
+    diseno = cargar(template_path)
+    crono.marcar("Diseño de la plantilla")
+    salidas = {}
+    for formato in formatos:
+        if hasattr(output_path, "write"):
+            salidas[formato] = {"bytes": exportar(data, diseno, formato, output_path)}
+        else:
+            ruta = ruta_formato(output_path, formato)
+            with open(ruta, "wb") as f:
+                salidas[formato] = {"ruta": ruta, "bytes": exportar(data, diseno, formato, f)}
+        crono.marcar(f"Exportar {formato}")
+    crono.resumen("Tiempos (exportar lista)")
+    return crono.traza(alumnos=len(data.get("alumnos", [])), salidas=salidas)
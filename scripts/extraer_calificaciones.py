@@ -0,0 +1,236 @@
+"""
+Extractor de calificaciones capturadas en los .xlsm devueltos por los docentes.
+
+Por cada archivo lee en streaming (el mismo lector de verificar_bloqueo.py
+--rapido, memoria constante por archivo):
+  - las ponderaciones de la hoja General (D7:H7, con sus encabezados de la
+    fila 6; el centinela -1 "sin configurar" sale vacío), y
+  - los valores de las filas de datos de cada hoja Parcial (9-53, o hasta la
+    del último alumno si el generador amplió las filas), de D hasta
+    "Porcentaje de asistencia" (resuelto por encabezado; BJ si no se halla),
+y escribe un registro por alumno, identificado por su matrícula (columna B de
+General, fila + 1), con una columna por celda: "<hoja>/<encabezado>".
+Los encabezados combinados sobre varias columnas se numeran
+("Parcial_1/Asistencia 1", "Parcial_1/Asistencia 2", ...) y los encabezados
+con fórmula (BD6:BH6) toman el nombre de la ponderación a la que se refieren
+("Parcial_1/Asistencia"), así que la columna es la misma con cualquier
+ponderación y aunque el archivo no tenga valores en caché. Las coordenadas
+salen del diseño de la plantilla (diseno_plantilla.py, --plantilla).
+
+Uso:
+    python scripts/extraer_calificaciones.py [--workers N] [--salida calificaciones.csv|.jsonl|-]
+        [--plantilla p.xlsx|p.diseno.json] <dir|glob|xlsm>...
+
+La salida es JSON lines (un objeto por alumno, conforme terminan los archivos)
+o CSV si la ruta termina en .csv. Los archivos que no se pueden leer se
+reportan en stderr y el código de salida es 2; el resto se extrae igual.
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+
+from diseno_plantilla import TEMPLATE_DEFAULT
+from diseno_plantilla import cargar as cargar_diseno
+from indice_encabezados import IndiceEncabezados
+from referencias import col_a_num, num_a_col
+from verificar_bloqueo import (
+    MAX_FILAS, HojaStream, _hojas_del_libro, _shared_strings, contar_alumnos, diseno_archivo,
+    expandir_rutas, tabla_locked,
+)
+
+
+SIN_CONFIGURAR = -1
+CAMPOS_BASE = ["archivo", "matricula", "nombre"]
+
+
+def _matricula(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor).strip()
+
+
+def _referida(formula, general):
+    """Valor de la primera celda de `general` a la que se refiere `formula`
+    (p.ej. "Asistencia" para CONCATENATE(General!$D$6, ": ", ...)), o None."""
+    nombre = re.escape(general.title)
+    m = re.search(rf"(?:'{nombre}'|(?<![\w.]){nombre})!\$?([A-Z]+)\$?(\d+)", formula)
+    return general.valor(int(m.group(2)), col_a_num(m.group(1))) if m else None
+
+
+def etiquetas(ws, col_ini, col_fin, fila_encabezado, general=None):
+    """{col: etiqueta} a partir de la fila de encabezados y la siguiente
+    (subencabezado) y de las celdas combinadas que las cubren.
+
+    Un encabezado con fórmula (BD6:BH6, "Asistencia: 0 %") depende de las
+    ponderaciones y de que el archivo tenga valores en caché (un archivo
+    reescrito por el modo delta no los tiene): su etiqueta es el valor de la
+    celda de `general` a la que se refiere ("Asistencia") o, si no se puede
+    resolver, la letra de la columna."""
+    area_de = {}
+    for area in ws.merges:
+        f1, c1, f2, c2 = area
+        for f in range(f1, f2 + 1):
+            if f in (fila_encabezado, fila_encabezado + 1):
+                for c in range(c1, c2 + 1):
+                    area_de[(f, c)] = area
+
+    resultado = {}
+    for col in range(col_ini, col_fin + 1):
+        texto, area = None, None
+        for fila in (fila_encabezado + 1, fila_encabezado):
+            area = area_de.get((fila, col), (fila, col, fila, col))
+            texto = ws.valor(area[0], area[1])
+            if (area[0], area[1]) in ws.formulas:
+                formula = ws.formulas[(area[0], area[1])]
+                texto = _referida(formula, general) if general is not None else None
+                texto = texto if texto not in (None, "") else num_a_col(col)
+            if texto not in (None, ""):
+                break
+        if texto in (None, ""):
+            resultado[col] = num_a_col(col)
+            continue
+        texto = " ".join(str(texto).split())
+        _, c1, _, c2 = area
+        resultado[col] = f"{texto} {col - c1 + 1}" if c2 > c1 else texto
+    return resultado
+
+
+def extraer_archivo(path, diseno=None):
+    """(registros, error): un dict por alumno con matrícula del archivo.
+    `diseno`: el de la plantilla (default: el de templates/Template.xlsx)."""
+    try:
+        diseno = diseno or cargar_diseno()
+        g = diseno.general
+        fila_pond, col_pond_ini, col_pond_fin = g.ponderaciones
+        with zipfile.ZipFile(path) as z:
+            locked = tabla_locked(z)
+            sst = _shared_strings(z)
+            rutas = dict(_hojas_del_libro(z))
+            if not rutas:
+                return [], "el libro no tiene hojas"
+            # Nombres y valores de ponderaciones y lista de alumnos (hasta la
+            # primera fila vacía, que define la última fila de datos).
+            filas_general = range(fila_pond - 1, MAX_FILAS + 1)
+            nombre_general = g.hoja if g.hoja in rutas else next(iter(rutas))
+            general = HojaStream(nombre_general, z, rutas[nombre_general], locked, sst,
+                                 filas=filas_general, valores=filas_general)
+            diseno = diseno_archivo(diseno, contar_alumnos(general, g))
+            parciales = []
+            for p in diseno.parciales:
+                if p.hoja in rutas:
+                    filas = {p.encabezado, p.encabezado + 1} | set(range(p.fila_ini, p.fila_fin + 1))
+                    parciales.append((p, HojaStream(p.hoja, z, rutas[p.hoja], locked, sst,
+                                                    filas=filas, valores=filas)))
+    except Exception as e:
+        return [], f"{type(e).__name__}: {e}"
+    if not parciales:
+        return [], "no se encontraron hojas 'Parcial_*' en el archivo"
+
+    comunes = {"archivo": path}
+    for col in range(col_pond_ini, col_pond_fin + 1):
+        nombre = general.valor(fila_pond - 1, col) or num_a_col(col)
+        valor = general.valor(fila_pond, col)
+        comunes[f"ponderacion/{nombre}"] = None if valor == SIN_CONFIGURAR else valor
+
+    columnas = []
+    for p, ws in parciales:
+        col_fin = (IndiceEncabezados.de_hoja(ws, p.encabezado).buscar(diseno.encabezados_bloqueo[1])
+                   or diseno.respaldo_bloqueo[1])
+        columnas.append((p, ws, etiquetas(ws, p.captura[1], col_fin, p.encabezado, general)))
+
+    registros = []
+    for i in range(diseno.capacidad):
+        fila = g.fila_ini + i
+        matricula = _matricula(general.valor(fila, g.col_matricula))
+        if not matricula:
+            continue
+        registro = {**comunes, "matricula": matricula, "nombre": general.valor(fila, g.col_nombre)}
+        for p, ws, etiq in columnas:
+            for col, etiqueta in etiq.items():
+                registro[f"{ws.title}/{etiqueta}"] = ws.valor(p.fila_ini + i, col)
+        registros.append(registro)
+    return registros, None
+
+
+def extraer_varios(archivos, salida, workers, diseno=None):
+    """Extrae `archivos` en paralelo y escribe los registros en `salida`.
+    Devuelve el código de salida (2 si algún archivo falló)."""
+    from concurrent.futures import ProcessPoolExecutor
+    t0 = time.perf_counter()
+    es_csv = salida.lower().endswith(".csv")
+    destino = sys.stdout if salida == "-" else open(salida, "w", newline="", encoding="utf-8")
+    pendientes_csv = []
+    fallidos = alumnos = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, (registros, error) in zip(archivos, pool.map(
+                    extraer_archivo, archivos, [diseno] * len(archivos),
+                    chunksize=max(1, len(archivos) // (workers * 8)))):
+                if error:
+                    fallidos += 1
+                    print(f"[ERROR] {path}: {error}", file=sys.stderr)
+                    continue
+                alumnos += len(registros)
+                if es_csv:
+                    pendientes_csv.extend(registros)
+                else:
+                    for registro in registros:
+                        destino.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        if es_csv:
+            # Las columnas dependen de los encabezados de cada plantilla: se
+            # escriben al final con la unión, en orden de aparición.
+            campos = dict.fromkeys(CAMPOS_BASE)
+            for registro in pendientes_csv:
+                campos.update(dict.fromkeys(registro))
+            w = csv.DictWriter(destino, fieldnames=list(campos))
+            w.writeheader()
+            w.writerows(pendientes_csv)
+    finally:
+        if destino is not sys.stdout:
+            destino.close()
+
+    print(f"Extracción: {alumnos} alumnos de {len(archivos) - fallidos}/{len(archivos)} archivos "
+          f"en {time.perf_counter() - t0:.1f} s ({workers} workers)", file=sys.stderr)
+    return 2 if fallidos else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="extraer_calificaciones.py",
+        description="Extrae ponderaciones y capturas de los .xlsm devueltos, por matrícula.",
+    )
+    parser.add_argument("rutas", nargs="+", metavar="ruta",
+                        help="archivo .xlsm, directorio (recursivo) o glob")
+    parser.add_argument("--salida", default="-", metavar="calificaciones.csv|.jsonl|-",
+                        help="CSV si termina en .csv; si no, JSON lines (default: stdout)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="procesos (default: núm. de CPUs)")
+    parser.add_argument("--plantilla", metavar="ruta", default=TEMPLATE_DEFAULT,
+                        help="plantilla con la que se generaron los archivos, o su "
+                             ".diseno.json (default: templates/Template.xlsx)")
+    args = parser.parse_args()
+
+    try:
+        diseno = cargar_diseno(args.plantilla)
+    except (OSError, ValueError) as e:
+        print(f"Error: no se pudo cargar el diseño de '{args.plantilla}': {e}", file=sys.stderr)
+        sys.exit(2)
+
+    archivos = expandir_rutas(args.rutas)
+    if not archivos:
+        print("Error: no se encontraron archivos .xlsm.", file=sys.stderr)
+        sys.exit(2)
+    sys.exit(extraer_varios(archivos, args.salida, max(1, args.workers or os.cpu_count() or 1),
+                            diseno))
+
+
+if __name__ == "__main__":
+    main()
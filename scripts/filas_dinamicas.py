@@ -0,0 +1,288 @@
+"""
+Capacidad de filas de alumnos según el tamaño del grupo.
+
+La plantilla trae 45 filas de alumnos: General 10-54 y Parcial 9-53 (la última
+con el borde inferior grueso; ver diseno_plantilla.py). Para grupos más
+grandes `ampliar_libro` inserta filas justo antes de la última fila de datos
+de cada hoja, igual que "Insertar filas" en Excel:
+  - toda referencia (de cualquier hoja) a una fila en o después del punto de
+    inserción se recorre, así que rangos como I10:I54 o D9:Y53 crecen;
+  - las filas nuevas replican estilos y fórmulas de la fila anterior al punto
+    de inserción; las fórmulas se guardan como fórmulas compartidas
+    (`<f t="shared">`, una maestra por columna), no como una copia por celda;
+  - celdas combinadas, formato condicional, validaciones, nombres definidos y
+    anclas de dibujos debajo del punto de inserción se recorren, y
+    calcChain.xml se descarta (Excel lo reconstruye al recalcular).
+
+`capacidad_para` redondea a múltiplos de 25 para compilar pocas variantes de
+la plantilla (ver compilar_plantilla).
+"""
+
+import posixpath
+import re
+
+from backend_ooxml import col_a_num, num_a_col
+
+
+PASO_CAPACIDAD = 25
+
+# Referencia A1 (opcionalmente con hoja y como rango) fuera de literales de texto.
+_RE_REF = re.compile(
+    r"(?<![A-Za-z0-9_.$'!])"
+    r"((?:'(?:[^']|'')+'|[A-Za-z_][A-Za-z0-9_.]*)!)?"
+    r"(\$?)([A-Z]{1,3})(\$?)(\d+)"
+    r"(?::(\$?)([A-Z]{1,3})(\$?)(\d+))?"
+    r"(?![A-Za-z0-9_(!])"
+)
+_RE_F = re.compile(r'<f\b([^>]*?)(?:/>|>(.*?)</f>)', re.S)
+_RE_ATTR = re.compile(r'\s([a-zA-Z]+)="([^"]*)"')
+_RE_FILA_R = re.compile(r'\br="\d+"')
+_RE_SQREF = re.compile(r'(\b(?:sqref|ref)=")([^"]*)(")')
+_RE_XM_SQREF = re.compile(r'(<xm:sqref>)(.*?)(</xm:sqref>)', re.S)
+_RE_FORMULA_COLA = re.compile(r'(<(formula[12]?|xm:f)>)(.*?)(</\2>)', re.S)
+
+
+def capacidad_para(n_alumnos, capacidad_plantilla):
+    """Filas de alumnos para `n_alumnos`: la de la plantilla o el siguiente
+    múltiplo de PASO_CAPACIDAD."""
+    if n_alumnos <= capacidad_plantilla:
+        return capacidad_plantilla
+    return -(-n_alumnos // PASO_CAPACIDAD) * PASO_CAPACIDAD
+
+
+# ========================================
+# Referencias en fórmulas
+# ========================================
+
+def _nombre_hoja(prefijo):
+    if not prefijo:
+        return None
+    nombre = prefijo[:-1]
+    if nombre.startswith("'"):
+        nombre = nombre[1:-1].replace("''", "'")
+    return nombre
+
+
+def sustituir_refs(texto, extremo):
+    """Reescribe cada referencia A1 de `texto` (fuera de literales "...").
+    `extremo(hoja, col_abs, col, fila_abs, fila)` devuelve el texto de cada
+    extremo; `hoja` es None si la referencia no lleva hoja."""
+    def repl(m):
+        prefijo = m.group(1)
+        hoja = _nombre_hoja(prefijo)
+        salida = (prefijo or "") + extremo(hoja, m.group(2) == "$", col_a_num(m.group(3)),
+                                           m.group(4) == "$", int(m.group(5)))
+        if m.group(7):
+            salida += ":" + extremo(hoja, m.group(6) == "$", col_a_num(m.group(7)),
+                                    m.group(8) == "$", int(m.group(9)))
+        return salida
+
+    partes = texto.split('"')
+    partes[::2] = [_RE_REF.sub(repl, p) for p in partes[::2]]
+    return '"'.join(partes)
+
+
+def _a1(col_abs, col, fila_abs, fila):
+    return f"{'$' if col_abs else ''}{num_a_col(col)}{'$' if fila_abs else ''}{fila}"
+
+
+def desplazar_relativo(texto, dfila, dcol=0):
+    """La fórmula copiada `dfila` filas y `dcol` columnas más allá."""
+    return sustituir_refs(texto, lambda hoja, ca, c, fa, f: _a1(
+        ca, c if ca else c + dcol, fa, f if fa else f + dfila))
+
+
+def canonica(texto, fila, col):
+    """Forma R1C1 de la fórmula de la celda (fila, col): dos celdas con la
+    misma forma pueden compartir fórmula."""
+    return sustituir_refs(texto, lambda hoja, ca, c, fa, f: (
+        f"R{f}" if fa else f"R[{f - fila}]") + (f"C{c}" if ca else f"C[{c - col}]"))
+
+
+def _insercion(puntos, extra, propia):
+    """Extremo que aplica la inserción de `extra` filas en `puntos`
+    ({hoja: fila}) a una referencia escrita en la hoja `propia`."""
+    def extremo(hoja, ca, c, fa, f):
+        ins = puntos.get(hoja or propia)
+        return _a1(ca, c, fa, f + extra if ins is not None and f >= ins else f)
+    return extremo
+
+
+# ========================================
+# Fórmulas compartidas
+# ========================================
+
+def _atributos(texto):
+    return dict(_RE_ATTR.findall(" " + texto))
+
+
+def materializar_compartidas(hoja):
+    """Convierte las fórmulas compartidas de la hoja en fórmulas por celda,
+    para poder recorrer filas sin alterar lo que calcula cada una."""
+    maestras = {}
+    for num, (_, celdas) in hoja.filas.items():
+        for col, celda in celdas.items():
+            m = _RE_F.search(celda[2] or "")
+            if m and m.group(2) is not None:
+                a = _atributos(m.group(1))
+                if a.get("t") == "shared" and "ref" in a:
+                    maestras[a["si"]] = (num, col, m.group(2))
+    if not maestras:
+        return
+    for num, (_, celdas) in hoja.filas.items():
+        for col, celda in celdas.items():
+            m = _RE_F.search(celda[2] or "")
+            if not m:
+                continue
+            a = _atributos(m.group(1))
+            if a.get("t") != "shared" or a.get("si") not in maestras:
+                continue
+            f0, c0, texto = maestras[a["si"]]
+            resto = "".join(f' {k}="{v}"' for k, v in a.items() if k not in ("t", "si", "ref"))
+            texto = desplazar_relativo(texto, num - f0, col - c0)
+            celda[2] = celda[2][:m.start()] + f"<f{resto}>{texto}</f>" + celda[2][m.end():]
+
+
+def compartir_formulas(hoja):
+    """Agrupa en fórmulas compartidas las celdas consecutivas de una columna
+    cuya fórmula es la misma en forma relativa (R1C1). Solo toca fórmulas
+    simples (`<f>` sin atributos)."""
+    si = 1 + max((int(n) for _, celdas in hoja.filas.values() for celda in celdas.values()
+                  for n in re.findall(r'<f\b[^>]*\ssi="(\d+)"', celda[2] or "")), default=-1)
+    por_col = {}
+    for num in sorted(hoja.filas):
+        for col, celda in hoja.filas[num][1].items():
+            m = _RE_F.search(celda[2] or "")
+            if m and m.group(2) is not None and not m.group(1).strip():
+                por_col.setdefault(col, []).append((num, canonica(m.group(2), num, col), celda, m))
+
+    for col, celdas in por_col.items():
+        i = 0
+        while i < len(celdas):
+            j = i
+            while (j + 1 < len(celdas) and celdas[j + 1][0] == celdas[j][0] + 1
+                   and celdas[j + 1][1] == celdas[i][1]):
+                j += 1
+            if j > i:
+                letra = num_a_col(col)
+                ref = f"{letra}{celdas[i][0]}:{letra}{celdas[j][0]}"
+                for k in range(i, j + 1):
+                    _, _, celda, m = celdas[k]
+                    nueva = (f'<f t="shared" ref="{ref}" si="{si}">{m.group(2)}</f>' if k == i
+                             else f'<f t="shared" si="{si}"/>')
+                    celda[2] = celda[2][:m.start()] + nueva + celda[2][m.end():]
+                si += 1
+            i = j + 1
+
+
+# ========================================
+# Inserción de filas
+# ========================================
+
+def _recorrer_rangos(texto, extremo):
+    return " ".join(sustituir_refs(r, extremo) for r in texto.split())
+
+
+def _recorrer_xml_hoja(xml, extremo):
+    """sqref/ref, <xm:sqref> y fórmulas de formato condicional y validaciones."""
+    xml = _RE_SQREF.sub(lambda m: m.group(1) + _recorrer_rangos(m.group(2), extremo) + m.group(3), xml)
+    xml = _RE_XM_SQREF.sub(lambda m: m.group(1) + _recorrer_rangos(m.group(2), extremo)
+                           + m.group(3), xml)
+    return _RE_FORMULA_COLA.sub(lambda m: m.group(1) + sustituir_refs(m.group(3), extremo)
+                                + m.group(4), xml)
+
+
+def _insertar_filas(hoja, ins, extra):
+    """Recorre las filas >= `ins` y replica la fila `ins` - 1 en el hueco."""
+    filas = {}
+    for num, (attrs, celdas) in hoja.filas.items():
+        if num >= ins:
+            num += extra
+            attrs = _RE_FILA_R.sub(f'r="{num}"', attrs, count=1)
+        filas[num] = [attrs, celdas]
+
+    modelo = hoja.filas.get(ins - 1)
+    if modelo is not None:
+        attrs_modelo, celdas_modelo = modelo
+        for k in range(extra):
+            num = ins + k
+            celdas = {}
+            for col, (c_attrs, estilo, contenido) in celdas_modelo.items():
+                m = _RE_F.search(contenido or "")
+                if m and m.group(2) is not None:
+                    texto = desplazar_relativo(m.group(2), num - (ins - 1))
+                    celdas[col] = [c_attrs, estilo, f"<f{m.group(1)}>{texto}</f>"]
+                else:
+                    # Solo estilo: las filas nuevas son filas de datos vacías.
+                    celdas[col] = [re.sub(r'\st="[^"]*"', "", c_attrs), estilo, None]
+            filas[num] = [_RE_FILA_R.sub(f'r="{num}"', attrs_modelo, count=1), celdas]
+    hoja.filas = filas
+
+
+def _recorrer_dibujos(partes, ruta_hoja, ins, extra):
+    rels = posixpath.join(posixpath.dirname(ruta_hoja), "_rels",
+                          posixpath.basename(ruta_hoja) + ".rels")
+    if rels not in partes:
+        return
+    for m in re.finditer(r'<Relationship\b[^>]*/drawing"[^>]*Target="([^"]+)"',
+                         partes[rels].decode("utf-8")):
+        ruta = posixpath.normpath(posixpath.join(posixpath.dirname(ruta_hoja), m.group(1)))
+        if partes.get(ruta) is None:
+            continue
+        xml = partes[ruta].decode("utf-8")
+        # <xdr:row> es 0-based: la fila n + 1 se recorre si está en o después de `ins`.
+        xml = re.sub(r"<xdr:row>(\d+)</xdr:row>",
+                     lambda r: f"<xdr:row>{int(r.group(1)) + (extra if int(r.group(1)) + 1 >= ins else 0)}"
+                               "</xdr:row>", xml)
+        partes[ruta] = xml.encode("utf-8")
+
+
+def _quitar_calc_chain(partes):
+    if "xl/calcChain.xml" not in partes:
+        return
+    partes["xl/calcChain.xml"] = None  # se omite del zip de salida
+    ct = partes["[Content_Types].xml"].decode("utf-8")
+    partes["[Content_Types].xml"] = re.sub(
+        r'<Override PartName="/xl/calcChain.xml"[^>]*/>', "", ct).encode("utf-8")
+    rels = partes["xl/_rels/workbook.xml.rels"].decode("utf-8")
+    partes["xl/_rels/workbook.xml.rels"] = re.sub(
+        r'<Relationship\b[^>]*/calcChain"[^>]*/>', "", rels).encode("utf-8")
+
+
+def ampliar_libro(partes, rutas, hojas, extra, puntos):
+    """Inserta `extra` filas de datos en cada hoja de `puntos` ({hoja: fila
+    de inserción}, la última fila de datos: General 54, Parcial 53).
+    Modifica `partes` (dibujos, calcChain, nombres definidos) y devuelve las
+    hojas reconstruidas (celdas combinadas y estilos por defecto
+    recalculados)."""
+    for hoja in hojas:
+        materializar_compartidas(hoja)
+        extremo = _insercion(puntos, extra, hoja.Name)
+        for _, celdas in hoja.filas.values():
+            for celda in celdas.values():
+                m = _RE_F.search(celda[2] or "")
+                if m and m.group(2) is not None:
+                    texto = sustituir_refs(m.group(2), extremo)
+                    celda[2] = celda[2][:m.start()] + f"<f{m.group(1)}>{texto}</f>" + celda[2][m.end():]
+        if hoja.Name in puntos:
+            ins = puntos[hoja.Name]
+            hoja.cabeza = _recorrer_xml_hoja(hoja.cabeza, extremo)
+            hoja.cola = _recorrer_xml_hoja(hoja.cola, extremo)
+            _insertar_filas(hoja, ins, extra)
+        else:
+            hoja.cola = _RE_FORMULA_COLA.sub(lambda m: m.group(1) + sustituir_refs(m.group(3), extremo)
+                                             + m.group(4), hoja.cola)
+        compartir_formulas(hoja)
+
+    for (_, ruta), hoja in zip(rutas, hojas):
+        if hoja.Name in puntos:
+            _recorrer_dibujos(partes, ruta, puntos[hoja.Name], extra)
+
+    wb = partes["xl/workbook.xml"].decode("utf-8")
+    partes["xl/workbook.xml"] = re.sub(
+        r"(<definedName\b[^>]*>)(.*?)(</definedName>)",
+        lambda m: m.group(1) + sustituir_refs(m.group(2), _insercion(puntos, extra, None)) + m.group(3),
+        wb, flags=re.S).encode("utf-8")
+    _quitar_calc_chain(partes)
+
+    return [type(h)(h.Name, h.serializar(), h.estilos, h._sst) for h in hojas]
@@ -1,17 +1,10 @@
+import io
 import sys
 import json
 import os
-import unicodedata
 
-
-def _norm(s):
-    """Normaliza texto para comparar encabezados: sin acentos, minúsculas,
-    espacios colapsados."""
-    if s is None:
-        return ""
-    s = unicodedata.normalize("NFKD", str(s))
-    s = "".join(c for c in s if not unicodedata.combining(c))  # quita acentos
-    return " ".join(s.lower().split())
+from cronometro import Cronometro
+from indice_encabezados import IndiceEncabezados
 
 
 def buscar_columna_por_encabezado(ws, texto, fila_encabezado=6, max_col=200):
@@ -19,32 +12,180 @@ def buscar_columna_por_encabezado(ws, texto, fila_encabezado=6, max_col=200):
     coincide con `texto`, normalizado (sin acentos/mayúsculas). Fallback: la
     primera columna cuyo encabezado contiene todos los tokens de `texto`
     (p.ej. "Producto Parcial" resuelve a "Producto del Parcial"). Devuelve
-    None si no se encuentra."""
-    objetivo = _norm(texto)
-    tokens = objetivo.split()
-    aprox = None
-    for col in range(1, max_col + 1):
-        val = _norm(ws.Cells(fila_encabezado, col).Value)
-        if not val:
-            continue
-        if val == objetivo:
-            return col
-        if aprox is None and all(t in val.split() for t in tokens):
-            aprox = col
-    return aprox
+    None si no se encuentra.
+
+    Para varias búsquedas en la misma hoja, construir un IndiceEncabezados
+    una vez (lee la fila completa en una sola llamada)."""
+    return IndiceEncabezados.de_hoja(ws, fila_encabezado, max_col).buscar(texto)
+
+
+BACKENDS = ("com", "ooxml")
+# xlsm: el libro (generar_evaluacion); el resto, salidas ligeras (exportar_lista.py).
+FORMATOS = ("xlsm", "csv", "jsonl", "ods")
+# Forma parte de la clave de la caché de salida (cache_salidas.py): subirla
+# cuando cambie el contenido de los archivos generados.
+VERSION_GENERADOR = "2026.10.2"
+# COM requiere Excel (Windows); en cualquier otro sistema se usa el backend OOXML.
+BACKEND_DEFAULT = "com" if sys.platform == "win32" else "ooxml"
 
 
 def main():
-  if len(sys.argv) != 4:
-    print("Uso: python generar_XLSX.py <input_json> <template_path> <output_path>", file=sys.stderr)
-    sys.exit(1)
-  
-  input_json_path = sys.argv[1]
-  template_path = sys.argv[2]
-  output_path = sys.argv[3]
+  # argparse solo lo necesita el CLI, no quien importa el módulo.
+  import argparse
+
+  parser = argparse.ArgumentParser(
+    prog="generar_XLSX.py",
+    description="Genera el .xlsm de evaluación a partir de la plantilla.",
+  )
+  parser.add_argument(
+    "rutas", nargs="*", metavar="ruta",
+    help="<input_json> <template_path> <output_path> (`-` = stdin/stdout); "
+         "con --servidor o --cola solo <template_path>; con --lote <grupos_json> <template_path> <destino>; "
+         "con --delta <delta_json> <xlsm_existente> <output_path>",
+  )
+  parser.add_argument(
+    "--backend", choices=BACKENDS, default=BACKEND_DEFAULT,
+    help=f"com = Excel vía win32com, ooxml = escritura directa del zip (default: {BACKEND_DEFAULT})",
+  )
+  parser.add_argument(
+    "--servidor", action="store_true",
+    help="modo servidor: trabajos JSON por stdin, .xlsm por stdout (ver servidor_generacion.py)",
+  )
+  parser.add_argument(
+    "--cola", metavar="dir",
+    help="atiende la cola de trabajos en disco `dir` con --workers procesos "
+         "(ver cola_trabajos.py)",
+  )
+  parser.add_argument(
+    "--lote", action="store_true",
+    help="modo lote: un .xlsm por grupo de un arreglo JSON, en un .zip o un directorio "
+         "(ver lote_generacion.py)",
+  )
+  parser.add_argument(
+    "--delta", action="store_true",
+    help="aplica altas/bajas de alumnos a un .xlsm ya generado conservando lo capturado "
+         "(ver actualizar_alumnos.py)",
+  )
+  parser.add_argument(
+    "--formatos", default="xlsm", metavar="xlsm,csv,jsonl,ods",
+    help="salidas de la misma corrida, separadas por comas; csv, jsonl y ods (lista y "
+         "ponderaciones, ver exportar_lista.py) se escriben junto a <output_path> con su "
+         "extensión sin generar el libro (default: xlsm)",
+  )
+  parser.add_argument(
+    "--sin-vba", action="store_true",
+    help="backend ooxml: genera sin el modal de ponderaciones si falta el vbaProject.bin "
+         "de la huella vigente (default: error; ver proyecto_vba.py)",
+  )
+  parser.add_argument(
+    "--trace", metavar="ruta",
+    help="escribe la traza JSON de la generación en `ruta` (default: última línea de la salida)",
+  )
+  parser.add_argument(
+    "--workers", type=int, default=None,
+    help="procesos worker en modo servidor o cola (default: 2) o lote (default: núm. de CPUs)",
+  )
+  parser.add_argument(
+    "--cache", metavar="dir",
+    help="caché en disco de archivos generados (default: $GENERADOR_CACHE_DIR; "
+         "tope en MB con $GENERADOR_CACHE_MB, ver cache_salidas.py)",
+  )
+  args = parser.parse_args()
+
+  if args.cache:
+    # Por entorno para que también la vean los workers de --servidor/--lote.
+    os.environ["GENERADOR_CACHE_DIR"] = args.cache
+  if args.sin_vba:
+    os.environ["GENERADOR_SIN_VBA"] = "1"
+
+  # Sin el vbaProject.bin el backend OOXML no puede producir el modal: se
+  # rechaza antes de arrancar workers o leer la entrada.
+  if args.backend == "ooxml" and not args.delta and (
+      args.servidor or args.cola or args.lote or "xlsm" in args.formatos.lower()):
+    from proyecto_vba import vba_requerido
+    try:
+      vba_requerido()
+    except FileNotFoundError as e:
+      print(f"Error: {e}", file=sys.stderr)
+      sys.exit(1)
+
+  if args.servidor:
+    if len(args.rutas) != 1:
+      parser.error("--servidor requiere solo <template_path>")
+    if not os.path.exists(args.rutas[0]):
+      print(f"Error: No se encontró el template: {args.rutas[0]}", file=sys.stderr)
+      sys.exit(1)
+    from servidor_generacion import servir
+    servir(args.rutas[0], args.backend, max(1, args.workers or 2))
+    return
+
+  if args.cola:
+    if len(args.rutas) != 1:
+      parser.error("--cola requiere solo <template_path>")
+    if not os.path.exists(args.rutas[0]):
+      print(f"Error: No se encontró el template: {args.rutas[0]}", file=sys.stderr)
+      sys.exit(1)
+    from cola_trabajos import atender
+    atender(args.cola, args.rutas[0], args.backend, max(1, args.workers or 2))
+    return
+
+  if args.lote:
+    if len(args.rutas) != 3:
+      parser.error("--lote requiere <grupos_json> <template_path> <destino>")
+    grupos_path, template_path, destino = args.rutas
+    if not os.path.exists(template_path):
+      print(f"Error: No se encontró el template: {template_path}", file=sys.stderr)
+      sys.exit(1)
+    from lote_generacion import generar_lote, leer_grupos
+    try:
+      grupos = leer_grupos(grupos_path)
+    except (OSError, ValueError) as e:
+      print(f"Error: grupos inválidos: {e}", file=sys.stderr)
+      sys.exit(1)
+    fallos = generar_lote(grupos, template_path, destino, args.backend,
+                          max(1, args.workers or os.cpu_count() or 1))
+    sys.exit(1 if fallos else 0)
+
+  if args.delta:
+    if len(args.rutas) != 3:
+      parser.error("--delta requiere <delta_json> <xlsm_existente> <output_path>")
+    delta_path, xlsm_path, output_path = args.rutas
+    if not os.path.exists(xlsm_path):
+      print(f"Error: No se encontró el archivo: {xlsm_path}", file=sys.stderr)
+      sys.exit(1)
+    if output_path == "-":
+      output_path = sys.stdout.buffer
+      sys.stdout = sys.stderr
+    from actualizar_alumnos import aplicar_delta, leer_delta
+    try:
+      traza = aplicar_delta(xlsm_path, leer_delta(delta_path), output_path)
+    except (OSError, ValueError) as e:
+      print(f"Error al actualizar la lista: {e}", file=sys.stderr)
+      sys.exit(1)
+    traza = {"traza": "aplicar_delta", **traza}
+    if args.trace:
+      with open(args.trace, "w", encoding="utf-8") as f:
+        json.dump(traza, f, ensure_ascii=False, indent=2)
+    else:
+      print(json.dumps(traza, ensure_ascii=False), flush=True)
+    return
+
+  if len(args.rutas) != 3:
+    parser.error("se esperaban <input_json> <template_path> <output_path>")
+  input_json_path, template_path, output_path = args.rutas
+  formatos = list(dict.fromkeys(f.strip().lower() for f in args.formatos.split(",") if f.strip()))
+  if not formatos or any(f not in FORMATOS for f in formatos):
+    parser.error(f"--formatos: se esperaba una lista de {', '.join(FORMATOS)}")
+  if output_path == "-" and len(formatos) > 1:
+    parser.error("con `-` como salida solo se admite un formato")
+
+  # Con `-` como salida, stdout transporta el .xlsm: cualquier print va a stderr.
+  if output_path == "-":
+    output_path = sys.stdout.buffer
+    sys.stdout = sys.stderr
 
   # Validar que los archivos existan
-  if not os.path.exists(input_json_path):
+  if input_json_path != "-" and not os.path.exists(input_json_path):
     print(f"Error: No se encontró el archivo JSON: {input_json_path}", file=sys.stderr)
     sys.exit(1)
 
@@ -53,51 +194,188 @@ def main():
 
   # Leer datos de entrada
   try:
-    with open(input_json_path, 'r', encoding='utf-8') as f:
-      data = json.load(f)
+    if input_json_path == "-":
+      data = json.loads(sys.stdin.buffer.read())
+    else:
+      with open(input_json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
   except json.JSONDecodeError as e:
     print(f"Error: JSON inválido: {e}", file=sys.stderr)
     sys.exit(1)
 
-  # Generar el archvio Excel =
-  try:
-    generar_evaluacion(data, template_path, output_path)
-    print(f"Archivo generado exitosamente: {output_path}")
-  except Exception as e:
-    print(f"Error al generar archivo: {e}", file=sys.stderr)
-    sys.exit(1)
+  # Salidas ligeras (csv, jsonl, ods): sin pasar por el generador del libro.
+  ligeros = [f for f in formatos if f != "xlsm"]
+  traza_ligeros = None
+  if ligeros:
+    from exportar_lista import exportar_formatos
+    try:
+      traza_ligeros = exportar_formatos(data, template_path, ligeros, output_path)
+    except (OSError, ValueError) as e:
+      print(f"Error al exportar la lista: {e}", file=sys.stderr)
+      sys.exit(1)
+    for salida in traza_ligeros["salidas"].values():
+      print(f"Archivo generado exitosamente: {salida.get('ruta', '(stdout)')}")
 
-def generar_evaluacion(data: dict, template_path: str, output_path: str):
+  # Generar el archvio Excel =
+  if "xlsm" in formatos:
+    try:
+      traza = generar_evaluacion(data, template_path, output_path, backend=args.backend)
+      if hasattr(output_path, "write"):
+        output_path.flush()
+        print("Archivo generado exitosamente: (stdout)")
+      else:
+        print(f"Archivo generado exitosamente: {output_path}")
+    except Exception as e:
+      print(f"Error al generar archivo: {e}", file=sys.stderr)
+      sys.exit(1)
+    traza = {"traza": "generar_evaluacion", **traza}
+    if traza_ligeros:
+      traza["exportar_lista"] = traza_ligeros
+  else:
+    traza = {"traza": "exportar_lista", **traza_ligeros}
+
+  # Traza estructurada: en el archivo de --trace o como última línea (en
+  # stderr si stdout transporta el .xlsm).
+  if args.trace:
+    with open(args.trace, "w", encoding="utf-8") as f:
+      json.dump(traza, f, ensure_ascii=False, indent=2)
+  else:
+    print(json.dumps(traza, ensure_ascii=False), flush=True)
+
+def generar_evaluacion(data: dict, template_path: str, output_path, backend: str = "com"):
     """
-    Genera el archivo XLSX usando win32com para preservar macros.
+    Genera el archivo XLSX con el backend indicado ("com" u "ooxml").
+    `output_path` puede ser una ruta o un archivo binario abierto (p. ej.
+    stdout); el backend OOXML escribe el zip conforme lo produce. Devuelve la
+    traza de la generación.
+    """
+    from cache_salidas import cache_por_defecto
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconocido: {backend}")
+    if cache_por_defecto() is not None or (backend == "com" and hasattr(output_path, "write")):
+        contenido, traza = generar_bytes(data, template_path, backend)
+        if hasattr(output_path, "write"):
+            output_path.write(contenido)
+        else:
+            with open(output_path, "wb") as f:
+                f.write(contenido)
+        return traza
+    if backend == "ooxml":
+        from backend_ooxml import generar_evaluacion_ooxml
+        return generar_evaluacion_ooxml(data, template_path, output_path)
+    return generar_evaluacion_com(data, template_path, output_path)
+
+
+def generar_bytes(data: dict, template_path: str, backend: str = "com", excel=None):
+    """
+    Genera el archivo en memoria y devuelve (contenido, traza). `excel`
+    permite reutilizar una instancia de Excel ya abierta (backend COM).
+    Con la caché de salida activa (GENERADOR_CACHE_DIR) un payload ya
+    generado con la misma plantilla se sirve desde disco sin generar.
     """
+    from cache_salidas import cache_por_defecto
+    cache = cache_por_defecto()
+    if cache is None:
+        return _generar_bytes(data, template_path, backend, excel)
+
+    crono = Cronometro()
+    clave = cache.clave(data, template_path, backend, VERSION_GENERADOR)
+    contenido = cache.obtener(clave)
+    if contenido is not None:
+        crono.marcar("Caché de salida")
+        crono.resumen("Tiempos (caché de salida)")
+        return contenido, crono.traza(
+            backend=backend, alumnos=len(data.get("alumnos", [])),
+            cache_salida=cache.estadisticas("acierto"),
+        )
+    contenido, traza = _generar_bytes(data, template_path, backend, excel)
+    cache.guardar(clave, contenido)
+    traza["cache_salida"] = cache.estadisticas("fallo")
+    return contenido, traza
+
+
+def _generar_bytes(data, template_path, backend, excel):
+    if backend == "ooxml":
+        from backend_ooxml import generar_evaluacion_ooxml
+        buffer = io.BytesIO()
+        traza = generar_evaluacion_ooxml(data, template_path, buffer)
+        return buffer.getvalue(), traza
+    if backend != "com":
+        raise ValueError(f"Backend desconocido: {backend}")
+
+    # Excel solo sabe guardar a disco: archivo temporal y se lee de vuelta.
+    import tempfile
+    fd, tmp_path = tempfile.mkstemp(suffix=".xlsm")
+    os.close(fd)
+    os.unlink(tmp_path)
+    try:
+        traza = generar_evaluacion_com(data, template_path, tmp_path, excel=excel)
+        with open(tmp_path, "rb") as f:
+            return f.read(), traza
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def iniciar_excel():
+    """Inicia Excel invisible vía COM. Dispatch y no gencache.EnsureDispatch:
+    no se usan las constantes de Excel, así que no hace falta generar (o
+    regenerar) la caché makepy en cada arranque."""
     import win32com.client as win32
-    from win32com.client import constants
 
+    excel = win32.Dispatch('Excel.Application')
+    excel.Visible = False
+    excel.DisplayAlerts = False
+    return excel
+
+
+def generar_evaluacion_com(data: dict, template_path: str, output_path: str, excel=None):
+    """
+    Genera el archivo XLSX usando win32com para preservar macros.
+    Si se pasa `excel`, se reutiliza esa instancia y no se cierra al final.
+    Devuelve la traza de la generación (ver Cronometro.traza).
+    """
     # Convertir rutas a absolutas (win32com las requiere)
     template_path = os.path.abspath(template_path)
     output_path = os.path.abspath(output_path)
 
-    excel = None
+    excel_propio = excel is None
     workbook = None
+    crono = Cronometro()
 
     try:
         # Iniciar Excel en modo invisible
-        excel = win32.gencache.EnsureDispatch('Excel.Application')
-        excel.Visible = False
-        excel.DisplayAlerts = False
+        if excel_propio:
+            excel = iniciar_excel()
+
+        # vbaProject.bin precompilado; la primera vez (por huella del código
+        # VBA) se construye con esta misma instancia de Excel.
+        from proyecto_vba import asegurar_vba
+        vba_path = asegurar_vba(excel, template_path)
+
+        # Coordenadas derivadas de la plantilla (ver diseno_plantilla.py)
+        from backend_ooxml import num_a_col
+        from diseno_plantilla import ampliado, cargar
+        diseno = cargar(template_path)
+        g = diseno.general
 
         # Abrir el template
         workbook = excel.Workbooks.Open(template_path)
-        sheet = workbook.Worksheets(1)  # Primera hoja
+        sheet = workbook.Worksheets(g.hoja)  # Hoja General
+        crono.marcar("Abrir Excel y template")
+
+        # Cada acceso a Range es un viaje COM entre procesos: los bloques se
+        # escriben de una vez con una matriz (tupla de filas).
 
         # ========================================
         # SECCIÓN 1: Metadata
         # Ajusta las celdas según tu template
         # ========================================
-        sheet.Range("C5").Value = ""
-        sheet.Range("C6").Value = ""
-        sheet.Range("C7").Value = ""
+        for fila, col in g.metadata:
+            sheet.Cells(fila, col).Value = ""
+        crono.contar("celdas_escritas", len(g.metadata))
+        crono.contar("llamadas_com", 2 * len(g.metadata))
+        crono.marcar("SECCIÓN 1: Metadata")
 
         # ========================================
         # SECCIÓN 2: Ponderaciones
@@ -106,274 +384,128 @@ def generar_evaluacion(data: dict, template_path: str, output_path: str):
         ponderaciones = data.get("ponderaciones", {})
         # Sentinela -1 = "sin configurar": distingue el estado inicial de una
         # ponderación válida (0-1) y dispara el modal solo la primera vez.
-        sheet.Range("D7").Value = -1
-        sheet.Range("E7").Value = -1
-        sheet.Range("F7").Value = -1
-        sheet.Range("G7").Value = -1
-        sheet.Range("H7").Value = -1
+        fila, col_ini, col_fin = g.ponderaciones
+        sheet.Range(f"{num_a_col(col_ini)}{fila}:{num_a_col(col_fin)}{fila}").Value = (
+            (-1,) * (col_fin - col_ini + 1),)
+        crono.contar("celdas_escritas", col_fin - col_ini + 1)
+        crono.contar("llamadas_com", 2)
+        crono.marcar("SECCIÓN 2: Ponderaciones")
 
         # ========================================
         # SECCIÓN 3: Lista de Alumnos
         # Ajusta la fila inicial y columnas según tu template
         # ========================================
         alumnos = data.get("alumnos", [])
-        fila_inicio_alumnos = 10  # Fila donde inician los alumnos
-        col_numero = "A"          # Columna para número
-        col_matricula = "B"       # Columna para matrícula
-        col_nombre = "C"          # Columna para nombre
-
-        for i, alumno in enumerate(alumnos):
-            fila = fila_inicio_alumnos + i
-            sheet.Range(f"{col_numero}{fila}").Value = i + 1
-            sheet.Range(f"{col_matricula}{fila}").Value = alumno.get("matricula", "")
-            sheet.Range(f"{col_nombre}{fila}").Value = alumno.get("nombre", "")
-
-        # ========================================
-        # SECCIÓN 5: Agregar modal VBA para ponderaciones
-        # ========================================
-
-        # Código VBA para ThisWorkbook (se ejecuta al abrir)
-        vba_thisworkbook = '''
-        Private Sub Workbook_Open()
-            ' Mostrar modal solo si las ponderaciones aún no se han configurado (sentinela -1)
-            If Worksheets(1).Range("D7").Value < 0 Then
-                frmPonderaciones.Show
-            End If
-        End Sub
-        '''
-
-        # Código VBA para el UserForm
-        vba_userform = '''
-        Option Explicit
-
-        Private Sub UserForm_Initialize()
-            txtAsistencia.Value = "10"
-            txtActividades.Value = "20"
-            txtEvidencias.Value = "20"
-            txtProducto.Value = "20"
-            txtExamen.Value = "30"
-            ActualizarTotal
-        End Sub
-
-        Private Sub txtAsistencia_Change()
-            ActualizarTotal
-        End Sub
-
-        Private Sub txtActividades_Change()
-            ActualizarTotal
-        End Sub
-
-        Private Sub txtEvidencias_Change()
-            ActualizarTotal
-        End Sub
-
-        Private Sub txtProducto_Change()
-            ActualizarTotal
-        End Sub
-
-        Private Sub txtExamen_Change()
-            ActualizarTotal
-        End Sub
-
-        Private Sub ActualizarTotal()
-            Dim total As Double
-            On Error Resume Next
-            total = Val(txtAsistencia.Value) + Val(txtActividades.Value) + _
-                    Val(txtEvidencias.Value) + Val(txtProducto.Value) + Val(txtExamen.Value)
-            lblTotal.Caption = "Total: " & total & "%"
-            
-            If total = 100 Then
-                lblTotal.ForeColor = &H008000
-                btnAceptar.Enabled = True
-            Else
-                lblTotal.ForeColor = &H0000FF
-                btnAceptar.Enabled = False
-            End If
-        End Sub
-
-        Private Sub btnAceptar_Click()
-            Dim ws As Worksheet
-            Set ws = ThisWorkbook.Worksheets(1)
-            
-            ws.Unprotect Password:="ppcdsalv"
-            
-            ws.Range("D7").Value = Val(txtAsistencia.Value) / 100
-            ws.Range("E7").Value = Val(txtActividades.Value) / 100
-            ws.Range("F7").Value = Val(txtEvidencias.Value) / 100
-            ws.Range("G7").Value = Val(txtProducto.Value) / 100
-            ws.Range("H7").Value = Val(txtExamen.Value) / 100
-            
-            ws.Protect Password:="ppcdsalv", Contents:=True
-            
-            Unload Me
-        End Sub
-
-        Private Sub btnCancelar_Click()
-            Unload Me
-        End Sub
-
-        Private Sub UserForm_QueryClose(Cancel As Integer, CloseMode As Integer)
-            If CloseMode = vbFormControlMenu Then
-                Cancel = True
-            End If
-        End Sub
-        '''
-
-        try:
-            # Agregar código a ThisWorkbook
-            thisworkbook_module = workbook.VBProject.VBComponents("ThisWorkbook")
-            thisworkbook_module.CodeModule.AddFromString(vba_thisworkbook)
-
-            # Crear UserForm
-            vb_components = workbook.VBProject.VBComponents
-            userform = vb_components.Add(3)  # 3 = vbext_ct_MSForm
-            userform.Name = "frmPonderaciones"
-            userform.Properties("Caption").Value = "Configurar Ponderaciones"
-            userform.Properties("Width").Value = 300
-            userform.Properties("Height").Value = 260
-
-            # Obtener el diseñador del form
-            designer = userform.Designer
-
-            # Crear controles
-            campos = [
-                ("Asistencia (%):", "txtAsistencia", 20),
-                ("Actividades (%):", "txtActividades", 50),
-                ("Evidencias (%):", "txtEvidencias", 80),
-                ("Producto Int. (%):", "txtProducto", 110),
-                ("Examen (%):", "txtExamen", 140),
-            ]
-
-            for label_text, textbox_name, top_pos in campos:
-                # Label
-                lbl = designer.Controls.Add("Forms.Label.1")
-                lbl.Caption = label_text
-                lbl.Left = 20
-                lbl.Top = top_pos
-                lbl.Width = 100
-                lbl.Height = 18
-
-                # TextBox
-                txt = designer.Controls.Add("Forms.TextBox.1")
-                txt.Name = textbox_name
-                txt.Left = 130
-                txt.Top = top_pos
-                txt.Width = 50
-                txt.Height = 18
-
-            # Label Total
-            lbl_total = designer.Controls.Add("Forms.Label.1")
-            lbl_total.Name = "lblTotal"
-            lbl_total.Caption = "Total: 100%"
-            lbl_total.Left = 20
-            lbl_total.Top = 175
-            lbl_total.Width = 120
-            lbl_total.Height = 20
-
-            # Botón Aceptar
-            btn_ok = designer.Controls.Add("Forms.CommandButton.1")
-            btn_ok.Name = "btnAceptar"
-            btn_ok.Caption = "Aceptar"
-            btn_ok.Left = 60
-            btn_ok.Top = 200
-            btn_ok.Width = 70
-            btn_ok.Height = 25
-
-            # Botón Cancelar
-            btn_cancel = designer.Controls.Add("Forms.CommandButton.1")
-            btn_cancel.Name = "btnCancelar"
-            btn_cancel.Caption = "Cancelar"
-            btn_cancel.Left = 140
-            btn_cancel.Top = 200
-            btn_cancel.Width = 70
-            btn_cancel.Height = 25
-
-            # Agregar código al UserForm
-            userform.CodeModule.AddFromString(vba_userform)
-
-            print("Modal VBA agregado exitosamente")
-
-        except Exception as e:
-            print(f"Advertencia: No se pudo agregar VBA: {e}", file=sys.stderr)
-
+        fila_inicio_alumnos = g.fila_ini  # Fila donde inician los alumnos
+
+        # Grupos de más de 45 alumnos: se insertan filas antes del pie de cada
+        # hoja (General 54, Parcial 53) copiando la última fila de datos, como
+        # lo haría el usuario en Excel (fórmulas, formatos y rangos se ajustan).
+        from filas_dinamicas import capacidad_para
+        capacidad = capacidad_para(len(alumnos), diseno.capacidad)
+        extra = capacidad - diseno.capacidad
+        if extra:
+            for nombre, ins in [(g.hoja, g.fila_fin)] + [(p.hoja, p.fila_fin)
+                                                         for p in diseno.parciales]:
+                ws = workbook.Worksheets(nombre)
+                nuevas = ws.Rows(f"{ins}:{ins + extra - 1}")
+                nuevas.Insert()
+                ws.Rows(ins - 1).Copy(nuevas)
+                crono.contar("llamadas_com", 5)
+            crono.marcar(f"Ampliar a {capacidad} filas")
+        diseno = ampliado(diseno, capacidad)
+        g = diseno.general
+
+        if alumnos:
+            # Número, matrícula y nombre en columnas contiguas (A, B, C): un
+            # solo Range; si no, una escritura por columna.
+            columnas = (g.col_numero, g.col_matricula, g.col_nombre)
+            filas = [(i + 1, alumno.get("matricula", ""), alumno.get("nombre", ""))
+                     for i, alumno in enumerate(alumnos)]
+            fila_fin = fila_inicio_alumnos + len(alumnos) - 1
+            if columnas == tuple(range(columnas[0], columnas[0] + 3)):
+                bloques = [(columnas[0], columnas[2], tuple(filas))]
+            else:
+                bloques = [(col, col, tuple((f[k],) for f in filas))
+                           for k, col in enumerate(columnas)]
+            for c1, c2, matriz in bloques:
+                sheet.Range(
+                    f"{num_a_col(c1)}{fila_inicio_alumnos}:{num_a_col(c2)}{fila_fin}"
+                ).Value = matriz
+            crono.contar("celdas_escritas", 3 * len(filas))
+            crono.contar("llamadas_com", 2 * len(bloques))
+        crono.marcar("SECCIÓN 3: Alumnos")
 
         # ========================================
         # SECCIÓN 4: Proteger hojas
         # ========================================
         password = "ppcdsalv"
 
-        for i in range(1, 5):  # Hojas 1 a 4
-            ws = workbook.Worksheets(i)
-
-            # Verificar si es la hoja "general"
-            if ws.Name == "General":
+        # Los rangos se traducen a rectángulos que ya incluyen el MergeArea
+        # completo de cada celda combinada (mapa leído del XML de la
+        # plantilla), así que basta un Range(...).Locked por rectángulo.
+        # Las columnas por encabezado vienen del diseño de la plantilla (se
+        # resuelven una vez por plantilla, no con ~400 lecturas COM por hoja
+        # en cada solicitud).
+        from backend_ooxml import compilar_plantilla
+        from rangos_bloqueo import a_ref, rectangulos
+
+        plantilla = compilar_plantilla(template_path, vba_path=None, capacidad=capacidad)
+        merges = plantilla.merges
+        fallos_bloqueo = []  # (hoja, rango, error)
+        columnas_encabezado = {}
+        respaldo_bd_bj = []
+
+        def fijar_locked(ws, rango, locked):
+            for rect in rectangulos(rango, merges.get(ws.Name, ())):
+                ref = a_ref(rect)
+                crono.contar("celdas_bloqueo", (rect[2] - rect[0] + 1) * (rect[3] - rect[1] + 1))
+                crono.contar("llamadas_com", 2)
+                try:
+                    ws.Range(ref).Locked = locked
+                except Exception as e:
+                    fallos_bloqueo.append((ws.Name, ref, e))
+
+        hojas = [(g.hoja, None)] + [(p.hoja, p) for p in diseno.parciales]
+        for nombre, p in hojas:
+            ws = workbook.Worksheets(nombre)
+
+            if p is None:
                 # Para la hoja "general": bloquear solo el rango D10:H54
-                
-                # Bloquear solo el rango D10:H54 y ocultar su contenido
-                # D = columna 4, H = columna 8
-                # Filas 10 a 54
-                for row in range(10, 55):  # Filas 10-54 (range es exclusivo al final)
-                    for col in range(4, 9):  # Columnas D(4) a H(8) (range es exclusivo al final)
-                        try:
-                            cell = ws.Cells(row, col)
-                            # Si es celda combinada, bloquear todo el MergeArea
-                            if cell.MergeCells:
-                                merge_area = cell.MergeArea
-                                merge_area.Locked = True
-                            else:
-                                cell.Locked = True
-                        except:
-                            pass  # Ignorar errores
+                # (más las filas agregadas)
+                fijar_locked(ws, (g.fila_ini, g.bloqueo[0], g.fila_fin, g.bloqueo[1]), True)
             else:
-                # Para las demás hojas: comportamiento original
+                # Para las hojas Parcial: comportamiento original
                 # Bloquear todas las celdas
                 ws.Cells.Locked = True
+                crono.contar("llamadas_com", 2)
 
-                # Desbloquear rango D7:BJ53 manejando celdas combinadas
-                for row in range(7, 54):  # Filas 7-53
-                    for col in range(4, 63):  # Columnas D(4) a BJ(62)
-                        try:
-                            cell = ws.Cells(row, col)
-                            # Si es celda combinada, desbloquear todo el MergeArea
-                            if cell.MergeCells:
-                                cell.MergeArea.Locked = False
-                            else:
-                                cell.Locked = False
-                        except:
-                            pass  # Ignorar errores
+                # Desbloquear rango D7:BJ53 (más las filas agregadas)
+                # manejando celdas combinadas
+                fila_ini, col_ini, col_fin = p.captura
+                fijar_locked(ws, (fila_ini, col_ini, p.fila_fin, col_fin), False)
 
                 # Bloquear rango por ENCABEZADO: "Producto del Parcial" ->
                 # "Porcentaje de asistencia" (incluye BB y BC además del rango
-                # previo BD..BJ). Se localizan las columnas por su encabezado
-                # (fila 6) para no depender de letras fijas. Filas de datos 9-53.
-                col_ini = buscar_columna_por_encabezado(ws, "Producto del Parcial")
-                col_fin = buscar_columna_por_encabezado(ws, "Porcentaje de asistencia")
-
-                if col_ini and col_fin and col_ini <= col_fin:
-                    rango_cols = range(col_ini, col_fin + 1)
+                # previo BD..BJ). Las columnas se localizaron por su
+                # encabezado al derivar el diseño, no por letras fijas.
+                if p.bloqueo:
+                    col_ini, col_fin = p.bloqueo
+                    columnas_encabezado[nombre] = p.bloqueo
                 else:
                     # Fallback defensivo: conserva el bloqueo previo BD9:BJ53
                     # (columnas 56-62) si no se hallan los encabezados, para no
                     # romper el pipeline si cambia el layout de la plantilla.
                     print(
                         "Advertencia: no se hallaron los encabezados "
-                        "'Producto del Parcial'/'Porcentaje de asistencia' en "
-                        f"la hoja '{ws.Name}'; se usa el rango fijo BD:BJ.",
+                        f"'{diseno.encabezados_bloqueo[0]}'/'{diseno.encabezados_bloqueo[1]}' "
+                        f"en la hoja '{nombre}'; se usa el rango fijo BD:BJ.",
                         file=sys.stderr,
                     )
-                    rango_cols = range(56, 63)  # BD(56) a BJ(62)
-
-                for row in range(9, 54):  # Filas 9-53 (range es exclusivo al final)
-                    for col in rango_cols:
-                        try:
-                            cell = ws.Cells(row, col)
-                            # Si es celda combinada, bloquear todo el MergeArea
-                            if cell.MergeCells:
-                                cell.MergeArea.Locked = True
-                            else:
-                                cell.Locked = True
-                        except:
-                            pass  # Ignorar errores
+                    col_ini, col_fin = diseno.respaldo_bloqueo
+                    respaldo_bd_bj.append(nombre)
+
+                fijar_locked(ws, (p.fila_ini, col_ini, p.fila_fin, col_fin), True)
 
             # Proteger la hoja
             ws.Protect(
@@ -382,7 +514,13 @@ def generar_evaluacion(data: dict, template_path: str, output_path: str):
                 Contents=True,
                 Scenarios=True
             )
-
+            crono.contar("llamadas_com", 2)  # Worksheets(nombre) y Protect
+            crono.marcar(f"SECCIÓN 4: Proteger {ws.Name}")
+        if fallos_bloqueo:
+            print(f"Advertencia: {len(fallos_bloqueo)} rango(s) no se pudieron "
+                  "bloquear/desbloquear:", file=sys.stderr)
+            for hoja, ref, e in fallos_bloqueo:
+                print(f"  {hoja}!{ref}: {e}", file=sys.stderr)
 
         # ========================================
         # Guardar archivo
@@ -393,17 +531,50 @@ def generar_evaluacion(data: dict, template_path: str, output_path: str):
         file_format = 52
 
         workbook.SaveAs(output_path, FileFormat=file_format)
+        # Excel mantiene abierto (y bloqueado en Windows) el archivo guardado
+        # hasta cerrar el libro: se cierra antes de reescribirlo.
+        workbook.Close(SaveChanges=False)
+        workbook = None
+        crono.contar("llamadas_com", 2)
+        crono.marcar("Guardar")
+
+        # ========================================
+        # SECCIÓN 5: Modal VBA para ponderaciones
+        # ========================================
+        # El proyecto VBA ya está compilado (proyecto_vba.py): se inyecta
+        # como xl/vbaProject.bin en el archivo guardado y cerrado.
+        if vba_path:
+            from backend_ooxml import inyectar_vba_xlsm
+            inyectar_vba_xlsm(output_path, vba_path)
+        else:
+            print("Advertencia: sin vbaProject.bin precompilado; el archivo se genera "
+                  "sin el modal VBA (ver proyecto_vba.py).", file=sys.stderr)
+        crono.marcar("SECCIÓN 5: Modal VBA")
 
     finally:
         # Cerrar recursos
         if workbook:
             workbook.Close(SaveChanges=False)
-        if excel:
+        if excel and excel_propio:
             excel.Quit()
 
         # Liberar objetos COM
         del workbook
         del excel
+        crono.marcar("Cerrar Excel")
+        crono.resumen("Tiempos (backend COM)")
+
+    tam, tam_plantilla = os.path.getsize(output_path), os.path.getsize(template_path)
+    print(f"Tamaño: {tam / 1024:.1f} KB (plantilla {tam_plantilla / 1024:.1f} KB)", file=sys.stderr)
+    return crono.traza(
+        backend="com",
+        alumnos=len(alumnos),
+        capacidad=capacidad,
+        columnas_encabezado=columnas_encabezado,
+        respaldo_bd_bj=respaldo_bd_bj,
+        bytes_salida=tam,
+        bytes_plantilla=tam_plantilla,
+    )
 
 
 if __name__ == "__main__":
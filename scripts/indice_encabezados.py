@@ -0,0 +1,90 @@
+"""
+Índice de la fila de encabezados de una hoja, compartido por el generador
+(generar_XLSX.py / backend_ooxml.py) y el verificador (verificar_bloqueo.py).
+
+`buscar_columna_por_encabezado` recorría hasta 200 columnas de la fila 6 en
+cada llamada, normalizando cada celda (y, bajo COM, con un viaje IPC por
+celda). El índice lee la fila una sola vez (un solo `Range.Value` en COM),
+normaliza cada encabezado una vez y guarda:
+  - {encabezado_normalizado: primera columna} para coincidencias exactas, y
+  - {token: {columnas}} para la coincidencia aproximada (todas las palabras
+    del texto buscado presentes en el encabezado),
+con el mismo resultado que el recorrido lineal: la coincidencia exacta gana;
+si no hay, la primera columna que contiene todos los tokens.
+"""
+
+import unicodedata
+
+
+FILA_ENCABEZADO = 6
+MAX_COL = 200
+
+
+def normalizar(s):
+    """Normaliza texto para comparar encabezados: sin acentos, minúsculas,
+    espacios colapsados."""
+    if s is None:
+        return ""
+    s = unicodedata.normalize("NFKD", str(s))
+    s = "".join(c for c in s if not unicodedata.combining(c))  # quita acentos
+    return " ".join(s.lower().split())
+
+
+def valores_fila(ws, fila=FILA_ENCABEZADO, max_col=MAX_COL):
+    """Valores de las columnas 1..max_col de `fila`, en una sola lectura.
+    Acepta una hoja COM (Range.Value), openpyxl (iter_rows) o cualquier hoja
+    con `cell(row=, column=)` / `Cells(fila, col)`."""
+    if hasattr(ws, "Range"):
+        return list(ws.Range(ws.Cells(fila, 1), ws.Cells(fila, max_col)).Value[0])
+    if hasattr(ws, "iter_rows"):
+        for valores in ws.iter_rows(min_row=fila, max_row=fila, max_col=max_col, values_only=True):
+            return list(valores)
+        return []
+    if hasattr(ws, "cell"):
+        return [ws.cell(row=fila, column=col).value for col in range(1, max_col + 1)]
+    return [ws.Cells(fila, col).Value for col in range(1, max_col + 1)]
+
+
+class IndiceEncabezados:
+    """Búsqueda O(1) de columnas por encabezado para una hoja."""
+
+    def __init__(self, valores):
+        """`valores`: encabezados de las columnas 1, 2, ... (None si vacía)."""
+        self.exactos = {}
+        self.por_token = {}
+        self.primera = None  # primera columna con encabezado
+        for col, valor in enumerate(valores, 1):
+            val = normalizar(valor)
+            if not val:
+                continue
+            if self.primera is None:
+                self.primera = col
+            self.exactos.setdefault(val, col)
+            for token in val.split():
+                self.por_token.setdefault(token, set()).add(col)
+        self._resueltos = {}
+
+    @classmethod
+    def de_hoja(cls, ws, fila=FILA_ENCABEZADO, max_col=MAX_COL):
+        return cls(valores_fila(ws, fila, max_col))
+
+    def buscar(self, texto):
+        """Columna cuyo encabezado coincide con `texto` (normalizado). Fallback:
+        la primera columna cuyo encabezado contiene todos los tokens de
+        `texto` (p.ej. "Producto Parcial" resuelve a "Producto del Parcial").
+        None si no se encuentra."""
+        if texto in self._resueltos:
+            return self._resueltos[texto]
+        objetivo = normalizar(texto)
+        col = self.exactos.get(objetivo)
+        if col is None:
+            tokens = objetivo.split()
+            if not tokens:
+                col = self.primera
+            else:
+                columnas = [self.por_token.get(t) for t in tokens]
+                if all(columnas):
+                    comunes = set.intersection(*columnas)
+                    col = min(comunes) if comunes else None
+        self._resueltos[texto] = col
+        return col
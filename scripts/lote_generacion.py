@@ -0,0 +1,114 @@
+"""
+Modo lote de generar_XLSX.py: genera los .xlsm de todos los grupos de un
+periodo en una sola invocación, en paralelo sobre los mismos workers del modo
+servidor (plantilla cargada una vez por worker).
+
+Entrada: arreglo JSON de grupos
+    [{"archivo": "1A_matematicas.xlsm", "alumnos": [{"matricula": ..., "nombre": ...}, ...]}, ...]
+Salida:
+    - `<destino>.zip`: un zip con todos los .xlsm (sin recomprimir),
+    - `-`: el mismo zip por stdout,
+    - cualquier otra ruta: un directorio con un .xlsm por grupo.
+
+Uso:
+    python scripts/generar_XLSX.py --lote [--workers N] [--backend ooxml] <grupos_json|-> <template_path> <destino>
+
+Los grupos que fallan se reportan en stderr y no detienen al resto; el código
+de salida es 1 si falló alguno.
+"""
+
+import json
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from servidor_generacion import generar_trabajo, iniciar_worker
+
+
+def leer_grupos(ruta):
+    """Lee y valida el arreglo de grupos (`-` = stdin)."""
+    if ruta == "-":
+        grupos = json.loads(sys.stdin.buffer.read())
+    else:
+        with open(ruta, "r", encoding="utf-8") as f:
+            grupos = json.load(f)
+    if not isinstance(grupos, list):
+        raise ValueError("se esperaba un arreglo JSON de grupos")
+    for i, grupo in enumerate(grupos):
+        if not isinstance(grupo, dict) or not isinstance(grupo.get("alumnos"), list):
+            raise ValueError(f"grupo {i}: se esperaba un objeto con la lista 'alumnos'")
+        if not isinstance(grupo.get("archivo"), str) or not grupo["archivo"].strip():
+            raise ValueError(f"grupo {i}: falta el nombre de 'archivo'")
+    return grupos
+
+
+def nombres_de_salida(grupos):
+    """Nombre de archivo seguro y único (.xlsm) para cada grupo."""
+    nombres, usados = [], set()
+    for grupo in grupos:
+        base = os.path.basename(grupo["archivo"].strip().replace("\\", "/")) or "grupo"
+        raiz, ext = os.path.splitext(base)
+        if ext.lower() != ".xlsm":
+            raiz = base
+        nombre, n = f"{raiz}.xlsm", 1
+        while nombre.lower() in usados:
+            n += 1
+            nombre = f"{raiz}_{n}.xlsm"
+        usados.add(nombre.lower())
+        nombres.append(nombre)
+    return nombres
+
+
+def generar_lote(grupos, template_path, destino, backend, workers):
+    """Genera todos los grupos y los escribe en `destino` conforme terminan.
+    Devuelve la lista de (archivo, error) de los grupos que fallaron."""
+    nombres = nombres_de_salida(grupos)
+    fallos = []
+    cache = {"acierto": 0, "fallo": 0}
+    t0 = time.perf_counter()
+
+    if destino == "-":
+        salida_zip = zipfile.ZipFile(sys.stdout.buffer, "w", zipfile.ZIP_STORED)
+        sys.stdout = sys.stderr
+    elif destino.lower().endswith(".zip"):
+        salida_zip = zipfile.ZipFile(destino, "w", zipfile.ZIP_STORED)
+    else:
+        salida_zip = None
+        os.makedirs(destino, exist_ok=True)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=iniciar_worker,
+                                 initargs=(template_path, backend)) as pool:
+            futuros = {pool.submit(generar_trabajo, {"alumnos": grupo["alumnos"]}): nombre
+                       for grupo, nombre in zip(grupos, nombres)}
+            for futuro in as_completed(futuros):
+                nombre = futuros[futuro]
+                try:
+                    contenido, _, traza = futuro.result()
+                except Exception as e:
+                    fallos.append((nombre, e))
+                    continue
+                resultado = traza.get("cache_salida", {}).get("resultado")
+                if resultado:
+                    cache[resultado] += 1
+                # El .xlsm ya es un zip comprimido: se guarda tal cual.
+                if salida_zip is not None:
+                    salida_zip.writestr(nombre, contenido)
+                else:
+                    with open(os.path.join(destino, nombre), "wb") as f:
+                        f.write(contenido)
+    finally:
+        if salida_zip is not None:
+            salida_zip.close()
+
+    total = time.perf_counter() - t0
+    print(f"Lote: {len(grupos) - len(fallos)}/{len(grupos)} archivos en {total:.1f} s "
+          f"({workers} workers, backend {backend})", file=sys.stderr)
+    if cache["acierto"] or cache["fallo"]:
+        print(f"  Caché de salida: {cache['acierto']} aciertos, {cache['fallo']} fallos",
+              file=sys.stderr)
+    for nombre, e in fallos:
+        print(f"  Error en {nombre}: {e}", file=sys.stderr)
+    return fallos
@@ -0,0 +1,190 @@
+"""
+Presupuesto de arranque de los scripts que lanza el servidor de Next.js.
+
+Cada `spawn('python', ...)` paga el arranque del intérprete más los imports
+del camino elegido. Para cada punto de entrada este script:
+  - precompila scripts/ (compileall) para que los módulos se carguen desde
+    __pycache__ aunque el entorno tenga PYTHONDONTWRITEBYTECODE o el
+    despliegue sea de solo lectura (--sin-precompilar lo omite);
+  - mide con `python -X importtime` el tiempo acumulado de sus imports (la
+    corrida más rápida de varias) y lo compara con el presupuesto;
+  - revisa que no se importe nada pesado que el camino no usa (openpyxl,
+    win32com, http, email, multiprocessing...);
+  - mide el arranque completo (intérprete + imports), mínimo de N procesos,
+    y lo compara descontando el del intérprete solo.
+
+Los presupuestos no son milisegundos fijos (dependerían de la máquina y de
+su carga): son múltiplos del arranque de `python -c pass` medido en la misma
+corrida, que escala igual que el resto. --holgura los multiplica a todos
+(p. ej. 1.5 en un runner de CI compartido).
+
+Cualquier presupuesto excedido o import prohibido es un fallo (código de
+salida 1). Corre como parte de `pnpm test` (package.json), así que una
+regresión de arranque o un import nuevo en un camino rápido (p. ej.
+backend_ooxml o zipfile en --formatos csv) hace fallar la verificación.
+
+Uso:
+    python scripts/presupuesto_arranque.py [--repeticiones 10] [--holgura 1.0]
+        [--sin-precompilar] [--json resultados.json]
+"""
+
+import argparse
+import compileall
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+DIR_SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+
+# Módulos que ningún camino rápido debe importar: solo los usan el backend COM,
+# el verificador con openpyxl o los modos con workers (servidor, lote, cola).
+PROHIBIDOS = (
+    "openpyxl", "win32com", "pythoncom", "http", "email", "urllib.request",
+    "multiprocessing", "concurrent.futures", "tempfile",
+)
+
+# punto de entrada -> (imports, presupuesto de imports, presupuesto de arranque
+# sin el intérprete, prohibidos además de PROHIBIDOS). Presupuestos en
+# múltiplos del arranque de `python -c pass` (ver medir_arranque).
+PRESUPUESTOS = {
+    # argparse lo importa main(): importar los módulos no debe cargarlo.
+    "generador (ooxml)": (
+        "import generar_XLSX, backend_ooxml, filas_dinamicas, cache_salidas", 4.0, 5.0,
+        ("argparse",)),
+    # Las salidas ligeras no deben cargar el generador del libro ni zipfile.
+    "generador --formatos csv": (
+        "import generar_XLSX, exportar_lista, diseno_plantilla", 2.5, 3.5,
+        ("argparse", "backend_ooxml", "zipfile")),
+    "verificar_bloqueo --rapido": ("import verificar_bloqueo", 4.0, 5.0, ()),
+    "extraer_calificaciones": ("import extraer_calificaciones", 4.0, 5.0, ()),
+}
+
+
+def precompilar():
+    """Escribe el bytecode de scripts/ en __pycache__ (compileall lo escribe
+    aunque PYTHONDONTWRITEBYTECODE esté activo)."""
+    return compileall.compile_dir(DIR_SCRIPTS, maxlevels=0, quiet=1)
+
+
+def medir_imports(codigo, repeticiones=1):
+    """(ms acumulados, {módulo: ms acumulados}) de los imports de `codigo`
+    según `python -X importtime`, de la corrida más rápida de
+    `repeticiones`. Solo cuentan las líneas de primer nivel después del
+    arranque del intérprete (los módulos de `codigo`)."""
+    return min((_medir_imports(codigo) for _ in range(repeticiones)), key=lambda r: r[0])
+
+
+def _medir_imports(codigo):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=DIR_SCRIPTS, capture_output=True, text=True, check=True,
+    )
+    solicitados = {m.strip() for m in codigo.removeprefix("import ").split(",")}
+    modulos = {}
+    total = 0.0
+    for linea in proc.stderr.splitlines():
+        if not linea.startswith("import time:") or "|" not in linea:
+            continue
+        _, acumulado, nombre = linea[len("import time:"):].split("|")
+        if not acumulado.strip().isdigit():
+            continue  # encabezado
+        ms = int(acumulado) / 1000
+        modulo = nombre.strip()
+        modulos[modulo] = max(modulos.get(modulo, 0.0), ms)
+        if nombre.startswith(" ") and not nombre.startswith("  ") and modulo in solicitados:
+            total += ms
+    return total, modulos
+
+
+def medir_arranque(codigo, repeticiones):
+    """Mínimo en ms de `repeticiones` procesos que solo ejecutan `codigo`."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", codigo], cwd=DIR_SCRIPTS, check=True)
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor * 1000
+
+
+def revisar(nombre, codigo, presupuesto_imports, presupuesto_arranque, prohibidos_extra,
+            repeticiones, interprete_ms, holgura=1.0):
+    """Mide `codigo` y lo compara con sus presupuestos (múltiplos de
+    `interprete_ms`, por `holgura`). El arranque se compara sin el del
+    intérprete: solo lo que agregan los imports."""
+    imports_ms, modulos = medir_imports(codigo, max(1, repeticiones // 2))
+    arranque_ms = medir_arranque(codigo, repeticiones)
+    extra_ms = max(0.0, arranque_ms - interprete_ms)
+    limite_imports = presupuesto_imports * holgura * interprete_ms
+    limite_arranque = presupuesto_arranque * holgura * interprete_ms
+    prohibidos = sorted(m for m in modulos if any(m == p or m.startswith(p + ".")
+                                                 for p in PROHIBIDOS + prohibidos_extra))
+    fallas = []
+    if imports_ms > limite_imports:
+        fallas.append(f"imports {imports_ms:.1f} ms > {limite_imports:.1f} ms "
+                      f"({presupuesto_imports * holgura:g}x intérprete)")
+    if extra_ms > limite_arranque:
+        fallas.append(f"arranque +{extra_ms:.1f} ms sobre el intérprete > "
+                      f"{limite_arranque:.1f} ms ({presupuesto_arranque * holgura:g}x intérprete)")
+    if prohibidos:
+        fallas.append("importa " + ", ".join(prohibidos))
+    return {
+        "punto_entrada": nombre,
+        "imports_ms": round(imports_ms, 1),
+        "presupuesto_imports_ms": round(limite_imports, 1),
+        "arranque_ms": round(arranque_ms, 1),
+        "arranque_extra_ms": round(extra_ms, 1),
+        "presupuesto_arranque_ms": round(limite_arranque, 1),
+        "mas_pesados": {m: round(ms, 1) for m, ms in sorted(
+            modulos.items(), key=lambda x: -x[1])[:8]},
+        "fallas": fallas,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeticiones", type=int, default=10,
+                        help="procesos por punto de entrada para el arranque (se toma el mínimo)")
+    parser.add_argument("--holgura", type=float, default=1.0,
+                        help="multiplica todos los presupuestos (máquinas ruidosas)")
+    parser.add_argument("--sin-precompilar", action="store_true",
+                        help="no ejecutar compileall antes de medir")
+    parser.add_argument("--json", metavar="ruta", help="escribe los resultados en `ruta`")
+    args = parser.parse_args()
+
+    if not args.sin_precompilar and not precompilar():
+        print("Error: compileall falló en scripts/", file=sys.stderr)
+        sys.exit(1)
+
+    interprete_ms = medir_arranque("pass", args.repeticiones)
+    print(f"Intérprete (python -c pass): {interprete_ms:.1f} ms")
+
+    resultados = []
+    for nombre, (codigo, presupuesto_imports, presupuesto_arranque,
+                 prohibidos_extra) in PRESUPUESTOS.items():
+        r = revisar(nombre, codigo, presupuesto_imports, presupuesto_arranque, prohibidos_extra,
+                    max(1, args.repeticiones), interprete_ms, args.holgura)
+        resultados.append(r)
+        estado = "FALLA" if r["fallas"] else "ok"
+        print(f"[{estado:>5}] {nombre:<28} imports {r['imports_ms']:6.1f} ms "
+              f"(<= {r['presupuesto_imports_ms']})  arranque +{r['arranque_extra_ms']:5.1f} ms "
+              f"(<= {r['presupuesto_arranque_ms']})")
+        for falla in r["fallas"]:
+            print(f"        {falla}")
+        if r["fallas"]:
+            pesados = ", ".join(f"{m} {ms} ms" for m, ms in r["mas_pesados"].items())
+            print(f"        más pesados: {pesados}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"interprete_ms": round(interprete_ms, 1), "holgura": args.holgura,
+                       "resultados": resultados},
+                      f, ensure_ascii=False, indent=2)
+
+    sys.exit(1 if any(r["fallas"] for r in resultados) else 0)
+
+
+if __name__ == "__main__":
+    main()
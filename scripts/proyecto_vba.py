@@ -0,0 +1,313 @@
+"""
+Proyecto VBA del modal de ponderaciones (frmPonderaciones), precompilado.
+
+El código VBA y el diseño del formulario (campos de ponderación) viven aquí.
+El proyecto se construye con Excel una sola vez (VBProject: requiere "Confiar
+en el acceso al modelo de objetos de proyectos de VBA") y se guarda como
+templates/vba/vbaProject-<huella>.bin, con un .json al lado con los codeNames
+de libro y hojas. <huella> es el SHA-256 del código y de los campos, así que
+solo se vuelve a construir cuando cambian. Ambos backends inyectan ese
+binario como la parte xl/vbaProject.bin del zip; ninguna solicitud toca
+VBProject. El templates/vbaProject.bin de versiones anteriores no tiene
+huella y no cuenta como compilado; solo se usa con GENERADOR_VBA_LEGADO=1.
+
+El backend OOXML no puede compilarlo (no hay Excel): sin el .bin de la huella
+vigente se niega a generar (ver vba_requerido), salvo con --sin-vba o
+GENERADOR_SIN_VBA=1, que generan explícitamente sin el modal. Para producirlo,
+en una máquina Windows con Excel y el acceso de confianza a VBProject activo:
+    python scripts/proyecto_vba.py            # escribe templates/vba/vbaProject-<huella>.bin (+ .json)
+y versionar ambos archivos. Cada cambio de VBA_THISWORKBOOK, VBA_USERFORM,
+FORMULARIO, CAMPOS o CONTROLES cambia la huella y exige repetirlo; --huella
+muestra la ruta esperada y si ya existe.
+
+Uso (Windows con Excel; el .bin resultante sirve también al backend OOXML):
+    python scripts/proyecto_vba.py [--template templates/Template.xlsx]
+    python scripts/proyecto_vba.py --huella
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+
+DIR_SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+DIR_VBA = os.path.join(DIR_SCRIPTS, "..", "templates", "vba")
+TEMPLATE_DEFAULT = os.path.join(DIR_SCRIPTS, "..", "templates", "Template.xlsx")
+# Ubicación anterior (extraída a mano con --extraer-vba). No tiene huella, así
+# que no cuenta como acierto: solo se usa si no hay .bin para la huella vigente
+# y GENERADOR_VBA_LEGADO=1 lo pide explícitamente (con advertencia).
+VBA_BIN_LEGADO = os.path.join(DIR_SCRIPTS, "..", "templates", "vbaProject.bin")
+
+# Código VBA para ThisWorkbook (se ejecuta al abrir)
+VBA_THISWORKBOOK = '''\
+Private Sub Workbook_Open()
+    ' Mostrar modal solo si las ponderaciones aún no se han configurado (sentinela -1)
+    If Worksheets(1).Range("D7").Value < 0 Then
+        frmPonderaciones.Show
+    End If
+End Sub
+'''
+
+# Código VBA para el UserForm
+VBA_USERFORM = '''\
+Option Explicit
+
+Private Sub UserForm_Initialize()
+    txtAsistencia.Value = "10"
+    txtActividades.Value = "20"
+    txtEvidencias.Value = "20"
+    txtProducto.Value = "20"
+    txtExamen.Value = "30"
+    ActualizarTotal
+End Sub
+
+Private Sub txtAsistencia_Change()
+    ActualizarTotal
+End Sub
+
+Private Sub txtActividades_Change()
+    ActualizarTotal
+End Sub
+
+Private Sub txtEvidencias_Change()
+    ActualizarTotal
+End Sub
+
+Private Sub txtProducto_Change()
+    ActualizarTotal
+End Sub
+
+Private Sub txtExamen_Change()
+    ActualizarTotal
+End Sub
+
+Private Sub ActualizarTotal()
+    Dim total As Double
+    On Error Resume Next
+    total = Val(txtAsistencia.Value) + Val(txtActividades.Value) + _
+            Val(txtEvidencias.Value) + Val(txtProducto.Value) + Val(txtExamen.Value)
+    lblTotal.Caption = "Total: " & total & "%"
+
+    If total = 100 Then
+        lblTotal.ForeColor = &H008000
+        btnAceptar.Enabled = True
+    Else
+        lblTotal.ForeColor = &H0000FF
+        btnAceptar.Enabled = False
+    End If
+End Sub
+
+Private Sub btnAceptar_Click()
+    Dim ws As Worksheet
+    Set ws = ThisWorkbook.Worksheets(1)
+
+    ws.Unprotect Password:="ppcdsalv"
+
+    ws.Range("D7").Value = Val(txtAsistencia.Value) / 100
+    ws.Range("E7").Value = Val(txtActividades.Value) / 100
+    ws.Range("F7").Value = Val(txtEvidencias.Value) / 100
+    ws.Range("G7").Value = Val(txtProducto.Value) / 100
+    ws.Range("H7").Value = Val(txtExamen.Value) / 100
+
+    ws.Protect Password:="ppcdsalv", Contents:=True
+
+    Unload Me
+End Sub
+
+Private Sub btnCancelar_Click()
+    Unload Me
+End Sub
+
+Private Sub UserForm_QueryClose(Cancel As Integer, CloseMode As Integer)
+    If CloseMode = vbFormControlMenu Then
+        Cancel = True
+    End If
+End Sub
+'''
+
+FORMULARIO = {"Name": "frmPonderaciones", "Caption": "Configurar Ponderaciones",
+              "Width": 300, "Height": 260}
+
+# Campos de ponderación: (etiqueta, textbox, top)
+CAMPOS = [
+    ("Asistencia (%):", "txtAsistencia", 20),
+    ("Actividades (%):", "txtActividades", 50),
+    ("Evidencias (%):", "txtEvidencias", 80),
+    ("Producto Int. (%):", "txtProducto", 110),
+    ("Examen (%):", "txtExamen", 140),
+]
+
+# Controles fijos: (progID, Name, Caption, Left, Top, Width, Height)
+CONTROLES = [
+    ("Forms.Label.1", "lblTotal", "Total: 100%", 20, 175, 120, 20),
+    ("Forms.CommandButton.1", "btnAceptar", "Aceptar", 60, 200, 70, 25),
+    ("Forms.CommandButton.1", "btnCancelar", "Cancelar", 140, 200, 70, 25),
+]
+
+
+def huella():
+    """SHA-256 del código VBA y del diseño del formulario."""
+    fuente = json.dumps([VBA_THISWORKBOOK, VBA_USERFORM, FORMULARIO, CAMPOS, CONTROLES],
+                        ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(fuente.encode("utf-8")).hexdigest()
+
+
+def ruta_bin(h=None):
+    return os.path.join(DIR_VBA, f"vbaProject-{(h or huella())[:16]}.bin")
+
+
+def vba_precompilado():
+    """Ruta del vbaProject.bin de la huella vigente; si no existe, el de la
+    ubicación anterior solo con GENERADOR_VBA_LEGADO=1 (ver vba_legado).
+    None si no hay."""
+    ruta = ruta_bin()
+    if os.path.exists(ruta):
+        return ruta
+    return vba_legado()
+
+
+def vba_requerido():
+    """Como vba_precompilado, pero sin .bin lanza FileNotFoundError: el
+    archivo saldría sin el modal de ponderaciones. Con GENERADOR_SIN_VBA=1
+    devuelve None (generar sin el modal es entonces explícito)."""
+    ruta = vba_precompilado()
+    if ruta or os.environ.get("GENERADOR_SIN_VBA") == "1":
+        return ruta
+    raise FileNotFoundError(
+        f"No existe '{ruta_bin()}': sin él el archivo saldría sin el modal de "
+        "ponderaciones. Compílelo en Windows con Excel (python scripts/proyecto_vba.py) "
+        "y versiónelo, o genere sin el modal con --sin-vba (GENERADOR_SIN_VBA=1).")
+
+
+_LEGADO_AVISADO = set()
+
+
+def vba_legado():
+    """templates/vbaProject.bin si GENERADOR_VBA_LEGADO=1 y existe, None si
+    no. Puede no corresponder al código ni a los campos vigentes: se advierte
+    una vez por proceso y huella."""
+    if os.environ.get("GENERADOR_VBA_LEGADO") != "1" or not os.path.exists(VBA_BIN_LEGADO):
+        return None
+    if huella() not in _LEGADO_AVISADO:
+        _LEGADO_AVISADO.add(huella())
+        print(f"Advertencia: no existe '{ruta_bin()}'; se usa '{VBA_BIN_LEGADO}' "
+              "(GENERADOR_VBA_LEGADO=1), que puede no corresponder al código VBA "
+              "vigente.", file=sys.stderr)
+    return VBA_BIN_LEGADO
+
+
+def construir_en_libro(workbook):
+    """Agrega el código de ThisWorkbook y el UserForm a `workbook` (COM).
+    Devuelve el número de llamadas COM."""
+    thisworkbook_module = workbook.VBProject.VBComponents("ThisWorkbook")
+    thisworkbook_module.CodeModule.AddFromString(VBA_THISWORKBOOK)
+
+    userform = workbook.VBProject.VBComponents.Add(3)  # 3 = vbext_ct_MSForm
+    for propiedad, valor in FORMULARIO.items():
+        if propiedad == "Name":
+            userform.Name = valor
+        else:
+            userform.Properties(propiedad).Value = valor
+
+    designer = userform.Designer
+    for label_text, textbox_name, top_pos in CAMPOS:
+        lbl = designer.Controls.Add("Forms.Label.1")
+        lbl.Caption = label_text
+        lbl.Left, lbl.Top, lbl.Width, lbl.Height = 20, top_pos, 100, 18
+
+        txt = designer.Controls.Add("Forms.TextBox.1")
+        txt.Name = textbox_name
+        txt.Left, txt.Top, txt.Width, txt.Height = 130, top_pos, 50, 18
+
+    for prog_id, nombre, caption, left, top, width, height in CONTROLES:
+        control = designer.Controls.Add(prog_id)
+        control.Name = nombre
+        control.Caption = caption
+        control.Left, control.Top, control.Width, control.Height = left, top, width, height
+
+    userform.CodeModule.AddFromString(VBA_USERFORM)
+    return 4 + 11 + 2 * 7 * len(CAMPOS) + 8 * len(CONTROLES) + 2
+
+
+def compilar_vba(excel, template_path=TEMPLATE_DEFAULT):
+    """Construye el proyecto sobre una copia de la plantilla, lo guarda y
+    extrae su vbaProject.bin a `ruta_bin()`. Devuelve la ruta."""
+    import shutil
+    import tempfile
+
+    from backend_ooxml import extraer_vba
+
+    destino = ruta_bin()
+    os.makedirs(DIR_VBA, exist_ok=True)
+    # Mismo sistema de archivos que el destino (os.replace atómico) y otro
+    # nombre de libro: Excel no abre dos libros con el mismo nombre.
+    tmp_dir = tempfile.mkdtemp(dir=DIR_VBA)
+    try:
+        copia = os.path.join(tmp_dir, "vba_" + os.path.basename(template_path))
+        shutil.copyfile(template_path, copia)
+        salida = os.path.join(tmp_dir, "vba.xlsm")
+        workbook = excel.Workbooks.Open(os.path.abspath(copia))
+        try:
+            construir_en_libro(workbook)
+            workbook.SaveAs(os.path.abspath(salida), FileFormat=52)
+        finally:
+            workbook.Close(SaveChanges=False)
+
+        bin_tmp = os.path.join(tmp_dir, "vbaProject.bin")
+        extraer_vba(salida, bin_tmp)
+        # El .bin al final: su existencia indica que el par está completo.
+        os.replace(os.path.splitext(bin_tmp)[0] + ".json", os.path.splitext(destino)[0] + ".json")
+        os.replace(bin_tmp, destino)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return destino
+
+
+_FALLIDAS = set()
+
+
+def asegurar_vba(excel, template_path):
+    """vbaProject.bin de la huella vigente; si falta, lo compila con `excel`
+    (una vez por proceso: si falla, p.ej. sin acceso de confianza a
+    VBProject, no se reintenta en cada solicitud). Si no se pudo compilar,
+    el de la ubicación anterior con GENERADOR_VBA_LEGADO=1; si no, None."""
+    ruta = ruta_bin()
+    if os.path.exists(ruta):
+        return ruta
+    if huella() not in _FALLIDAS:
+        try:
+            return compilar_vba(excel, template_path)
+        except Exception as e:
+            _FALLIDAS.add(huella())
+            print(f"Advertencia: No se pudo compilar el proyecto VBA: {e}", file=sys.stderr)
+    return vba_legado()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="proyecto_vba.py",
+        description="Compila el modal VBA de ponderaciones a templates/vba/vbaProject-<huella>.bin.",
+    )
+    parser.add_argument("--template", default=TEMPLATE_DEFAULT)
+    parser.add_argument("--huella", action="store_true",
+                        help="solo imprime la huella vigente y la ruta del .bin")
+    args = parser.parse_args()
+
+    if args.huella:
+        ruta = ruta_bin()
+        print(f"{huella()}\n{ruta} ({'existe' if os.path.exists(ruta) else 'no existe'})")
+        return
+
+    from generar_XLSX import iniciar_excel
+    excel = iniciar_excel()
+    try:
+        print(f"vbaProject.bin compilado en {compilar_vba(excel, args.template)}")
+    finally:
+        excel.Quit()
+
+
+if __name__ == "__main__":
+    main()
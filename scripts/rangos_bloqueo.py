@@ -0,0 +1,77 @@
+"""
+Rangos de bloqueo/desbloqueo precalculados a partir del mapa de celdas
+combinadas de la plantilla.
+
+El backend COM recorría cada celda de un rango preguntando `cell.MergeCells`
+y escribiendo `Locked` (~2,800 viajes COM por hoja). Aquí el mapa de celdas
+combinadas se lee una sola vez del XML de la plantilla (sin Excel) y cada
+rango se traduce a unos pocos rectángulos que:
+  - cubren exactamente las mismas celdas que el recorrido celda por celda
+    (el rango más el área completa de cada combinada que lo toca), y
+  - nunca cortan una celda combinada (Excel rechaza cambiar `Locked` en
+    parte de un MergeArea),
+de modo que basta un `ws.Range(ref).Locked = ...` por rectángulo.
+"""
+
+from functools import lru_cache
+
+from backend_ooxml import compilar_plantilla, num_a_col
+
+
+def merges_plantilla(template_path):
+    """{nombre_hoja: (areas...)} con las celdas combinadas de cada hoja,
+    tomado de la plantilla compilada (caché por contenido del archivo)."""
+    return compilar_plantilla(template_path, vba_path=None).merges
+
+
+def a_ref(rect):
+    """(fila_ini, col_ini, fila_fin, col_fin) -> 'D7:BJ53' (o 'D7' si es una celda)."""
+    f1, c1, f2, c2 = rect
+    ini = f"{num_a_col(c1)}{f1}"
+    return ini if (f1, c1) == (f2, c2) else f"{ini}:{num_a_col(c2)}{f2}"
+
+
+@lru_cache(maxsize=256)
+def rectangulos(rango, merges):
+    """Descompone `rango` (fila_ini, col_ini, fila_fin, col_fin), ampliado con
+    las celdas combinadas que lo tocan, en rectángulos que no cortan ninguna
+    combinada. `merges` es la tupla de áreas de la hoja."""
+    f1, c1, f2, c2 = rango
+    pendientes = {(f, c) for f in range(f1, f2 + 1) for c in range(c1, c2 + 1)}
+    merge_de = {}
+    for area in merges:
+        af1, ac1, af2, ac2 = area
+        if af1 > f2 or af2 < f1 or ac1 > c2 or ac2 < c1:
+            continue
+        for f in range(af1, af2 + 1):
+            for c in range(ac1, ac2 + 1):
+                merge_de[(f, c)] = area
+                pendientes.add((f, c))
+
+    def _valido(celdas, rf1, rc1, rf2, rc2):
+        # Las celdas nuevas deben estar pendientes y sus combinadas, completas
+        # dentro del rectángulo candidato.
+        for celda in celdas:
+            if celda not in pendientes:
+                return False
+            area = merge_de.get(celda)
+            if area and not (rf1 <= area[0] and area[2] <= rf2
+                             and rc1 <= area[1] and area[3] <= rc2):
+                return False
+        return True
+
+    rects = []
+    for inicio in sorted(pendientes):
+        if inicio not in pendientes:
+            continue
+        rf1, rc1, rf2, rc2 = merge_de.get(inicio, inicio + inicio)
+        # Crecer a la derecha y luego hacia abajo mientras siga siendo válido.
+        while _valido([(f, rc2 + 1) for f in range(rf1, rf2 + 1)], rf1, rc1, rf2, rc2 + 1):
+            rc2 += 1
+        while _valido([(rf2 + 1, c) for c in range(rc1, rc2 + 1)], rf1, rc1, rf2 + 1, rc2):
+            rf2 += 1
+        rects.append((rf1, rc1, rf2, rc2))
+        for f in range(rf1, rf2 + 1):
+            for c in range(rc1, rc2 + 1):
+                pendientes.discard((f, c))
+    return tuple(rects)
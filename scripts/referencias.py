@@ -0,0 +1,47 @@
+"""
+Referencias de celda (letras de columna <-> número), compartidas por el
+generador (backend_ooxml.py y sus módulos), el verificador
+(verificar_bloqueo.py) y el extractor (extraer_calificaciones.py).
+
+Sin dependencias fuera de `re`, para que el verificador y el extractor no
+carguen el generador solo por estas conversiones.
+"""
+
+import re
+
+
+_COL_CACHE = {}
+_LETRAS_CACHE = {}
+_RE_CELDA = re.compile(r"([A-Z]+)(\d+)$")
+
+
+def col_a_num(letras):
+    """'BD' -> 56."""
+    n = _COL_CACHE.get(letras)
+    if n is None:
+        n = 0
+        for ch in letras:
+            n = n * 26 + (ord(ch) - 64)
+        _COL_CACHE[letras] = n
+    return n
+
+
+def num_a_col(n):
+    """56 -> 'BD'."""
+    letras = _LETRAS_CACHE.get(n)
+    if letras is None:
+        letras, k = "", n
+        while k:
+            k, r = divmod(k - 1, 26)
+            letras = chr(65 + r) + letras
+        _LETRAS_CACHE[n] = letras
+    return letras
+
+
+def parse_ref(ref):
+    """'A1:B2' -> (fila_ini, col_ini, fila_fin, col_fin); 'A1' -> (1, 1, 1, 1)."""
+    partes = ref.split(":")
+    m1 = _RE_CELDA.match(partes[0])
+    m2 = _RE_CELDA.match(partes[-1])
+    return (int(m1.group(2)), col_a_num(m1.group(1)),
+            int(m2.group(2)), col_a_num(m2.group(1)))
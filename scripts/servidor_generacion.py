@@ -0,0 +1,125 @@
+"""
+Modo servidor de generar_XLSX.py: un proceso de larga vida con N workers
+"calientes" (plantilla ya compilada y, en el backend COM, Excel ya abierto).
+
+Protocolo (stdin/stdout, un trabajo por línea):
+  entrada:  {"id": "<id>", "data": {"alumnos": [...]}, "formato": "xlsm"}\\n
+  salida:   {"id": "<id>", "ok": true, "bytes": N, "ms": 12.3, "traza": {...}}\\n  + N bytes del archivo
+            {"id": "<id>", "ok": false, "error": "..."}\\n
+`formato` es opcional (default "xlsm"); "csv", "jsonl" y "ods" son las salidas
+ligeras de exportar_lista.py: se escriben en el proceso principal, sin ocupar
+un worker. Las respuestas salen en el orden en que terminan los trabajos (no
+en el de llegada); el cliente las empareja por `id`. Al cerrar stdin se
+terminan los trabajos pendientes y el proceso sale.
+
+Uso:
+    python scripts/generar_XLSX.py --servidor [--workers N] [--backend ooxml] <template_path>
+"""
+
+import io
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from generar_XLSX import generar_bytes, iniciar_excel
+
+
+# Estado por proceso worker (se llena en iniciar_worker). El modo lote
+# (lote_generacion.py) usa los mismos workers.
+_worker = {}
+
+
+def iniciar_worker(template_path, backend):
+    # stdout del proceso padre transporta los .xlsm: cualquier print de los
+    # generadores debe ir a stderr.
+    sys.stdout = sys.stderr
+    _worker["template_path"] = template_path
+    _worker["backend"] = backend
+    _worker["excel"] = None
+    if backend == "ooxml":
+        from backend_ooxml import compilar_plantilla
+        compilar_plantilla(template_path)
+    else:
+        _worker["excel"] = iniciar_excel()
+
+
+def _listo():
+    return True
+
+
+def generar_trabajo(data):
+    t0 = time.perf_counter()
+    contenido, traza = generar_bytes(data, _worker["template_path"], _worker["backend"],
+                                     excel=_worker["excel"])
+    return contenido, (time.perf_counter() - t0) * 1000, traza
+
+
+def exportar_ligero(id_trabajo, data, formato, template_path, responder):
+    """Trabajo de una salida ligera (exportar_lista.py), en el proceso principal."""
+    from diseno_plantilla import cargar
+    from exportar_lista import exportar
+    t0 = time.perf_counter()
+    buffer = io.BytesIO()
+    try:
+        exportar(data, cargar(template_path), formato, buffer)
+    except Exception as e:
+        responder({"id": id_trabajo, "ok": False, "error": str(e)})
+        return
+    contenido = buffer.getvalue()
+    responder({"id": id_trabajo, "ok": True, "bytes": len(contenido),
+               "ms": round((time.perf_counter() - t0) * 1000, 1),
+               "traza": {"formato": formato, "alumnos": len(data.get("alumnos", []))}},
+              contenido)
+
+
+def servir(template_path, backend, workers, entrada=None, salida=None):
+    entrada = entrada or sys.stdin
+    salida = salida or sys.stdout.buffer
+    sys.stdout = sys.stderr  # ver iniciar_worker
+    candado = threading.Lock()
+
+    def responder(encabezado, contenido=b""):
+        linea = (json.dumps(encabezado, ensure_ascii=False) + "\n").encode("utf-8")
+        with candado:
+            salida.write(linea)
+            if contenido:
+                salida.write(contenido)
+            salida.flush()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=iniciar_worker,
+                             initargs=(template_path, backend)) as pool:
+        # Calentar todos los workers antes de aceptar trabajos.
+        for f in [pool.submit(_listo) for _ in range(workers)]:
+            f.result()
+        print(f"Servidor de generación listo ({workers} workers, backend {backend})",
+              file=sys.stderr)
+
+        for linea in entrada:
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                trabajo = json.loads(linea)
+                id_trabajo = trabajo["id"]
+                data = trabajo["data"]
+                formato = trabajo.get("formato", "xlsm")
+            except (json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+                responder({"id": None, "ok": False, "error": f"Trabajo inválido: {e}"})
+                continue
+
+            if formato != "xlsm":
+                exportar_ligero(id_trabajo, data, formato, template_path, responder)
+                continue
+
+            def terminado(futuro, id_trabajo=id_trabajo):
+                try:
+                    contenido, ms, traza = futuro.result()
+                except Exception as e:
+                    responder({"id": id_trabajo, "ok": False, "error": str(e)})
+                    return
+                responder({"id": id_trabajo, "ok": True, "bytes": len(contenido),
+                           "ms": round(ms, 1), "traza": traza}, contenido)
+
+            pool.submit(generar_trabajo, data).add_done_callback(terminado)
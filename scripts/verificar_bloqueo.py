@@ -3,7 +3,8 @@ Verificador cross-platform (openpyxl) del bloqueo de columnas en el .xlsm genera
 
 Confirma, en cada hoja de parcial, los criterios de aceptación:
   1. El rango "Producto del Parcial" -> "Porcentaje de asistencia" (por encabezado)
-     queda bloqueado (locked=True) en las filas de datos 9-53.
+     queda bloqueado (locked=True) en las filas de datos 9-53 (o hasta la fila
+     del último alumno, si el grupo no cabe en las 45 filas de la plantilla).
   2. Las columnas previamente bloqueadas (BD:BJ = 56-62) siguen bloqueadas.
   3. Las celdas de captura a la izquierda del rango siguen editables (locked=False).
   4. La protección de hoja está activa (ws.protection.sheet is True).
@@ -11,57 +12,56 @@ Confirma, en cada hoja de parcial, los criterios de aceptación:
 A diferencia del generador (win32com / Windows), este script usa openpyxl y corre
 en cualquier sistema operativo, sobre un archivo ya generado.
 
+Con --rapido no usa openpyxl: lee cada xl/worksheets/sheetN.xml en streaming
+(expat por bloques, memoria constante) y resuelve el `s=` de cada celda contra una
+tabla locked/unlocked de cellXfs precalculada de styles.xml. Solo se conservan
+la fila de encabezados y las filas de datos, en una sola pasada por hoja.
+
+Hojas, filas, encabezados y columnas de muestra salen del diseño de la
+plantilla con la que se generaron los archivos (diseno_plantilla.py,
+--plantilla; default templates/Template.xlsx).
+
 Uso:
-    python scripts/verificar_bloqueo.py <ruta_al_xlsm>
+    python scripts/verificar_bloqueo.py [--rapido] [--plantilla p.xlsx|p.diseno.json] <ruta_al_xlsm>
+    python scripts/verificar_bloqueo.py --rapido [--workers N] [--reporte r.json|r.csv] <dir|glob|xlsm>...
+
+Con varios archivos (o directorios/globs) se verifican en un pool de procesos,
+se imprime una línea por archivo y, con --reporte, se escribe un reporte JSON
+(por archivo, con detalle por hoja) o CSV (una fila por hoja) con los conteos
+de celdas que fallan en cada criterio y el tiempo de cada archivo. El código de
+salida se agrega: 2 si algún archivo no se pudo leer, 1 si alguno no cumple, 0
+si todos cumplen.
 
 Nota (openpyxl): una celda con estilo por defecto reporta locked=True (default de
 Excel); las celdas desbloqueadas explícitamente reportan locked=False. En celdas
 combinadas la protección vive en la esquina superior izquierda.
 """
 
+import argparse
+import csv
+import glob
+import json
+import os
+import posixpath
 import sys
-import unicodedata
-
-try:
-    from openpyxl import load_workbook
-    from openpyxl.utils import get_column_letter
-except ImportError:
-    print("Error: falta 'openpyxl'. Instala con: pip install openpyxl", file=sys.stderr)
-    sys.exit(2)
-
-
-FILA_ENCABEZADO = 6
-FILA_DATOS_INI = 9
-FILA_DATOS_FIN = 53  # inclusive
-HEADER_INI = "Producto del Parcial"
-HEADER_FIN = "Porcentaje de asistencia"
-# Rango previo que ya estaba bloqueado (BD..BJ = 56..62).
-PREV_COL_INI, PREV_COL_FIN = 56, 62
-# Columnas de captura a muestrear (deben seguir editables): D, Z, AR.
-MUESTRA_EDITABLES = [4, 26, 44]
-
-
-def _norm(s):
-    if s is None:
-        return ""
-    s = unicodedata.normalize("NFKD", str(s))
-    s = "".join(c for c in s if not unicodedata.combining(c))
-    return " ".join(s.lower().split())
-
-
-def buscar_columna_por_encabezado(ws, texto, fila_encabezado=FILA_ENCABEZADO, max_col=200):
-    objetivo = _norm(texto)
-    tokens = objetivo.split()
-    aprox = None
-    for col in range(1, max_col + 1):
-        val = _norm(ws.cell(row=fila_encabezado, column=col).value)
-        if not val:
-            continue
-        if val == objetivo:
-            return col
-        if aprox is None and all(t in val.split() for t in tokens):
-            aprox = col
-    return aprox
+import time
+import zipfile
+from collections import namedtuple
+from xml.parsers import expat
+
+from diseno_plantilla import TEMPLATE_DEFAULT, ampliado
+from diseno_plantilla import cargar as cargar_diseno
+from indice_encabezados import IndiceEncabezados
+from referencias import col_a_num, num_a_col, parse_ref
+
+
+MAX_FILAS = 1048576
+
+# Nombres expat con namespace_separator=" ": "<uri> <local>".
+NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main "
+NS_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships "
+NS_REL = "http://schemas.openxmlformats.org/package/2006/relationships "
+BLOQUE = 64 * 1024
 
 
 def es_locked(cell):
@@ -70,90 +70,542 @@ def es_locked(cell):
     return bool(prot.locked) if prot is not None and prot.locked is not None else True
 
 
-def verificar_hoja(ws):
-    ok = True
+# ========================================
+# Modo rápido: lectura en streaming del XML
+# ========================================
+
+# Interfaz mínima de openpyxl que usa verificar_hoja.
+ProteccionCelda = namedtuple("ProteccionCelda", "locked")
+ProteccionHoja = namedtuple("ProteccionHoja", "sheet")
+CeldaStream = namedtuple("CeldaStream", "value protection")
+
+def _numero(texto):
+    """Valor numérico como lo devuelve openpyxl (int si es entero)."""
+    try:
+        return int(texto)
+    except ValueError:
+        try:
+            return float(texto)
+        except ValueError:
+            return texto
+
+
+def _parsear(z, ruta, inicio, fin=None, texto=None):
+    """Pasa la parte `ruta` del zip por expat en bloques (sin armar árbol)."""
+    p = expat.ParserCreate(namespace_separator=" ")
+    p.buffer_text = True
+    p.StartElementHandler = inicio
+    if fin:
+        p.EndElementHandler = fin
+    if texto:
+        p.CharacterDataHandler = texto
+    with z.open(ruta) as f:
+        while True:
+            bloque = f.read(BLOQUE)
+            p.Parse(bloque, not bloque)
+            if not bloque:
+                break
+
+
+def tabla_locked(z):
+    """[locked por índice de cellXfs] a partir de styles.xml (una vez por archivo)."""
+    tabla = []
+    estado = {"dentro": False}
+
+    def inicio(nombre, attrs):
+        if nombre == NS + "cellXfs":
+            estado["dentro"] = True
+        elif estado["dentro"] and nombre == NS + "xf":
+            tabla.append(True)  # sin <protection>: locked por defecto
+        elif estado["dentro"] and nombre == NS + "protection":
+            tabla[-1] = attrs.get("locked") not in ("0", "false")
+
+    def fin(nombre):
+        if nombre == NS + "cellXfs":
+            estado["dentro"] = False
+
+    _parsear(z, "xl/styles.xml", inicio, fin)
+    return tabla
+
+
+def _shared_strings(z):
+    if "xl/sharedStrings.xml" not in z.namelist():
+        return []
+    sst, partes = [], []
+    estado = {"t": False}
+
+    def inicio(nombre, attrs):
+        if nombre == NS + "si":
+            partes.clear()
+        elif nombre == NS + "t":
+            estado["t"] = True
+
+    def fin(nombre):
+        if nombre == NS + "t":
+            estado["t"] = False
+        elif nombre == NS + "si":
+            sst.append("".join(partes))
+
+    def texto(datos):
+        if estado["t"]:
+            partes.append(datos)
+
+    _parsear(z, "xl/sharedStrings.xml", inicio, fin, texto)
+    return sst
+
+
+def _hojas_del_libro(z):
+    """[(nombre, ruta_parte)] en el orden de pestañas."""
+    destinos, hojas = {}, []
+
+    def inicio_rels(nombre, attrs):
+        if nombre == NS_REL + "Relationship":
+            target = attrs["Target"]
+            destinos[attrs["Id"]] = (target.lstrip("/") if target.startswith("/")
+                                     else posixpath.normpath("xl/" + target))
+
+    def inicio_libro(nombre, attrs):
+        if nombre == NS + "sheet":
+            hojas.append((attrs["name"], attrs[NS_R + "id"]))
+
+    _parsear(z, "xl/_rels/workbook.xml.rels", inicio_rels)
+    _parsear(z, "xl/workbook.xml", inicio_libro)
+    return [(nombre, destinos[rid]) for nombre, rid in hojas]
+
+
+class HojaStream:
+    """Hoja leída en una sola pasada: solo guarda la fila de encabezados y las
+    filas de datos (estilo y valor), más la protección de hoja. Una celda sin
+    registro toma el estilo de su fila (customFormat) o columna, como en Excel.
+
+    `filas` son las filas que se conservan y `valores` las filas de las que
+    también se lee el valor (la de encabezados; extraer_calificaciones.py
+    lee así también las capturas con el mismo lector). De esas filas,
+    `formulas` guarda {(fila, col): texto de la fórmula} ("" en las celdas
+    de una fórmula compartida que no son la maestra)."""
+
+    def __init__(self, nombre, z, ruta, locked, sst, filas, valores=()):
+        self.title = nombre
+        self._locked = locked
+        self._celdas = {}  # (fila, col) -> [estilo, valor]
+        self._filas = {}   # fila -> estilo por defecto de la fila
+        self._cols = []    # (min, max, estilo)
+        self._protegida = False
+        self.merges = []   # (fila1, col1, fila2, col2)
+        self.formulas = {}
+        filas_interes, filas_valor = filas, valores
+        # fila actual (None si no interesa), celda en lectura de valor, su
+        # posición, texto (True en <v>/<t>, "f" en <f>)
+        estado = {"fila": None, "celda": None, "pos": None, "tipo": None, "texto": None}
+        texto = []
+        formula = []
+
+        tag_c, tag_row = NS + "c", NS + "row"
+        celdas = self._celdas
+
+        def inicio(nombre, attrs):
+            if nombre == tag_c:
+                fila = estado["fila"]
+                if fila is None:
+                    return
+                col = col_a_num(attrs["r"].rstrip("0123456789"))
+                celda = celdas[(fila, col)] = [int(attrs.get("s", 0)), None]
+                if fila in filas_valor:
+                    estado["celda"], estado["tipo"] = celda, attrs.get("t", "n")
+                    estado["pos"] = (fila, col)
+                    texto.clear()
+            elif nombre == tag_row:
+                fila = int(attrs["r"])
+                estado["fila"] = fila if fila in filas_interes else None
+                if estado["fila"] and attrs.get("customFormat") in ("1", "true"):
+                    self._filas[fila] = int(attrs.get("s", 0))
+            elif estado["celda"] is not None and nombre in (NS + "v", NS + "t"):
+                estado["texto"] = True
+            elif estado["celda"] is not None and nombre == NS + "f":
+                estado["texto"] = "f"
+                formula.clear()
+            elif nombre == NS + "col":
+                self._cols.append((int(attrs["min"]), int(attrs["max"]),
+                                   int(attrs.get("style", 0))))
+            elif nombre == NS + "sheetProtection":
+                self._protegida = attrs.get("sheet") in ("1", "true")
+            elif nombre == NS + "mergeCell":
+                self.merges.append(parse_ref(attrs["ref"]))
+
+        def fin(nombre):
+            if estado["celda"] is None:
+                return
+            if nombre in (NS + "v", NS + "t"):
+                estado["texto"] = None
+            elif nombre == NS + "f":
+                self.formulas[estado["pos"]] = "".join(formula)
+                estado["texto"] = None
+            elif nombre == NS + "c":
+                valor = "".join(texto) if texto else None
+                if valor is not None:
+                    if estado["tipo"] == "s":
+                        valor = sst[int(valor)]
+                    elif estado["tipo"] == "n":
+                        valor = _numero(valor)
+                estado["celda"][1] = valor
+                estado["celda"] = None
+
+        def caracteres(datos):
+            if estado["texto"] == "f":
+                formula.append(datos)
+            elif estado["texto"]:
+                texto.append(datos)
+
+        _parsear(z, ruta, inicio, fin, caracteres)
+        self.protection = ProteccionHoja(self._protegida)
+
+    def _estilo_defecto(self, fila, col):
+        if fila in self._filas:
+            return self._filas[fila]
+        for c_min, c_max, estilo in self._cols:
+            if c_min <= col <= c_max:
+                return estilo
+        return 0
+
+    def valor(self, fila, col):
+        celda = self._celdas.get((fila, col))
+        return celda[1] if celda else None
+
+    def cell(self, row, column):
+        estilo, valor = self._celdas.get((row, column)) or (self._estilo_defecto(row, column), None)
+        return CeldaStream(valor, ProteccionCelda(self._locked[estilo]))
+
+
+def contar_alumnos(ws, general):
+    """Alumnos en la hoja General: filas con matrícula desde la primera fila
+    de alumnos (`general`: DisenoGeneral)."""
+    n = 0
+    while ws.cell(row=general.fila_ini + n, column=general.col_matricula).value not in (None, ""):
+        n += 1
+    return n
+
+
+def diseno_archivo(diseno, n_alumnos):
+    """`diseno` con las filas de datos del archivo: las de la plantilla o
+    hasta la del último alumno si el generador amplió las filas."""
+    return ampliado(diseno, max(diseno.capacidad, n_alumnos))
+
+
+def hojas_parcial_stream(path, diseno):
+    """(HojaStream de cada hoja Parcial del diseño, diseño del archivo)."""
+    with zipfile.ZipFile(path) as z:
+        locked = tabla_locked(z)
+        sst = _shared_strings(z)
+        rutas = dict(_hojas_del_libro(z))
+        if not rutas:
+            return [], diseno
+        g = diseno.general
+        alumnos = range(g.fila_ini, MAX_FILAS + 1)
+        nombre_general = g.hoja if g.hoja in rutas else next(iter(rutas))
+        diseno = diseno_archivo(diseno, contar_alumnos(HojaStream(
+            nombre_general, z, rutas[nombre_general], locked, sst,
+            filas=alumnos, valores=alumnos), g))
+        hojas = []
+        for p in diseno.parciales:
+            if p.hoja in rutas:
+                filas = {p.encabezado} | set(range(p.fila_ini, p.fila_fin + 1))
+                hojas.append(HojaStream(p.hoja, z, rutas[p.hoja], locked, sst,
+                                        filas=filas, valores={p.encabezado}))
+        return hojas, diseno
+
+
+def hojas_parcial_openpyxl(path, diseno):
+    """(hojas Parcial del diseño, de openpyxl; diseño del archivo)."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        print("Error: falta 'openpyxl'. Instala con: pip install openpyxl "
+              "(o usa --rapido)", file=sys.stderr)
+        sys.exit(2)
+    wb = load_workbook(path, keep_vba=True)
+    if not wb.worksheets:
+        return [], diseno
+    g = diseno.general
+    general = wb[g.hoja] if g.hoja in wb.sheetnames else wb.worksheets[0]
+    diseno = diseno_archivo(diseno, contar_alumnos(general, g))
+    return [wb[p.hoja] for p in diseno.parciales if p.hoja in wb.sheetnames], diseno
+
+
+def _parcial(diseno, hoja):
+    return next(p for p in diseno.parciales if p.hoja == hoja)
+
+
+def evaluar_hoja(ws, diseno):
+    """Evalúa los criterios en una hoja sin imprimir nada. Devuelve un dict con
+    la protección, las columnas por encabezado y las celdas que fallan en cada
+    criterio (None si no se pudo evaluar por falta de encabezados). Las filas
+    de datos, el rango previo y las columnas de muestra salen de `diseno` (el
+    del archivo, ver diseno_archivo)."""
+    p = _parcial(diseno, ws.title)
+    header_ini, header_fin = diseno.encabezados_bloqueo
+    encabezados = IndiceEncabezados.de_hoja(ws, p.encabezado)
+    r = {
+        "hoja": ws.title,
+        "fila_fin": p.fila_fin,
+        "protegida": bool(ws.protection.sheet),
+        "col_ini": encabezados.buscar(header_ini),
+        "col_fin": encabezados.buscar(header_fin),
+        "fallas_encabezado": None,
+        "fallas_bd_bj": None,
+        "fallas_editables": None,
+    }
+    col_ini, col_fin = r["col_ini"], r["col_fin"]
+    if not col_ini or not col_fin or col_ini > col_fin:
+        r["ok"] = False
+        return r
+
+    def no_bloqueadas(c1, c2):
+        return [f"{num_a_col(col)}{row}"
+                for row in range(p.fila_ini, p.fila_fin + 1)
+                for col in range(c1, c2 + 1)
+                if not es_locked(ws.cell(row=row, column=col))]
+
+    # 1. Rango objetivo bloqueado en filas 9-53
+    r["fallas_encabezado"] = no_bloqueadas(col_ini, col_fin)
+    # 2. Rango previo (BD:BJ) sigue bloqueado
+    r["fallas_bd_bj"] = no_bloqueadas(*diseno.respaldo_bloqueo)
+    # 3. Celdas de captura a la izquierda del rango siguen editables (en la
+    # primera y en la última fila de datos)
+    r["fallas_editables"] = [
+        f"{num_a_col(col)}{row}" for row in (p.fila_ini, p.fila_fin)
+        for col in p.muestra
+        if col < col_ini and es_locked(ws.cell(row=row, column=col))
+    ]
+    r["ok"] = (r["protegida"] and not r["fallas_encabezado"]
+               and not r["fallas_bd_bj"] and not r["fallas_editables"])
+    return r
+
+
+def verificar_hoja(ws, diseno):
+    r = evaluar_hoja(ws, diseno)
+    p = _parcial(diseno, ws.title)
+    header_ini, header_fin = diseno.encabezados_bloqueo
+    prev_ini, prev_fin = diseno.respaldo_bloqueo
+    prev = f"{num_a_col(prev_ini)}:{num_a_col(prev_fin)}"
     print(f"\n=== Hoja: {ws.title} ===")
 
     # 4. Protección de hoja activa
-    protegida = bool(ws.protection.sheet)
+    protegida = r["protegida"]
     print(f"  [{'OK' if protegida else 'FALLA'}] Protección de hoja activa: {protegida}")
-    ok &= protegida
 
     # Localizar rango por encabezado
-    col_ini = buscar_columna_por_encabezado(ws, HEADER_INI)
-    col_fin = buscar_columna_por_encabezado(ws, HEADER_FIN)
-    if not col_ini or not col_fin or col_ini > col_fin:
+    col_ini, col_fin = r["col_ini"], r["col_fin"]
+    if r["fallas_encabezado"] is None:
         print(f"  [FALLA] No se localizó el rango por encabezado "
-              f"('{HEADER_INI}'={col_ini}, '{HEADER_FIN}'={col_fin}).")
+              f"('{header_ini}'={col_ini}, '{header_fin}'={col_fin}).")
         return False
-    print(f"  Rango por encabezado: {get_column_letter(col_ini)}..{get_column_letter(col_fin)} "
+    print(f"  Rango por encabezado: {num_a_col(col_ini)}..{num_a_col(col_fin)} "
           f"(cols {col_ini}-{col_fin})")
 
     # 1. Rango objetivo bloqueado en filas 9-53
-    fallos = []
-    for row in range(FILA_DATOS_INI, FILA_DATOS_FIN + 1):
-        for col in range(col_ini, col_fin + 1):
-            if not es_locked(ws.cell(row=row, column=col)):
-                fallos.append(f"{get_column_letter(col)}{row}")
+    fallos = r["fallas_encabezado"]
     if fallos:
-        ok = False
         muestra = ", ".join(fallos[:10]) + (" ..." if len(fallos) > 10 else "")
-        print(f"  [FALLA] Rango '{HEADER_INI}'->'{HEADER_FIN}' bloqueado: "
+        print(f"  [FALLA] Rango '{header_ini}'->'{header_fin}' bloqueado: "
               f"{len(fallos)} celdas NO bloqueadas ({muestra})")
     else:
-        print(f"  [OK] Rango '{HEADER_INI}'->'{HEADER_FIN}' (filas "
-              f"{FILA_DATOS_INI}-{FILA_DATOS_FIN}) totalmente bloqueado")
+        print(f"  [OK] Rango '{header_ini}'->'{header_fin}' (filas "
+              f"{p.fila_ini}-{p.fila_fin}) totalmente bloqueado")
 
     # 2. Rango previo (BD:BJ) sigue bloqueado
-    fallos_prev = []
-    for row in range(FILA_DATOS_INI, FILA_DATOS_FIN + 1):
-        for col in range(PREV_COL_INI, PREV_COL_FIN + 1):
-            if not es_locked(ws.cell(row=row, column=col)):
-                fallos_prev.append(f"{get_column_letter(col)}{row}")
-    if fallos_prev:
-        ok = False
-        print(f"  [FALLA] Columnas previas BD:BJ: {len(fallos_prev)} celdas NO bloqueadas")
+    if r["fallas_bd_bj"]:
+        print(f"  [FALLA] Columnas previas {prev}: {len(r['fallas_bd_bj'])} celdas NO bloqueadas")
     else:
-        print(f"  [OK] Columnas previas BD:BJ (56-62) siguen bloqueadas")
+        print(f"  [OK] Columnas previas {prev} ({prev_ini}-{prev_fin}) siguen bloqueadas")
 
     # 3. Celdas de captura a la izquierda del rango siguen editables
-    editables_ok = True
-    for col in MUESTRA_EDITABLES:
-        if col >= col_ini:
-            continue  # solo muestreamos a la izquierda del rango bloqueado
-        ref = f"{get_column_letter(col)}{FILA_DATOS_INI}"
-        if es_locked(ws.cell(row=FILA_DATOS_INI, column=col)):
-            editables_ok = False
-            print(f"  [FALLA] Celda de captura {ref} quedó bloqueada (debía ser editable)")
-    if editables_ok:
-        refs = ", ".join(f"{get_column_letter(c)}{FILA_DATOS_INI}"
-                         for c in MUESTRA_EDITABLES if c < col_ini)
+    for ref in r["fallas_editables"]:
+        print(f"  [FALLA] Celda de captura {ref} quedó bloqueada (debía ser editable)")
+    if not r["fallas_editables"]:
+        refs = ", ".join(f"{num_a_col(c)}{row}" for row in (p.fila_ini, p.fila_fin)
+                         for c in p.muestra if c < col_ini)
         print(f"  [OK] Celdas de captura siguen editables ({refs})")
-    ok &= editables_ok
 
-    return ok
+    return r["ok"]
+
+
+# ========================================
+# Varios archivos: pool de procesos y reporte
+# ========================================
+
+def expandir_rutas(rutas):
+    """Archivos .xlsm a partir de archivos, directorios (recursivo) o globs."""
+    archivos = []
+    for ruta in rutas:
+        if any(ch in ruta for ch in "*?["):
+            archivos.extend(p for p in sorted(glob.glob(ruta, recursive=True)) if os.path.isfile(p))
+        elif os.path.isdir(ruta):
+            for raiz, _, nombres in sorted(os.walk(ruta)):
+                archivos.extend(os.path.join(raiz, n) for n in sorted(nombres)
+                                if n.lower().endswith(".xlsm") and not n.startswith("~$"))
+        else:
+            archivos.append(ruta)
+    return list(dict.fromkeys(archivos))
+
+
+def verificar_archivo(path, rapido=True, diseno=None):
+    """Resultado estructurado de un archivo (para el pool y el reporte).
+    `codigo` sigue la convención de salida: 0 ok, 1 criterios, 2 error.
+    `diseno`: el de la plantilla (default: el de templates/Template.xlsx)."""
+    t0 = time.perf_counter()
+    r = {"archivo": path, "ok": False, "codigo": 2, "error": None, "hojas": []}
+    try:
+        diseno = diseno or cargar_diseno()
+        hojas, diseno = (hojas_parcial_stream(path, diseno) if rapido
+                         else hojas_parcial_openpyxl(path, diseno))
+        if not hojas:
+            r["error"] = "no se encontraron hojas 'Parcial_*' en el archivo"
+        else:
+            r["hojas"] = [evaluar_hoja(ws, diseno) for ws in hojas]
+            r["ok"] = all(h["ok"] for h in r["hojas"])
+            r["codigo"] = 0 if r["ok"] else 1
+    except Exception as e:
+        r["error"] = f"{type(e).__name__}: {e}"
+    r["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return r
+
+
+def _conteo(fallas):
+    return None if fallas is None else len(fallas)
+
+
+def escribir_reporte(resultados, destino):
+    """Reporte JSON (por archivo, con detalle por hoja) o CSV (una fila por hoja)."""
+    if destino.lower().endswith(".csv"):
+        columnas = ["archivo", "hoja", "ok", "protegida", "col_ini", "col_fin",
+                    "fallas_encabezado", "fallas_bd_bj", "fallas_editables", "ms", "error"]
+        with open(destino, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=columnas)
+            w.writeheader()
+            for r in resultados:
+                base = {"archivo": r["archivo"], "ms": r["ms"], "error": r["error"] or ""}
+                if not r["hojas"]:
+                    w.writerow({**base, "ok": False})
+                for h in r["hojas"]:
+                    w.writerow({**base, "hoja": h["hoja"], "ok": h["ok"],
+                                "protegida": h["protegida"], "col_ini": h["col_ini"],
+                                "col_fin": h["col_fin"],
+                                "fallas_encabezado": _conteo(h["fallas_encabezado"]),
+                                "fallas_bd_bj": _conteo(h["fallas_bd_bj"]),
+                                "fallas_editables": _conteo(h["fallas_editables"])})
+        return
+
+    archivos = []
+    for r in resultados:
+        hojas = []
+        for h in r["hojas"]:
+            h = dict(h)
+            for clave in ("fallas_encabezado", "fallas_bd_bj", "fallas_editables"):
+                celdas = h.pop(clave)
+                h[clave] = _conteo(celdas)
+                h["muestra_" + clave[len("fallas_"):]] = (celdas or [])[:10]
+            hojas.append(h)
+        archivos.append({**r, "hojas": hojas})
+    reporte = {
+        "resumen": {
+            "archivos": len(resultados),
+            "ok": sum(r["codigo"] == 0 for r in resultados),
+            "con_fallas": sum(r["codigo"] == 1 for r in resultados),
+            "con_error": sum(r["codigo"] == 2 for r in resultados),
+            "ms_total": round(sum(r["ms"] for r in resultados), 1),
+        },
+        "archivos": archivos,
+    }
+    with open(destino, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+
+
+def verificar_varios(archivos, rapido, workers, destino_reporte=None, diseno=None):
+    """Verifica `archivos` en paralelo. Devuelve el código de salida agregado:
+    2 si algún archivo no se pudo leer, 1 si alguno no cumple, 0 si todos cumplen."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        resultados = list(pool.map(verificar_archivo, archivos, [rapido] * len(archivos),
+                                   [diseno] * len(archivos), chunksize=max(1, len(archivos) // (workers * 8))))
+
+    for r in resultados:
+        if r["codigo"] == 0:
+            print(f"[OK] {r['archivo']} ({r['ms']} ms)")
+        elif r["codigo"] == 2:
+            print(f"[ERROR] {r['archivo']}: {r['error']}")
+        else:
+            detalle = "; ".join(
+                f"{h['hoja']}: protegida={h['protegida']}, encabezado={_conteo(h['fallas_encabezado'])}, "
+                f"BD:BJ={_conteo(h['fallas_bd_bj'])}, editables={_conteo(h['fallas_editables'])}"
+                for h in r["hojas"] if not h["ok"])
+            print(f"[FALLA] {r['archivo']} ({detalle})")
+
+    if destino_reporte:
+        escribir_reporte(resultados, destino_reporte)
+
+    codigo = max((r["codigo"] for r in resultados), default=2)
+    print("\n" + ("=" * 40))
+    print(f"RESULTADO: {sum(r['codigo'] == 0 for r in resultados)}/{len(resultados)} archivos "
+          f"cumplen ({time.perf_counter() - t0:.1f} s, {workers} workers)")
+    return codigo
 
 
 def main():
-    if len(sys.argv) != 2:
-        print("Uso: python scripts/verificar_bloqueo.py <ruta_al_xlsm>", file=sys.stderr)
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        prog="verificar_bloqueo.py",
+        description="Verifica el bloqueo de columnas en uno o varios .xlsm generados.",
+    )
+    parser.add_argument("rutas", nargs="+", metavar="ruta",
+                        help="archivo .xlsm, directorio (recursivo) o glob")
+    parser.add_argument(
+        "--rapido", action="store_true",
+        help="lectura en streaming del XML, sin openpyxl (memoria constante)",
+    )
+    parser.add_argument("--reporte", metavar="salida.json|salida.csv",
+                        help="escribe un reporte por archivo y por hoja")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="procesos para varios archivos (default: núm. de CPUs)")
+    parser.add_argument("--plantilla", metavar="ruta", default=TEMPLATE_DEFAULT,
+                        help="plantilla con la que se generaron los archivos, o su "
+                             ".diseno.json (default: templates/Template.xlsx)")
+    args = parser.parse_args()
+
+    try:
+        diseno = cargar_diseno(args.plantilla)
+    except (OSError, ValueError) as e:
+        print(f"Error: no se pudo cargar el diseño de '{args.plantilla}': {e}", file=sys.stderr)
+        sys.exit(2)
+
+    if len(args.rutas) == 1 and os.path.isfile(args.rutas[0]) and not args.reporte:
+        verificar_un_archivo(args.rutas[0], args.rapido, diseno)
+
+    archivos = expandir_rutas(args.rutas)
+    if not archivos:
+        print("Error: no se encontraron archivos .xlsm.", file=sys.stderr)
+        sys.exit(2)
+    sys.exit(verificar_varios(archivos, args.rapido,
+                              max(1, args.workers or os.cpu_count() or 1), args.reporte, diseno))
+
 
-    path = sys.argv[1]
+def verificar_un_archivo(path, rapido, diseno):
     try:
-        wb = load_workbook(path, keep_vba=True)
+        if rapido:
+            hojas_parcial, diseno = hojas_parcial_stream(path, diseno)
+        else:
+            hojas_parcial, diseno = hojas_parcial_openpyxl(path, diseno)
     except Exception as e:
         print(f"Error al abrir '{path}': {e}", file=sys.stderr)
         sys.exit(2)
 
-    hojas_parcial = [ws for ws in wb.worksheets if ws.title.lower().startswith("parcial")]
     if not hojas_parcial:
         print("Error: no se encontraron hojas 'Parcial_*' en el archivo.", file=sys.stderr)
         sys.exit(2)
 
     todo_ok = True
     for ws in hojas_parcial:
-        todo_ok &= verificar_hoja(ws)
+        todo_ok &= verificar_hoja(ws, diseno)
 
     print("\n" + ("=" * 40))
     if todo_ok:
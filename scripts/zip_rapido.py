@@ -0,0 +1,83 @@
+"""
+Escritor de zip mínimo que acepta entradas ya comprimidas.
+
+zipfile recomprime cada parte en cada escritura. Para el .xlsm casi todas las
+partes son idénticas entre solicitudes (imágenes, dibujos, hojas Parcial ya
+bloqueadas), así que se comprimen una sola vez (`comprimir`) o se copian tal
+cual desde la plantilla (`leer_entradas`) y en cada solicitud solo se
+comprimen las partes que cambian. Como el CRC y los tamaños se conocen antes
+de escribir, la salida no necesita `seek`: sirve para archivos, BytesIO o
+stdout.
+"""
+
+import struct
+import zipfile
+import zlib
+from collections import namedtuple
+
+
+# Fecha fija (1980-01-01 00:00, formato DOS): salida determinista para los
+# mismos datos, como la plantilla original.
+FECHA_DOS = (0, (0 << 9) | (1 << 5) | 1)
+
+EntradaZip = namedtuple("EntradaZip", "nombre metodo crc tam tam_comp datos")
+
+_LOCAL = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL = struct.Struct("<IHHHHHHIIIHHHHHII")
+_FIN = struct.Struct("<IHHHHIIH")
+
+
+def comprimir(nombre, datos, metodo=zipfile.ZIP_DEFLATED, nivel=6):
+    """Crea una entrada a partir de los bytes sin comprimir."""
+    if metodo == zipfile.ZIP_STORED:
+        comprimidos = datos
+    else:
+        c = zlib.compressobj(nivel, zlib.DEFLATED, -15)
+        comprimidos = c.compress(datos) + c.flush()
+    return EntradaZip(nombre, metodo, zlib.crc32(datos), len(datos), len(comprimidos), comprimidos)
+
+
+def leer_entradas(archivo):
+    """Lee las entradas de un zip existente sin descomprimirlas.
+    Devuelve {nombre: EntradaZip} en el orden del archivo."""
+    entradas = {}
+    with zipfile.ZipFile(archivo) as z:
+        fp = z.fp
+        for info in z.infolist():
+            fp.seek(info.header_offset)
+            cabecera = fp.read(_LOCAL.size)
+            largo_nombre, largo_extra = struct.unpack("<HH", cabecera[26:30])
+            fp.seek(largo_nombre + largo_extra, 1)
+            datos = fp.read(info.compress_size)
+            entradas[info.filename] = EntradaZip(
+                info.filename, info.compress_type, info.CRC,
+                info.file_size, info.compress_size, datos,
+            )
+    return entradas
+
+
+def escribir_zip(salida, entradas):
+    """Escribe `entradas` (iterable de EntradaZip) en `salida` (solo .write).
+    Devuelve el número de bytes escritos."""
+    hora, fecha = FECHA_DOS
+    offset = 0
+    central = []
+    for e in entradas:
+        nombre = e.nombre.encode("utf-8")
+        flags = 0x800 if not e.nombre.isascii() else 0
+        cabecera = _LOCAL.pack(0x04034B50, 20, flags, e.metodo, hora, fecha,
+                               e.crc, e.tam_comp, e.tam, len(nombre), 0)
+        salida.write(cabecera)
+        salida.write(nombre)
+        salida.write(e.datos)
+        central.append(_CENTRAL.pack(0x02014B50, 20, 20, flags, e.metodo, hora, fecha,
+                                     e.crc, e.tam_comp, e.tam, len(nombre), 0, 0, 0, 0, 0,
+                                     offset) + nombre)
+        offset += len(cabecera) + len(nombre) + e.tam_comp
+
+    tam_central = sum(len(c) for c in central)
+    for c in central:
+        salida.write(c)
+    salida.write(_FIN.pack(0x06054B50, 0, 0, len(central), len(central),
+                           tam_central, offset, 0))
+    return offset + tam_central + _FIN.size